@@ -0,0 +1,106 @@
+"""
+Throughput benchmark for every analyzer on synthetic market data.
+
+Bars come from data.synthetic.SyntheticMarket with a fixed seed, so runs are
+comparable over time. Reports generation time and, per analyzer, wall time
+and bars per second.
+
+Usage:
+    python benchmarks/bench_analyzers.py [--bars 50000] [--pairs EURUSD,USDJPY]
+                                         [--timeframe M1] [--seed 42] [--output results.json]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from analyzers.multi_timeframe_analyzer import MultiTimeframeAnalyzer
+from data.bars import as_bar_arrays
+from data.synthetic import SyntheticMarket
+from indicators.elliott_wave import ElliottWaveAnalyzer
+from indicators.wave_counter import WaveCounter
+from indicators.trend_analysis import TrendAnalyzer
+from indicators.chart_patterns import ChartPatternRecognizer
+from indicators.divergence_convergence import DivergenceConvergenceAnalyzer
+
+
+def _analyzers(pair: str, timeframe: str):
+    """(name, callable) for every analyzer, run in columnar mode."""
+    pips = MultiTimeframeAnalyzer(pair)
+    waves = ElliottWaveAnalyzer()
+    counter = WaveCounter(sensitivity=5)
+    trends = TrendAnalyzer()
+    patterns = ChartPatternRecognizer()
+    divergence = DivergenceConvergenceAnalyzer()
+    return [
+        ('pip_movements', lambda bars: pips.analyze_timeframe(bars, timeframe, columnar=True)),
+        ('elliott_wave', lambda bars: waves.analyze_wave_structure(bars, columnar=True)),
+        ('wave_counter', lambda bars: counter.identify_wave_counts(bars, columnar=True)),
+        ('trends', lambda bars: trends.identify_trends(bars, columnar=True)),
+        ('chart_patterns', lambda bars: patterns.find_all_patterns(bars, columnar=True)),
+        ('divergences', lambda bars: divergence.find_divergences(bars, columnar=True)),
+        ('convergences', lambda bars: divergence.find_convergences(bars, columnar=True)),
+    ]
+
+
+def run_benchmark(bars: int, pairs, timeframe: str, seed: int):
+    """Generate the market once and time each analyzer on every pair."""
+    start = time.perf_counter()
+    market = SyntheticMarket(pairs, timeframe, seed).generate(bars, start=1_600_000_000)
+    generation = time.perf_counter() - start
+
+    results = {'generation_seconds': generation, 'analyzers': {}}
+    for pair, rates in market.items():
+        data = as_bar_arrays(rates)
+        for name, run in _analyzers(pair, timeframe):
+            start = time.perf_counter()
+            run(data)
+            elapsed = time.perf_counter() - start
+            row = results['analyzers'].setdefault(name, {'seconds': 0.0, 'bars': 0})
+            row['seconds'] += elapsed
+            row['bars'] += bars
+
+    for row in results['analyzers'].values():
+        row['bars_per_second'] = row['bars'] / row['seconds'] if row['seconds'] else float('inf')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bars', type=int, default=50_000, help='bars per pair')
+    parser.add_argument('--pairs', default='EURUSD', help='comma-separated pairs')
+    parser.add_argument('--timeframe', default='M1', help='bar timeframe')
+    parser.add_argument('--seed', type=int, default=42, help='generator seed')
+    parser.add_argument('--output', help='append results as a JSON line to this file')
+    args = parser.parse_args()
+
+    pairs = [p.strip().upper() for p in args.pairs.split(',') if p.strip()]
+    results = run_benchmark(args.bars, pairs, args.timeframe, args.seed)
+
+    print(f"Generated {args.bars:,} {args.timeframe} bars x {len(pairs)} pairs "
+          f"in {results['generation_seconds']:.2f}s")
+    print(f"{'Analyzer':<16} {'Seconds':>9} {'Bars/s':>14}")
+    print('-' * 41)
+    for name, row in results['analyzers'].items():
+        print(f"{name:<16} {row['seconds']:>9.2f} {row['bars_per_second']:>14,.0f}")
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({
+                'benchmark': 'analyzers',
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'bars': args.bars,
+                'pairs': pairs,
+                'timeframe': args.timeframe,
+                'seed': args.seed,
+                'results': results,
+            }) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Result cache benchmark: analyzing unchanged history vs loading it from disk.
+
+Runs each analyzer once into an empty ResultCache (analysis plus store)
+and then again (hashing the bars plus load), for object lists and for
+columnar results.
+
+Usage:
+    python benchmarks/bench_result_cache.py [--bars 20000] [--repeat 5]
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from data.synthetic import SyntheticMarket
+from indicators.chart_patterns import ChartPatternRecognizer
+from indicators.trend_analysis import TrendAnalyzer
+from indicators.wave_counter import WaveCounter
+from utils.result_cache import ResultCache
+
+
+def _timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--bars', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rates = SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(args.bars)['EURUSD']
+    methods = [
+        ('wave_counter', WaveCounter(sensitivity=5).identify_wave_counts),
+        ('trends', TrendAnalyzer().identify_trends),
+        ('chart_patterns', ChartPatternRecognizer().find_all_patterns),
+    ]
+
+    root = tempfile.mkdtemp(prefix='result-cache-')
+    try:
+        cache = ResultCache(root)
+        print(f"{args.bars:,} bars, {args.repeat} runs each")
+        for columnar in (False, True):
+            for name, method in methods:
+                compute = _timed(lambda: method(rates, columnar=columnar), args.repeat)
+                cache.run(method, rates, columnar=columnar)
+                hit = _timed(lambda: cache.run(method, rates, columnar=columnar), args.repeat)
+                label = f"{name}{' (columnar)' if columnar else ''}"
+                print(f"  {label:<28} analyze {compute * 1000:8.2f} ms   cached {hit * 1000:7.2f} ms   "
+                      f"{compute / hit:6.1f}x")
+        print(f"  cache size: {cache.nbytes() / 1e6:.2f} MB")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
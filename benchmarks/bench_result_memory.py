@@ -0,0 +1,117 @@
+"""
+Memory benchmark for analysis result objects.
+
+Measures the bytes needed per million results for every result class, both
+as a list of objects and as a columnar ResultTable, so regressions in the
+result representation show up as a number that can be tracked over time.
+
+Usage:
+    python benchmarks/bench_result_memory.py [--count 1000000] [--output results.json]
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from analyzers.multi_timeframe_analyzer import PipMovement
+from indicators.elliott_wave import Wave, WaveType, WaveDirection
+from indicators.wave_counter import WaveCount, WaveDegree
+from indicators.trend_analysis import TrendMove, TrendDirection, TrendStrength
+from indicators.chart_patterns import ChartPattern, PatternType
+from indicators.divergence_convergence import Divergence, DivergenceType, Convergence, ConvergenceType
+from utils.result_table import ResultBuilder
+
+
+def _sample_rows(i: int):
+    """Representative field values for row i of every result class."""
+    price = 1.1 + (i % 1000) * 1e-5
+    timestamp = pd.Timestamp('2024-01-01') + pd.Timedelta(minutes=i)
+    return {
+        PipMovement: dict(pair='EURUSD', timeframe='M1', start_time=timestamp, end_time=timestamp,
+                          start_price=price, end_price=price + 0.0025, pip_change=25.0,
+                          direction='up' if i % 2 else 'down'),
+        Wave: dict(start_idx=i, end_idx=i + 7, start_price=price, end_price=price + 0.001,
+                   wave_type=WaveType.IMPULSE, direction=WaveDirection.UP, degree=1, label=str(i % 5 + 1)),
+        WaveCount: dict(wave_number=str(i % 5 + 1), wave_type='impulse', degree=WaveDegree.MINOR,
+                        start_idx=i, end_idx=i + 7, start_price=price, end_price=price + 0.001,
+                        start_time=timestamp, end_time=timestamp, direction='up',
+                        length_points=0.001, length_percent=0.09, fibonacci_ratio=1.618),
+        TrendMove: dict(start_idx=i, end_idx=i + 20, start_price=price, end_price=price + 0.002,
+                        direction=TrendDirection.UPTREND, strength=TrendStrength.MODERATE,
+                        slope=0.0001, r_squared=0.8),
+        ChartPattern: dict(pattern_type=PatternType.DOUBLE_TOP, start_idx=i, end_idx=i + 30,
+                           key_points=[(i, price), (i + 15, price - 0.002), (i + 30, price)],
+                           confidence=0.85, target_price=price - 0.004, stop_loss=price),
+        Divergence: dict(divergence_type=DivergenceType.BEARISH_REGULAR, start_idx=i, end_idx=i + 12,
+                         price_points=[(i, price), (i + 12, price + 0.001)],
+                         indicator_points=[(i, 71.0), (i + 12, 65.0)], strength=0.6),
+        Convergence: dict(convergence_type=ConvergenceType.MACD_SIGNAL, timestamp=i, price=price,
+                          indicators={'macd': 0.0002, 'signal': 0.0001}, strength=0.7,
+                          signal_direction='buy'),
+    }
+
+
+def _measure(func):
+    """Return (result, traced bytes still allocated after func)."""
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def run_benchmark(count: int):
+    """Measure bytes per million results for each result class."""
+    builders = {cls: ResultBuilder(cls) for cls in _sample_rows(0)}
+    for i in range(count):
+        for cls, row in _sample_rows(i).items():
+            builders[cls].append(**row)
+
+    scale = 1_000_000 / count
+    results = {}
+    for cls, builder in builders.items():
+        objects, object_bytes = _measure(builder.to_list)
+        del objects
+        table, table_bytes = _measure(builder.to_table)
+        del table
+        results[cls.__name__] = {
+            'objects_mb_per_million': object_bytes * scale / 1e6,
+            'table_mb_per_million': table_bytes * scale / 1e6,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1_000_000, help='results per class to build')
+    parser.add_argument('--output', help='append results as a JSON line to this file')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.count)
+
+    print(f"{'Result class':<16} {'Objects MB/1M':>14} {'Table MB/1M':>12}")
+    print('-' * 44)
+    for name, row in results.items():
+        print(f"{name:<16} {row['objects_mb_per_million']:>14.1f} {row['table_mb_per_million']:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps({
+                'benchmark': 'result_memory',
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'count': args.count,
+                'results': results,
+            }) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Transfer benchmark: pickled bar arrays vs shared-memory handles.
+
+Submits a task that only touches the bars to a process pool, once with the
+rates array pickled into the task and once through a SharedBarStore, so the
+difference is the cost of getting the bars into the worker.
+
+Usage:
+    python benchmarks/bench_shared_bars.py [--bars 200000] [--tasks 50] [--workers 4]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+from data.bars import as_bar_arrays
+from data.shared_bars import SharedBarStore, call_with_bars
+from data.synthetic import SyntheticMarket
+
+
+def last_close(bars) -> float:
+    """Stand-in analysis that reads the bars without doing work."""
+    return float(as_bar_arrays(bars).close[-1])
+
+
+def _timed(pool: ProcessPoolExecutor, submit, tasks: int) -> float:
+    started = time.perf_counter()
+    for future in [submit() for _ in range(tasks)]:
+        future.result()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--bars', type=int, default=200_000)
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    rates = SyntheticMarket(['EURUSD'], 'M1', seed=1).generate(args.bars)['EURUSD']
+    store = SharedBarStore()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Warm up the workers so process start-up is not measured
+        list(pool.map(abs, range(args.workers)))
+
+        pickled = _timed(pool, lambda: pool.submit(last_close, rates), args.tasks)
+
+        def submit_shared():
+            handle = store.publish('EURUSD', rates)
+            future = pool.submit(call_with_bars, handle, last_close)
+            future.add_done_callback(lambda _: store.release(handle))
+            return future
+
+        shared = _timed(pool, submit_shared, args.tasks)
+    store.close()
+
+    print(f"{args.tasks} tasks x {args.bars:,} bars ({rates.nbytes / 1e6:.1f} MB each)")
+    print(f"  pickled:       {pickled * 1000 / args.tasks:8.2f} ms/task")
+    print(f"  shared memory: {shared * 1000 / args.tasks:8.2f} ms/task (includes publishing)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,20 @@
 """
 Multi-timeframe analysis for forex pairs with pip interval tracking.
 """
-from typing import Dict, List, Tuple
+import heapq
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from datetime import datetime
-import pandas as pd
+import numpy as np
 
+from data.bars import BarData, as_bar_arrays
+from data.resample import TimeframeSet
+from utils.result_table import ResultBuilder, ResultTable
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class PipMovement:
-    """Represents a pip movement within specified interval."""
+    """Represents a pip movement within specified interval (immutable)."""
     pair: str
     timeframe: str
     start_time: datetime
@@ -40,76 +45,170 @@ class MultiTimeframeAnalyzer:
         """Calculate pip change between two prices."""
         return (end_price - start_price) / self.pip_multiplier
     
-    def analyze_timeframe(self, data: pd.DataFrame, timeframe: str) -> List[PipMovement]:
-        """Analyze single timeframe for pip movements in specified interval."""
-        movements = []
+    def analyze_timeframe(self, data: BarData, timeframe: str,
+                          columnar: bool = False) -> Union[List[PipMovement], ResultTable]:
+        """
+        Analyze single timeframe for pip movements in specified interval.
+        
+        For every bar, the first later bar that moves at least min_pips away
+        ends a movement if the move is at most max_pips. Accepts a DataFrame,
+        an MT5 rates array or BarArrays. With columnar=True the movements are
+        returned as a ResultTable.
+        
+        Fixed-point bars are scanned in integer points, so the pip thresholds
+        are exact; prices are converted back only for the reported movements.
+        """
+        bars = as_bar_arrays(data)
+        movements = ResultBuilder(PipMovement)
+        
+        pip_size = self.pip_multiplier
+        if bars.digits is not None:
+            pip_size = self.pip_multiplier * 10 ** bars.digits
+            if abs(pip_size - round(pip_size)) < 1e-9:
+                pip_size = round(pip_size)
+        starts, ends, pip_changes = self._scan_pip_movements(bars.close, pip_size)
+        
+        if len(starts):
+            close = bars.close
+            movements.extend(
+                pair=self.pair,
+                timeframe=timeframe,
+                start_time=bars.timestamps(starts),
+                end_time=bars.timestamps(ends),
+                start_price=bars.price(close[starts]),
+                end_price=bars.price(close[ends]),
+                pip_change=pip_changes,
+                direction=np.where(close[ends] > close[starts], 'up', 'down')
+            )
+        
+        return movements.build(columnar)
+    
+    def _scan_pip_movements(self, close: np.ndarray,
+                            pip_size: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find (start, end, pip_change) of every movement, ordered by start.
+        
+        pip_size is the price change of one pip in the units of close. All
+        pending start bars advance one offset per step as a vector; the few
+        starts still pending after many steps are finished one by one with
+        chunked searches.
+        """
+        n = len(close)
+        pending = np.arange(max(n - 1, 0))
+        found_starts, found_ends = [], []
+        offset = 1
         
-        for i in range(len(data) - 1):
-            current_price = data.iloc[i]['close']
+        while len(pending) > 64:
+            pending = pending[pending + offset < n]
+            change = np.abs(close[pending + offset] - close[pending]) / pip_size
+            reached = change >= self.min_pips
+            in_range = reached & (change <= self.max_pips)
             
-            # Look ahead for movements within pip range
-            for j in range(i + 1, len(data)):
-                future_price = data.iloc[j]['close']
-                pip_change = abs(self.calculate_pip_change(current_price, future_price))
-                
-                if self.min_pips <= pip_change <= self.max_pips:
-                    direction = 'up' if future_price > current_price else 'down'
-                    
-                    movement = PipMovement(
-                        pair=self.pair,
-                        timeframe=timeframe,
-                        start_time=data.iloc[i]['timestamp'],
-                        end_time=data.iloc[j]['timestamp'],
-                        start_price=current_price,
-                        end_price=future_price,
-                        pip_change=pip_change,
-                        direction=direction
-                    )
-                    movements.append(movement)
-                    break
-                elif pip_change > self.max_pips:
-                    break
-        
-        return movements
+            found_starts.append(pending[in_range])
+            found_ends.append(pending[in_range] + offset)
+            pending = pending[~reached]
+            offset += 1
+        
+        for start in pending.tolist():
+            end = self._first_pip_reach(close, start, start + offset, pip_size)
+            if end is not None:
+                found_starts.append(np.array([start]))
+                found_ends.append(np.array([end]))
+        
+        if not found_starts:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, np.zeros(0)
+        
+        starts = np.concatenate(found_starts)
+        ends = np.concatenate(found_ends)
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+        
+        pip_changes = np.abs(close[ends] - close[starts]) / pip_size
+        in_range = pip_changes <= self.max_pips
+        return starts[in_range], ends[in_range], pip_changes[in_range]
+    
+    def _first_pip_reach(self, close: np.ndarray, start: int, lo: int, pip_size: float) -> Optional[int]:
+        """First bar at or after lo that moves at least min_pips from close[start]."""
+        chunk = 256
+        while lo < len(close):
+            hi = min(len(close), lo + chunk)
+            change = np.abs(close[lo:hi] - close[start]) / pip_size
+            hits = np.flatnonzero(change >= self.min_pips)
+            if len(hits):
+                return lo + int(hits[0])
+            lo = hi
+            chunk *= 2
+        return None
     
-    def analyze_all_timeframes(self, data_dict: Dict[str, pd.DataFrame]) -> Dict[str, List[PipMovement]]:
+    def analyze_all_timeframes(self, data_dict: Dict[str, BarData],
+                               columnar: bool = False) -> Dict[str, Union[List[PipMovement], ResultTable]]:
         """Analyze all timeframes and return movements for each."""
         results = {}
         
         for timeframe in self.timeframes:
             if timeframe in data_dict:
-                results[timeframe] = self.analyze_timeframe(data_dict[timeframe], timeframe)
+                results[timeframe] = self.analyze_timeframe(data_dict[timeframe], timeframe, columnar)
         
         return results
     
+    def analyze_from_m1(self, m1: np.ndarray,
+                        columnar: bool = False) -> Dict[str, Union[List[PipMovement], ResultTable]]:
+        """
+        Analyze all timeframes from a single M1 rates array.
+        
+        The higher timeframes are resampled from the M1 bars into one
+        TimeframeSet buffer, so only one fetch per pair is needed.
+        """
+        return self.analyze_all_timeframes(TimeframeSet(m1, self.timeframes), columnar)
+    
     def find_convergence_signals(self, movements_dict: Dict[str, List[PipMovement]]) -> List[Dict]:
-        """Find signals where multiple timeframes show similar movements."""
+        """
+        Find signals where multiple timeframes show similar movements.
+        
+        Uses an interval sweep-line join: movements from every timeframe are
+        visited in start-time order while an active set per (direction,
+        timeframe) holds the movements that may still overlap. Each
+        overlapping same-direction pair from different timeframes is reported
+        once, in O((M + K) log M) for M movements and K signals.
+        """
         signals = []
+        tf_order = {tf: i for i, tf in enumerate(self.timeframes)}
+        
+        events = []
+        for timeframe, movements in movements_dict.items():
+            for mov in movements:
+                events.append((mov.start_time, len(events), timeframe, mov))
+        events.sort(key=lambda e: (e[0], e[1]))
         
-        # Look for convergence across timeframes
-        for tf1 in movements_dict:
-            for tf2 in movements_dict:
-                if tf1 != tf2:
-                    # Find overlapping time periods with same direction
-                    for mov1 in movements_dict[tf1]:
-                        for mov2 in movements_dict[tf2]:
-                            if (mov1.direction == mov2.direction and
-                                self._time_overlap(mov1, mov2)):
-                                
-                                signals.append({
-                                    'pair': self.pair,
-                                    'timeframes': [tf1, tf2],
-                                    'direction': mov1.direction,
-                                    'strength': self._calculate_signal_strength(mov1, mov2),
-                                    'timestamp': max(mov1.start_time, mov2.start_time)
-                                })
+        # direction -> timeframe -> min-heap of (end_time, seq, movement)
+        active: Dict[str, Dict[str, list]] = {}
+        
+        for start_time, seq, tf2, mov2 in events:
+            by_timeframe = active.setdefault(mov2.direction, {})
+            
+            for tf1, heap in by_timeframe.items():
+                # Later events start no earlier, so expired movements never overlap again
+                while heap and heap[0][0] < start_time:
+                    heapq.heappop(heap)
+                
+                if tf1 == tf2:
+                    continue
+                
+                for _, _, mov1 in heap:
+                    pair = sorted((tf1, tf2), key=lambda tf: (tf_order.get(tf, len(tf_order)), tf))
+                    signals.append({
+                        'pair': self.pair,
+                        'timeframes': pair,
+                        'direction': mov2.direction,
+                        'strength': self._calculate_signal_strength(mov1, mov2),
+                        'timestamp': max(mov1.start_time, mov2.start_time)
+                    })
+            
+            heapq.heappush(by_timeframe.setdefault(tf2, []), (mov2.end_time, seq, mov2))
         
         return signals
     
-    def _time_overlap(self, mov1: PipMovement, mov2: PipMovement) -> bool:
-        """Check if two movements have overlapping time periods."""
-        return (mov1.start_time <= mov2.end_time and mov2.start_time <= mov1.end_time)
-    
     def _calculate_signal_strength(self, mov1: PipMovement, mov2: PipMovement) -> float:
         """Calculate signal strength based on pip movements and timeframe correlation."""
         # Simple strength calculation - can be enhanced
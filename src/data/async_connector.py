@@ -0,0 +1,142 @@
+"""
+asyncio front end for the MT5 and replay connectors.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, Optional, Tuple
+import numpy as np
+
+from data.bar_scheduler import BarCloseScheduler
+from data.mt5_connector import MT5Connector
+from utils.metrics import StageMetrics
+
+
+class AsyncConnector:
+    """
+    Awaitable access to an MT5Connector (or ReplayConnector).
+
+    The MetaTrader5 API only has blocking calls, so they run on a small
+    bounded thread pool; any number of coroutines can await them without a
+    thread per symbol. Bar streams share one clock driver: after every bar
+    close it fetches the (symbol, timeframe) pairs whose bar just closed and
+    puts the bars into each stream's bounded queue. A stream whose consumer
+    falls behind makes the driver wait (backpressure) instead of piling up
+    bars, and a replay clock only advances when every stream has taken its
+    bars.
+    """
+
+    def __init__(self, connector: MT5Connector, max_workers: int = 4, queue_size: int = 2,
+                 delay: float = 2.0, metrics: Optional[StageMetrics] = None):
+        """
+        Args:
+            connector: Connected MT5Connector or ReplayConnector
+            max_workers: Threads for blocking terminal calls
+            queue_size: Bar updates buffered per stream before the driver waits
+            delay: Seconds after a bar close before its bars are fetched
+            metrics: Records stream fetches as the 'fetch' stage
+        """
+        self.connector = connector
+        self.metrics = metrics
+        self.queue_size = queue_size
+        self.delay = delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mt5')
+        self._streams: Dict[Tuple[str, str], Tuple[asyncio.Queue, int]] = {}
+        self._driver: Optional[asyncio.Task] = None
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking call (e.g. a connector method) on the executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def get_live_data(self, symbol: str, timeframe: str, bars: int = 500,
+                            as_array: bool = False, incremental: bool = False):
+        """Awaitable MT5Connector.get_live_data."""
+        return await self.run(self.connector.get_live_data, symbol, timeframe, bars,
+                                as_array=as_array, incremental=incremental)
+
+    async def get_current_price(self, symbol: str) -> Optional[Dict]:
+        """Awaitable MT5Connector.get_current_price."""
+        return await self.run(self.connector.get_current_price, symbol)
+
+    async def get_symbol_info(self, symbol: str) -> Optional[Dict]:
+        """Awaitable MT5Connector.get_symbol_info."""
+        return await self.run(self.connector.get_symbol_info, symbol)
+
+    async def wait(self, seconds: float) -> bool:
+        """Awaitable connector.wait; a live connector sleeps without holding a thread."""
+        if type(self.connector).wait is MT5Connector.wait:
+            await asyncio.sleep(seconds)
+            return True
+        return await self.run(self.connector.wait, seconds)
+
+    async def bar_stream(self, symbol: str, timeframe: str,
+                         bars: Optional[int] = None) -> AsyncIterator[np.ndarray]:
+        """
+        Yield the latest bars of (symbol, timeframe) after every bar close.
+
+        Each update is a rates array of `bars` bars (default: the fetch
+        plan) owned by the consumer. The stream ends when the connector has
+        no more data.
+        """
+        timeframe = timeframe.upper()
+        if bars is None:
+            planner = self.connector.fetch_planner
+            bars = planner.bars_for(timeframe) if planner else 200
+
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._streams[(symbol, timeframe)] = (queue, bars)
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+
+        try:
+            while True:
+                rates = await queue.get()
+                if rates is None:
+                    return
+                yield rates
+        finally:
+            self._streams.pop((symbol, timeframe), None)
+
+    async def _drive(self):
+        """Fetch and publish the bars of every stream whose bar just closed."""
+        try:
+            while self._streams:
+                scheduler = BarCloseScheduler(list(self._streams), self.delay)
+                now = self.connector.now()
+                close, batch = scheduler.next_batch(now - self.delay)
+                if not await self.wait(max(0.0, close + self.delay - now)):
+                    break
+                await asyncio.gather(*(self._publish(symbol, timeframe) for symbol, timeframe in batch))
+        finally:
+            # End every stream; a full queue gets the marker once its consumer catches up
+            for queue, _ in list(self._streams.values()):
+                try:
+                    queue.put_nowait(None)
+                except asyncio.QueueFull:
+                    asyncio.ensure_future(queue.put(None))
+
+    async def _publish(self, symbol: str, timeframe: str):
+        """Fetch one stream's bars and hand them to its consumer."""
+        stream = self._streams.get((symbol, timeframe))
+        if stream is None:
+            return
+        queue, bars = stream
+        started = time.perf_counter()
+        rates = await self.get_live_data(symbol, timeframe, bars, as_array=True, incremental=True)
+        if self.metrics is not None:
+            self.metrics.observe('fetch', symbol, timeframe, time.perf_counter() - started)
+        if rates is not None:
+            # The incremental view changes on the next fetch; the consumer gets its own copy
+            await queue.put(np.array(rates))
+
+    async def close(self):
+        """Stop the clock driver and the executor."""
+        if self._driver is not None:
+            self._driver.cancel()
+            try:
+                await self._driver
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=False, cancel_futures=True)
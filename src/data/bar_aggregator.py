@@ -0,0 +1,170 @@
+"""
+Streaming aggregation of ticks or M1 bars into bars of several timeframes.
+"""
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+from data.bars import RATES_DTYPE, TIMEFRAME_SECONDS, bar_open_time
+from data.ring_buffer import BarRingBuffer
+
+
+BarCloseCallback = Callable[[str, str, np.void], None]
+
+
+class BarAggregator:
+    """
+    Keeps OHLCV bars of every timeframe of one symbol up to date from a
+    single feed.
+
+    Bars are bucketed like the terminal does: a bar opens at a multiple of
+    its period (server time; weekly bars on Sunday) and closes when the first tick of a later
+    bucket arrives, or when advance() is called past its end. Updates that
+    arrive after their bar closed are dropped. Closed bars are kept in a
+    ring buffer per timeframe and announced to the registered bar-close
+    callbacks in close-time order.
+    """
+
+    def __init__(self, symbol: str,
+                 timeframes: Sequence[str] = ('M1', 'M5', 'M15', 'M30', 'H1', 'H4', 'D1'),
+                 capacity: int = 5000, point: Optional[float] = None):
+        """
+        Args:
+            symbol: Symbol the feed belongs to (passed to callbacks)
+            timeframes: Timeframes to build
+            capacity: Closed bars kept per timeframe
+            point: Symbol point size; when given, tick spreads are recorded in points
+        """
+        unknown = [tf for tf in timeframes if tf not in TIMEFRAME_SECONDS]
+        if unknown:
+            raise ValueError(f"Unsupported timeframes: {unknown}")
+
+        self.symbol = symbol
+        self.timeframes = sorted(timeframes, key=TIMEFRAME_SECONDS.get)
+        self.point = point
+        self._closed = {tf: BarRingBuffer(capacity) for tf in self.timeframes}
+        self._forming: Dict[str, Optional[np.ndarray]] = {tf: None for tf in self.timeframes}
+        self._callbacks: List[BarCloseCallback] = []
+
+    def on_bar_close(self, callback: BarCloseCallback):
+        """Register callback(symbol, timeframe, bar) for every closed bar."""
+        self._callbacks.append(callback)
+
+    def bars(self, timeframe: str, count: Optional[int] = None) -> np.ndarray:
+        """Read-only contiguous rates view of the newest closed bars."""
+        return self._closed[timeframe].view(count)
+
+    def forming(self, timeframe: str) -> Optional[np.void]:
+        """The bar that is still forming, or None before the first update."""
+        bar = self._forming[timeframe]
+        return None if bar is None else bar[0].copy()
+
+    def update_tick(self, time: int, bid: float, ask: Optional[float] = None, volume: int = 1) -> int:
+        """Add one tick (time in epoch seconds). Returns the number of bars closed."""
+        ticks = np.array([(time, bid, bid if ask is None else ask)],
+                         dtype=[('time', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+        return self.update_ticks(ticks, volume=np.array([volume]))
+
+    def update_ticks(self, ticks: np.ndarray, volume: Optional[np.ndarray] = None) -> int:
+        """
+        Add a batch of ticks in time order (fields time and bid, optionally ask).
+
+        Bars are built from bid prices; tick volume counts ticks unless
+        volume is given. Returns the number of bars closed.
+        """
+        if len(ticks) == 0:
+            return 0
+        bid = np.asarray(ticks['bid'], dtype=np.float64)
+        if volume is None:
+            volume = np.ones(len(ticks), dtype=np.uint64)
+        spread = np.zeros(len(ticks), dtype=np.int32)
+        if self.point and 'ask' in ticks.dtype.names:
+            spread = np.rint((ticks['ask'] - bid) / self.point).astype(np.int32)
+        return self._ingest(np.asarray(ticks['time'], dtype=np.int64), bid, bid, bid, bid,
+                            np.asarray(volume, dtype=np.uint64), spread)
+
+    def update_bars(self, rates: np.ndarray) -> int:
+        """
+        Add closed bars of a shorter timeframe (normally M1) in time order.
+
+        Passing the still-forming bar would count its volume twice once it
+        is passed again, so only closed bars should be fed. Returns the
+        number of bars closed.
+        """
+        if len(rates) == 0:
+            return 0
+        return self._ingest(np.asarray(rates['time'], dtype=np.int64), rates['open'], rates['high'],
+                            rates['low'], rates['close'], np.asarray(rates['tick_volume'], dtype=np.uint64),
+                            np.asarray(rates['spread'], dtype=np.int32))
+
+    def advance(self, now: int) -> int:
+        """Close forming bars whose period has ended by `now` without a newer tick."""
+        events = []
+        for rank, tf in enumerate(self.timeframes):
+            bar = self._forming[tf]
+            if bar is not None and bar['time'][0] + TIMEFRAME_SECONDS[tf] <= now:
+                self._closed[tf].append(bar)
+                self._forming[tf] = None
+                events.append((int(bar['time'][0]) + TIMEFRAME_SECONDS[tf], rank, tf, bar[0]))
+        self._emit(events)
+        return len(events)
+
+    def _ingest(self, time: np.ndarray, open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                close: np.ndarray, volume: np.ndarray, spread: np.ndarray) -> int:
+        """Fold a time-ordered batch into every timeframe with segment reductions."""
+        events = []
+        for rank, tf in enumerate(self.timeframes):
+            period = TIMEFRAME_SECONDS[tf]
+            buckets = bar_open_time(time, tf)
+            forming = self._forming[tf]
+
+            first = 0
+            if forming is not None:
+                # Updates older than the forming bar cannot change anything
+                first = int(np.searchsorted(buckets, forming['time'][0], side='left'))
+            elif self._closed[tf].last_time is not None:
+                # Nor can late updates of a bar that advance() already closed
+                first = int(np.searchsorted(buckets, self._closed[tf].last_time, side='right'))
+            if first == len(buckets):
+                continue
+
+            b = buckets[first:]
+            starts = np.r_[0, np.flatnonzero(b[1:] != b[:-1]) + 1]
+            lasts = np.r_[starts[1:] - 1, len(b) - 1]
+
+            new = np.zeros(len(starts), dtype=RATES_DTYPE)
+            new['time'] = b[starts]
+            new['open'] = open_[first:][starts]
+            new['high'] = np.maximum.reduceat(high[first:], starts)
+            new['low'] = np.minimum.reduceat(low[first:], starts)
+            new['close'] = close[first:][lasts]
+            new['tick_volume'] = np.add.reduceat(volume[first:], starts)
+            new['spread'] = np.minimum.reduceat(spread[first:], starts)
+
+            if forming is not None and forming['time'][0] == new['time'][0]:
+                new['open'][0] = forming['open'][0]
+                new['high'][0] = max(new['high'][0], forming['high'][0])
+                new['low'][0] = min(new['low'][0], forming['low'][0])
+                new['tick_volume'][0] += forming['tick_volume'][0]
+                new['spread'][0] = min(new['spread'][0], forming['spread'][0])
+                closed = new[:-1]
+            elif forming is not None:
+                closed = np.concatenate([forming, new[:-1]])
+            else:
+                closed = new[:-1]
+
+            self._forming[tf] = new[-1:].copy()
+            if len(closed):
+                self._closed[tf].append(closed)
+                events.extend((int(bar['time']) + period, rank, tf, bar) for bar in closed)
+
+        self._emit(events)
+        return len(events)
+
+    def _emit(self, events: list):
+        """Call the bar-close callbacks in close-time order (shorter timeframes first)."""
+        if not self._callbacks:
+            return
+        events.sort(key=lambda e: (e[0], e[1]))
+        for _, _, tf, bar in events:
+            for callback in self._callbacks:
+                callback(self.symbol, tf, bar)
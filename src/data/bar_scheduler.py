@@ -0,0 +1,85 @@
+"""
+Run jobs right after bars close instead of on fixed polling intervals.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from data.bars import TIMEFRAME_SECONDS, WEEK_ORIGIN
+
+
+def next_bar_close(now: float, timeframe: str) -> int:
+    """Close time of the bar of timeframe that is open at `now` (epoch seconds)."""
+    period = TIMEFRAME_SECONDS[timeframe]
+    origin = WEEK_ORIGIN if timeframe == 'W1' else 0
+    return int((now - origin) // period + 1) * period + origin
+
+
+def last_bar_close(now: float, timeframe: str) -> int:
+    """Close time of the most recent bar of timeframe that closed at or before `now`."""
+    return next_bar_close(now, timeframe) - TIMEFRAME_SECONDS[timeframe]
+
+
+class BarCloseScheduler:
+    """
+    Fires a job shortly after each bar close of the subscribed timeframes.
+
+    Every (symbol, timeframe) whose bar closes at the same moment goes into
+    one batch, so at the top of the hour M5, M15, H1 (and maybe H4/D1) run
+    as a single job. The wait before each batch is computed from the
+    connector's clock against the absolute close time, so late wake-ups and
+    slow jobs never accumulate drift; closes that pass while a job is still
+    running are skipped, not queued.
+
+    The connector supplies the clock (now() in broker server time, in which
+    bar times are quoted) and the waiting (wait()), so the same schedule
+    runs live and against a ReplayConnector's simulated clock.
+    """
+
+    def __init__(self, subscriptions: Iterable[Tuple[str, str]], delay: float = 2.0):
+        """
+        Args:
+            subscriptions: (symbol, timeframe) pairs to schedule
+            delay: Seconds after the close before the job runs, so the
+                terminal has the closed bar
+        """
+        self.subscriptions = list(dict.fromkeys((s, tf.upper()) for s, tf in subscriptions))
+        unknown = sorted({tf for _, tf in self.subscriptions if tf not in TIMEFRAME_SECONDS})
+        if unknown:
+            raise ValueError(f"Unsupported timeframes: {unknown}")
+        if not self.subscriptions:
+            raise ValueError("Nothing to schedule")
+        self.delay = delay
+        self.timeframes = sorted({tf for _, tf in self.subscriptions}, key=TIMEFRAME_SECONDS.get)
+
+    def next_batch(self, now: float) -> Tuple[int, List[Tuple[str, str]]]:
+        """Next close time after `now` and the subscriptions whose bar closes then."""
+        closes: Dict[str, int] = {tf: next_bar_close(now, tf) for tf in self.timeframes}
+        close = min(closes.values())
+        return close, [(s, tf) for s, tf in self.subscriptions if closes[tf] == close]
+
+    def run(self, connector, job: Callable[[int, List[Tuple[str, str]]], None],
+            max_batches: Optional[int] = None):
+        """
+        Call job(close_time, batch) after every bar close until the
+        connector's wait() reports that no more data will come.
+
+        Args:
+            connector: Object with now() and wait(seconds), e.g. MT5Connector
+            job: Receives the close time and the (symbol, timeframe) batch
+            max_batches: Stop after this many jobs
+        """
+        runs = 0
+        last_close = None
+        while max_batches is None or runs < max_batches:
+            now = connector.now()
+            close, batch = self.next_batch(now - self.delay)
+
+            if last_close is not None:
+                missed = (close - last_close) // TIMEFRAME_SECONDS[self.timeframes[0]] - 1
+                if missed > 0:
+                    print(f"⚠️ Skipped {missed} bar close(s) of {self.timeframes[0]} while busy")
+
+            if not connector.wait(max(0.0, close + self.delay - now)):
+                break
+            job(close, batch)
+            last_close = close
+            runs += 1
@@ -0,0 +1,223 @@
+"""
+Local on-disk store of bar history.
+
+Bars are partitioned by symbol, timeframe and calendar month:
+
+    <root>/<SYMBOL>/<TF>/<YYYY-MM>/<field>.bin   raw little-endian column
+    <root>/<SYMBOL>/<TF>/index.json              partition range index
+
+Columns are appended in place and read back through np.memmap, so a range
+query only opens the partitions whose time range overlaps it and only the
+pages it touches are loaded.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import numpy as np
+
+from data.bars import BarArrays, RATES_DTYPE
+
+
+TimeLike = Union[datetime, np.datetime64, int]
+
+
+def _epoch(value: Optional[TimeLike]) -> Optional[int]:
+    """Convert a query bound to epoch seconds."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, np.datetime64):
+        return int(value.astype('datetime64[s]').astype(np.int64))
+    return int(value)
+
+
+_PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+
+def _widen_prices(values: np.ndarray, digits: Optional[int]) -> np.ndarray:
+    """Prices as float64 without float32 representation noise."""
+    if digits is not None:
+        return np.round(values.astype(np.float64), digits)
+    if values.dtype == np.float32:
+        return values.astype(str).astype(np.float64)
+    return values
+
+
+class BarStore:
+    """
+    Append-only, month-partitioned columnar bar history.
+
+    The index is the source of truth for how many rows each partition has;
+    column bytes beyond that (left by an interrupted write) are ignored on
+    read and truncated before the next append. It is reloaded whenever the
+    file changes, so a reader sees the rows another process appends.
+    """
+
+    def __init__(self, root: str = 'data/bars'):
+        self.root = Path(root)
+        self._indexes: Dict[tuple, tuple] = {}  # key -> (file stamp, index)
+
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / symbol / timeframe.upper()
+
+    @staticmethod
+    def _stamp(path: Path) -> Optional[tuple]:
+        """(mtime, size, inode) of a file, or None if it does not exist."""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _index(self, symbol: str, timeframe: str) -> Dict:
+        """Partition index for (symbol, timeframe), cached until the file changes."""
+        key = (symbol, timeframe.upper())
+        path = self._dir(symbol, timeframe) / 'index.json'
+        stamp = self._stamp(path)
+        cached = self._indexes.get(key)
+        if cached is None or cached[0] != stamp:
+            if stamp is None:
+                index = {'partitions': []}
+            else:
+                with open(path, 'r') as f:
+                    index = json.load(f)
+            cached = self._indexes[key] = (stamp, index)
+        return cached[1]
+
+    def _save_index(self, symbol: str, timeframe: str, index: Dict):
+        """Write the index atomically so readers never see a partial file."""
+        path = self._dir(symbol, timeframe) / 'index.json'
+        tmp = path.with_suffix(f'.json.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, path)
+        self._indexes[(symbol, timeframe.upper())] = (self._stamp(path), index)
+
+    def symbols(self) -> List[str]:
+        """Symbols with stored history."""
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def timeframes(self, symbol: str) -> List[str]:
+        """Timeframes stored for a symbol."""
+        path = self.root / symbol
+        if not path.exists():
+            return []
+        return sorted(p.name for p in path.iterdir() if (p / 'index.json').exists())
+
+    def time_range(self, symbol: str, timeframe: str) -> Optional[tuple]:
+        """(first, last) bar open time in epoch seconds, or None when empty."""
+        partitions = self._index(symbol, timeframe)['partitions']
+        if not partitions:
+            return None
+        return partitions[0]['first'], partitions[-1]['last']
+
+    def append(self, symbol: str, timeframe: str, rates: np.ndarray, digits: Optional[int] = None) -> int:
+        """
+        Append closed bars (an MT5 rates array in time order).
+
+        Bars at or before the newest stored bar are skipped, so overlapping
+        fetches can be passed in as they are. Prices are stored as float64:
+        with digits they are rounded to the symbol's quote precision, and
+        float32 (compact) prices otherwise become the shortest decimal that
+        rounds to them (1.09687, not 1.0968699455). Returns the number of
+        bars written.
+        """
+        index = self._index(symbol, timeframe)
+        partitions = index['partitions']
+        if partitions and len(rates):
+            rates = rates[rates['time'] > partitions[-1]['last']]
+        if len(rates) == 0:
+            return 0
+
+        base = self._dir(symbol, timeframe)
+        months = rates['time'].astype('datetime64[s]').astype('datetime64[M]')
+        bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+        starts = np.r_[0, bounds]
+        ends = np.r_[bounds, len(rates)]
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            chunk = rates[start:end]
+            month = str(months[start])
+            if partitions and partitions[-1]['month'] == month:
+                entry = partitions[-1]
+            else:
+                entry = {'month': month, 'rows': 0, 'first': int(chunk['time'][0]), 'last': 0}
+                partitions.append(entry)
+
+            folder = base / month
+            folder.mkdir(parents=True, exist_ok=True)
+            for name in RATES_DTYPE.names:
+                dtype = RATES_DTYPE[name]
+                column = chunk[name]
+                if name in _PRICE_FIELDS:
+                    column = _widen_prices(column, digits)
+                column = np.ascontiguousarray(column, dtype=dtype)
+                with open(folder / f"{name}.bin", 'ab') as f:
+                    f.truncate(entry['rows'] * dtype.itemsize)
+                    f.write(column.tobytes())
+
+            entry['rows'] += len(chunk)
+            entry['last'] = int(chunk['time'][-1])
+
+        self._save_index(symbol, timeframe, index)
+        return len(rates)
+
+    def _column(self, folder: Path, name: str, rows: int) -> np.ndarray:
+        """Memory-mapped column of one partition."""
+        return np.memmap(folder / f"{name}.bin", dtype=RATES_DTYPE[name], mode='r', shape=(rows,))
+
+    def _ranges(self, symbol: str, timeframe: str, start: Optional[TimeLike],
+                end: Optional[TimeLike]) -> List[tuple]:
+        """(folder, rows, lo, hi) for every partition overlapping [start, end]."""
+        start, end = _epoch(start), _epoch(end)
+        base = self._dir(symbol, timeframe)
+        ranges = []
+        for entry in self._index(symbol, timeframe)['partitions']:
+            if (start is not None and entry['last'] < start) or (end is not None and entry['first'] > end):
+                continue
+            folder = base / entry['month']
+            rows = entry['rows']
+            time = self._column(folder, 'time', rows)
+            lo = 0 if start is None else int(np.searchsorted(time, start, side='left'))
+            hi = rows if end is None else int(np.searchsorted(time, end, side='right'))
+            if hi > lo:
+                ranges.append((folder, rows, lo, hi))
+        return ranges
+
+    def read(self, symbol: str, timeframe: str, start: Optional[TimeLike] = None,
+             end: Optional[TimeLike] = None) -> Optional[BarArrays]:
+        """
+        Bars with open time in [start, end] as BarArrays (epoch-second times).
+
+        Reads within one partition are views of the memory-mapped columns;
+        ranges spanning several months concatenate the selected rows.
+        Returns None if nothing is stored in the range.
+        """
+        names = ('time', 'open', 'high', 'low', 'close', 'tick_volume')
+        pieces = [{name: np.asarray(self._column(folder, name, rows)[lo:hi]) for name in names}
+                  for folder, rows, lo, hi in self._ranges(symbol, timeframe, start, end)]
+        if not pieces:
+            return None
+
+        if len(pieces) == 1:
+            columns = pieces[0]
+        else:
+            columns = {name: np.concatenate([p[name] for p in pieces]) for name in names}
+        return BarArrays(columns['time'], columns['open'], columns['high'], columns['low'],
+                         columns['close'], columns['tick_volume'])
+
+    def read_rates(self, symbol: str, timeframe: str, start: Optional[TimeLike] = None,
+                   end: Optional[TimeLike] = None) -> np.ndarray:
+        """Like read(), but as an MT5 rates array with all fields (always a copy)."""
+        parts = []
+        for folder, rows, lo, hi in self._ranges(symbol, timeframe, start, end):
+            part = np.empty(hi - lo, dtype=RATES_DTYPE)
+            for name in RATES_DTYPE.names:
+                part[name] = self._column(folder, name, rows)[lo:hi]
+            parts.append(part)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=RATES_DTYPE)
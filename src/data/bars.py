@@ -0,0 +1,269 @@
+"""
+Array representation of OHLCV bars shared by the connector and analyzers.
+
+Analyzers accept a pandas DataFrame, the structured array returned by
+MetaTrader5's copy_rates_* functions, or a BarArrays instance. All three are
+normalized to BarArrays, which only holds column views, so no bar data is
+copied on the way into the analysis kernels.
+"""
+from typing import Optional, Union
+import numpy as np
+import pandas as pd
+
+
+# Layout of the arrays returned by mt5.copy_rates_from_pos / copy_rates_from / copy_rates_range
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+# Compact layout for long resident histories: float32 prices and 32-bit counters,
+# 36 instead of 60 bytes per bar.
+#
+# Accuracy: float32 keeps 24 significant bits, so a stored price p is within
+# p * 2**-24 (about 6e-8 relative) of its float64 value. That is below half a
+# point for any quote with fewer than 2**23 (about 8.4 million) points, e.g.
+# EURUSD at 1.10000 (110000 points) or USDJPY at 150.000 (150000 points), so
+# rounding to the quote digits recovers every price exactly. Derived series
+# are accumulated in float64 and rounded once to float32, so a mean or EMA is
+# within 2 * p * 2**-24 of its float64 value. Differences of prices (ranges,
+# deviations, pip moves) carry the same absolute error, about 0.0013 pip on
+# EURUSD, which is large relative to a small deviation but far below any
+# threshold the analyzers use. Only decisions that fall within that distance
+# of a threshold (e.g. a move of exactly 20.0 pips) can differ from float64.
+COMPACT_RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('close', '<f4'),
+    ('tick_volume', '<u4'),
+    ('spread', '<i4'),
+    ('real_volume', '<u4'),
+])
+
+# Bar length of each fixed-size MT5 timeframe (MN1 has no fixed length)
+TIMEFRAME_SECONDS = {
+    'M1': 60,
+    'M5': 300,
+    'M15': 900,
+    'M30': 1800,
+    'H1': 3600,
+    'H4': 14400,
+    'D1': 86400,
+    'W1': 604800,
+}
+
+# MT5 weekly bars open on Sunday; the epoch started on a Thursday
+WEEK_ORIGIN = 3 * 86400
+
+
+def bar_open_time(time, timeframe: str):
+    """Open time of the timeframe bar containing each epoch-second time."""
+    period = TIMEFRAME_SECONDS[timeframe]
+    origin = WEEK_ORIGIN if timeframe == 'W1' else 0
+    return time - (time - origin) % period
+
+
+def compact_rates(rates: np.ndarray) -> np.ndarray:
+    """Copy of an MT5 rates array in COMPACT_RATES_DTYPE (volumes saturate at 2**32-1)."""
+    out = np.empty(len(rates), dtype=COMPACT_RATES_DTYPE)
+    for name in COMPACT_RATES_DTYPE.names:
+        values = rates[name]
+        if name.endswith('volume'):
+            values = np.minimum(values, np.iinfo(np.uint32).max)
+        out[name] = values
+    return out
+
+
+def to_points(prices, digits: int, dtype=np.int32) -> np.ndarray:
+    """
+    Prices as integer points (price * 10**digits, rounded).
+
+    Falls back to int64 when a value does not fit dtype.
+    """
+    points = np.rint(np.asarray(prices, dtype=np.float64) * 10.0 ** digits)
+    if np.dtype(dtype).itemsize < 8 and len(points) and np.abs(points).max() > np.iinfo(dtype).max:
+        dtype = np.int64
+    return points.astype(dtype)
+
+
+def to_prices(points, digits: int):
+    """
+    Integer points back to float prices.
+
+    Dividing by the exact power of ten gives the float nearest to the quoted
+    decimal, i.e. the same value the terminal reports for the price.
+    """
+    return np.asarray(points) / 10.0 ** digits
+
+
+class BarArrays:
+    """
+    Column views of a bar series.
+
+    time holds datetime64 values when built from a DataFrame 'timestamp'
+    column and int64 epoch seconds when built from MT5 rates. labels are the
+    per-bar labels reported in results (the DataFrame index, or the epoch
+    seconds for raw arrays).
+
+    When digits is set, open/high/low/close are fixed-point integers in
+    points (price * 10**digits, see to_points). Equal prices then compare
+    exactly, and the OHLC columns take half the memory as int32. Analyzers
+    run their pivot, pattern and pip logic on the integers and convert with
+    price() only for the values they report.
+    """
+
+    __slots__ = ('time', 'open', 'high', 'low', 'close', 'volume', 'labels', 'digits')
+
+    def __init__(self, time: Optional[np.ndarray], open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: Optional[np.ndarray] = None,
+                 labels=None, digits: Optional[int] = None):
+        self.time = time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.labels = labels if labels is not None else time
+        self.digits = digits
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @classmethod
+    def from_rates(cls, rates: np.ndarray) -> 'BarArrays':
+        """Field views over an MT5 rates (or compatible structured) array."""
+        names = rates.dtype.names
+        if 'tick_volume' in names:
+            volume = rates['tick_volume']
+        elif 'volume' in names:
+            volume = rates['volume']
+        else:
+            volume = None
+        time = rates['time'] if 'time' in names else None
+        return cls(time, rates['open'], rates['high'], rates['low'], rates['close'], volume)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'BarArrays':
+        """Column arrays of a DataFrame with open/high/low/close[/timestamp/volume]."""
+        time = df['timestamp'].to_numpy() if 'timestamp' in df.columns else None
+        volume = df['volume'].to_numpy() if 'volume' in df.columns else None
+        return cls(time, df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+                   df['close'].to_numpy(), volume, labels=df.index)
+
+    def slice(self, start: Optional[int] = None, stop: Optional[int] = None) -> 'BarArrays':
+        """Views over bars [start, stop)."""
+        window = slice(start, stop)
+        return BarArrays(
+            None if self.time is None else self.time[window],
+            self.open[window], self.high[window], self.low[window], self.close[window],
+            None if self.volume is None else self.volume[window],
+            None if self.labels is None else self.labels[window],
+            self.digits,
+        )
+
+    def take(self, idx) -> 'BarArrays':
+        """Bars selected by an index array or boolean mask (copies)."""
+        return BarArrays(
+            None if self.time is None else self.time[idx],
+            self.open[idx], self.high[idx], self.low[idx], self.close[idx],
+            None if self.volume is None else self.volume[idx],
+            None if self.labels is None else self.labels[idx],
+            self.digits,
+        )
+
+    def to_points(self, digits: int, dtype=np.int32) -> 'BarArrays':
+        """Bars with fixed-point OHLC at the symbol's quote digits (copies the prices)."""
+        if self.digits is not None:
+            if self.digits == digits:
+                return self
+            return self.to_prices().to_points(digits, dtype)
+        return BarArrays(self.time, to_points(self.open, digits, dtype), to_points(self.high, digits, dtype),
+                         to_points(self.low, digits, dtype), to_points(self.close, digits, dtype),
+                         self.volume, self.labels, digits)
+
+    def downcast(self) -> 'BarArrays':
+        """Bars with float32 prices and uint32 volume (see COMPACT_RATES_DTYPE for the accuracy)."""
+        if self.digits is not None:
+            return self
+        volume = self.volume
+        if volume is not None and volume.dtype.itemsize > 4:
+            volume = np.minimum(volume, np.iinfo(np.uint32).max).astype(np.uint32)
+        return BarArrays(self.time, self.open.astype(np.float32, copy=False),
+                         self.high.astype(np.float32, copy=False), self.low.astype(np.float32, copy=False),
+                         self.close.astype(np.float32, copy=False), volume, self.labels)
+
+    def to_prices(self) -> 'BarArrays':
+        """Bars with float OHLC; returns self when the prices already are floats."""
+        if self.digits is None:
+            return self
+        return BarArrays(self.time, self.price(self.open), self.price(self.high),
+                         self.price(self.low), self.price(self.close), self.volume, self.labels)
+
+    def price(self, values):
+        """Price value(s) of this series as floats (unchanged unless fixed-point)."""
+        if self.digits is None:
+            return values
+        return to_prices(values, self.digits)
+
+    def epoch_seconds(self) -> Optional[np.ndarray]:
+        """Bar times as int64 epoch seconds, whatever their stored type."""
+        if self.time is None:
+            return None
+        if self.time.dtype.kind == 'M':
+            return self.time.astype('datetime64[s]').astype(np.int64)
+        return self.time.astype(np.int64, copy=False)
+
+    def label_at(self, idx: int):
+        """Result label for bar idx (index label or epoch seconds)."""
+        label = self.labels[idx] if self.labels is not None else idx
+        if isinstance(label, np.datetime64):
+            return pd.Timestamp(label)
+        return label.item() if isinstance(label, np.generic) else label
+
+    def timestamp_at(self, idx: int):
+        """Timestamp of bar idx as pd.Timestamp, or int epoch seconds for raw arrays."""
+        value = self.time[idx]
+        return pd.Timestamp(value) if isinstance(value, np.datetime64) else int(value)
+
+    def timestamps(self, idx: np.ndarray) -> list:
+        """Timestamps of several bars, converted like timestamp_at."""
+        values = self.time[idx]
+        if values.dtype.kind == 'M':
+            return list(pd.DatetimeIndex(values))
+        return values.tolist()
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame in the layout returned by MT5Connector.get_live_data."""
+        data = {}
+        if self.time is not None:
+            data['timestamp'] = (pd.to_datetime(self.time, unit='s')
+                                 if self.time.dtype.kind in 'iu' else self.time)
+        bars = self.to_prices()
+        data.update(open=bars.open, high=bars.high, low=bars.low, close=bars.close)
+        if self.volume is not None:
+            data['volume'] = self.volume
+        return pd.DataFrame(data)
+
+
+BarData = Union[pd.DataFrame, np.ndarray, BarArrays]
+
+
+def as_bar_arrays(data: BarData) -> BarArrays:
+    """Normalize any supported bar representation to BarArrays without copying."""
+    if isinstance(data, BarArrays):
+        return data
+    if isinstance(data, np.ndarray):
+        if data.dtype.names is None:
+            raise TypeError("Bar arrays must be structured with open/high/low/close fields")
+        return BarArrays.from_rates(data)
+    if isinstance(data, pd.DataFrame):
+        return BarArrays.from_frame(data)
+    raise TypeError(f"Unsupported bar data type: {type(data).__name__}")
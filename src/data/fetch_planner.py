@@ -0,0 +1,68 @@
+"""
+Works out how many bars to request for each symbol and timeframe.
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data.bars import TIMEFRAME_SECONDS
+
+
+class FetchPlanner:
+    """
+    Sizes bar requests from the analyzers' warm-up and the configured lookback.
+
+    Every fetch gets the lookback window that is analyzed (the
+    analysis_settings.lookback_periods of config/pairs.json) plus the
+    longest warm-up any analyzer needs before its first result is valid.
+    Timeframes without a configured lookback cover the same time span as
+    the configured ones. With max_bars, no request exceeds that hard limit.
+    """
+
+    def __init__(self, analyzers: Iterable, lookback_periods: Optional[Dict[str, int]] = None,
+                 default_bars: int = 200, max_bars: Optional[int] = None):
+        """
+        Args:
+            analyzers: Objects with a warmup_bars() method
+            lookback_periods: Bars to analyze per timeframe
+            default_bars: Fetch size when no lookback is configured at all
+            max_bars: Hard limit on the bars kept per symbol and timeframe
+        """
+        self.analyzers = list(analyzers)
+        self.lookback_periods = dict(lookback_periods or {})
+        self.default_bars = default_bars
+        self.max_bars = max_bars
+
+    @classmethod
+    def from_config(cls, config: Dict, analyzers: Iterable) -> 'FetchPlanner':
+        """Planner using the lookback periods and history limit of a pairs.json config."""
+        settings = config.get('analysis_settings', {})
+        return cls(analyzers, settings.get('lookback_periods'), max_bars=settings.get('max_history_bars'))
+
+    def warmup(self) -> int:
+        """Longest warm-up of the registered analyzers."""
+        return max((a.warmup_bars() for a in self.analyzers), default=0)
+
+    def lookback(self, timeframe: str) -> Optional[int]:
+        """Bars to analyze on timeframe, or None if nothing is configured."""
+        timeframe = timeframe.upper()
+        if timeframe in self.lookback_periods:
+            return self.lookback_periods[timeframe]
+
+        spans = [bars * TIMEFRAME_SECONDS[tf] for tf, bars in self.lookback_periods.items()
+                 if tf in TIMEFRAME_SECONDS]
+        if not spans or timeframe not in TIMEFRAME_SECONDS:
+            return None
+        return max(1, math.ceil(max(spans) / TIMEFRAME_SECONDS[timeframe]))
+
+    def bars_for(self, timeframe: str) -> int:
+        """Number of bars to request on timeframe."""
+        lookback = self.lookback(timeframe)
+        if lookback is None:
+            bars = max(self.default_bars, self.warmup())
+        else:
+            bars = lookback + self.warmup()
+        return bars if self.max_bars is None else min(bars, self.max_bars)
+
+    def plan(self, symbols: List[str], timeframes: List[str]) -> Dict[Tuple[str, str], int]:
+        """Bars to request for every (symbol, timeframe)."""
+        return {(symbol, tf): self.bars_for(tf) for symbol in symbols for tf in timeframes}
@@ -1,19 +1,62 @@
 """
 MetaTrader 5 connector for live forex data.
 """
-import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Set, Tuple, Union
+import threading
 import time
 
+from data.bar_aggregator import BarAggregator
+from data.bar_scheduler import BarCloseScheduler
+from data.bar_store import BarStore
+from data.bars import COMPACT_RATES_DTYPE, RATES_DTYPE, compact_rates
+from data.fetch_planner import FetchPlanner
+from data.ring_buffer import BarRingBuffer
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:  # Windows-only package; pass a compatible module to MT5Connector instead
+    mt5 = None
+
 
 class MT5Connector:
     """Connect to MT5 and fetch live forex data."""
     
-    def __init__(self):
+    # The newest bar returned by get_live_data is still forming
+    serves_forming_bar = True
+    
+    def __init__(self, buffer_capacity: int = 5000, mt5_module=None, bar_store: BarStore = None,
+                 fetch_planner: FetchPlanner = None, compact: bool = False,
+                 max_bars: Optional[int] = None):
+        """
+        Args:
+            buffer_capacity: Bars kept per (symbol, timeframe) for incremental fetches
+            mt5_module: Module exposing the MetaTrader5 API (defaults to MetaTrader5)
+            bar_store: Store that every fetched closed bar is appended to
+            fetch_planner: Sizes stream_live_data requests (default: 200 bars)
+            compact: Return and buffer bars as float32 prices and 32-bit
+                counters (data.bars.COMPACT_RATES_DTYPE)
+            max_bars: Hard limit on the bars fetched and buffered per
+                (symbol, timeframe); larger requests are cut to it, so the
+                buffers of a long-running monitor never grow past
+                buffer_ceiling() each
+        """
+        self.mt5 = mt5_module if mt5_module is not None else mt5
+        self.bar_store = bar_store
+        self.fetch_planner = fetch_planner
+        self.compact = compact
+        self.max_bars = max_bars
+        self.server_offset = 0  # Broker server time minus UTC, in seconds (see sync_server_time)
         self.connected = False
         self.account_info = None
+        self.buffer_capacity = buffer_capacity
+        self._buffers: Dict[Tuple[str, str], BarRingBuffer] = {}
+        # Buffers holding all the history the terminal had when loaded
+        self._exhausted: Set[Tuple[str, str]] = set()
+        # Held while buffers change, so buffered_bars() can run beside fetch threads
+        self._buffer_lock = threading.Lock()
     
     def connect(self, login: Optional[int] = None, password: Optional[str] = None, 
                 server: Optional[str] = None) -> bool:
@@ -28,24 +71,28 @@ class MT5Connector:
         Returns:
             bool: True if connected successfully
         """
+        if self.mt5 is None:
+            print("❌ MetaTrader5 package not installed (pip install MetaTrader5, Windows only)")
+            return False
+        
         # Initialize MT5
-        if not mt5.initialize():
-            print(f"❌ MT5 initialization failed: {mt5.last_error()}")
+        if not self.mt5.initialize():
+            print(f"❌ MT5 initialization failed: {self.mt5.last_error()}")
             return False
         
         # Login if credentials provided
         if login and password and server:
-            if not mt5.login(login, password, server):
-                print(f"❌ MT5 login failed: {mt5.last_error()}")
-                mt5.shutdown()
+            if not self.mt5.login(login, password, server):
+                print(f"❌ MT5 login failed: {self.mt5.last_error()}")
+                self.mt5.shutdown()
                 return False
             print(f"✅ Logged in to account #{login}")
         
         # Get account info
-        self.account_info = mt5.account_info()
+        self.account_info = self.mt5.account_info()
         if self.account_info is None:
-            print(f"❌ Failed to get account info: {mt5.last_error()}")
-            mt5.shutdown()
+            print(f"❌ Failed to get account info: {self.mt5.last_error()}")
+            self.mt5.shutdown()
             return False
         
         self.connected = True
@@ -67,7 +114,9 @@ class MT5Connector:
             print(f"Company: {self.account_info.company}")
             print(f"{'='*60}\n")
     
-    def get_live_data(self, symbol: str, timeframe: str, bars: int = 500) -> Optional[pd.DataFrame]:
+    def get_live_data(self, symbol: str, timeframe: str, bars: int = 500,
+                      as_array: bool = False,
+                      incremental: bool = False) -> Optional[Union[pd.DataFrame, np.ndarray]]:
         """
         Get live OHLC data from MT5.
         
@@ -75,9 +124,17 @@ class MT5Connector:
             symbol: Currency pair (e.g., "EURUSD")
             timeframe: Timeframe (M1, M5, M15, H1, H4, D1)
             bars: Number of bars to fetch
+            as_array: Return the terminal's rates array itself (read-only,
+                'time' as int64 epoch seconds) instead of a DataFrame. The
+                analyzers accept it directly; data.bars.as_bar_arrays gives
+                column views over the same buffer.
+            incremental: Keep the bars in a ring buffer for this symbol and
+                timeframe and only request bars from the newest stored one
+                onwards. The array returned with as_array is a view into the
+                buffer and changes on the next incremental fetch.
         
         Returns:
-            DataFrame with OHLC data
+            DataFrame with OHLC data, or the structured rates array
         """
         if not self.connected:
             print("❌ Not connected to MT5. Call connect() first.")
@@ -85,15 +142,15 @@ class MT5Connector:
         
         # Map timeframe string to MT5 constant
         timeframe_map = {
-            'M1': mt5.TIMEFRAME_M1,
-            'M5': mt5.TIMEFRAME_M5,
-            'M15': mt5.TIMEFRAME_M15,
-            'M30': mt5.TIMEFRAME_M30,
-            'H1': mt5.TIMEFRAME_H1,
-            'H4': mt5.TIMEFRAME_H4,
-            'D1': mt5.TIMEFRAME_D1,
-            'W1': mt5.TIMEFRAME_W1,
-            'MN1': mt5.TIMEFRAME_MN1
+            'M1': self.mt5.TIMEFRAME_M1,
+            'M5': self.mt5.TIMEFRAME_M5,
+            'M15': self.mt5.TIMEFRAME_M15,
+            'M30': self.mt5.TIMEFRAME_M30,
+            'H1': self.mt5.TIMEFRAME_H1,
+            'H4': self.mt5.TIMEFRAME_H4,
+            'D1': self.mt5.TIMEFRAME_D1,
+            'W1': self.mt5.TIMEFRAME_W1,
+            'MN1': self.mt5.TIMEFRAME_MN1
         }
         
         mt5_timeframe = timeframe_map.get(timeframe.upper())
@@ -101,28 +158,134 @@ class MT5Connector:
             print(f"❌ Invalid timeframe: {timeframe}")
             return None
         
+        if self.max_bars is not None:
+            bars = min(bars, self.max_bars)
+        
         # Get rates
-        rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, bars)
+        if incremental:
+            rates = self._fetch_incremental(symbol, timeframe.upper(), mt5_timeframe, bars)
+        else:
+            rates = self.mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, bars)
+            if self.compact and rates is not None:
+                rates = compact_rates(rates)
         
         if rates is None or len(rates) == 0:
-            print(f"❌ Failed to get data for {symbol}: {mt5.last_error()}")
+            print(f"❌ Failed to get data for {symbol}: {self.mt5.last_error()}")
             return None
         
-        # Convert to DataFrame
+        if self.bar_store is not None:
+            # The newest bar is still forming, only closed bars are recorded
+            self.bar_store.append(symbol, timeframe.upper(), rates[:-1])
+        
+        if as_array:
+            if rates.flags.writeable:
+                rates.setflags(write=False)
+            print(f"✅ Fetched {len(rates)} bars for {symbol} ({timeframe})")
+            return rates
+        
+        df = self._rates_to_frame(rates)
+        print(f"✅ Fetched {len(df)} bars for {symbol} ({timeframe})")
+        return df
+    
+    @staticmethod
+    def _rates_to_frame(rates: np.ndarray) -> pd.DataFrame:
+        """Convert a rates array to the DataFrame layout used by the analyzers."""
         df = pd.DataFrame(rates)
         df['timestamp'] = pd.to_datetime(df['time'], unit='s')
         df = df[['timestamp', 'open', 'high', 'low', 'close', 'tick_volume']]
         df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-        
-        print(f"✅ Fetched {len(df)} bars for {symbol} ({timeframe})")
         return df
     
+    def _fetch_incremental(self, symbol: str, timeframe: str, mt5_timeframe: int,
+                           bars: int) -> Optional[np.ndarray]:
+        """
+        Update the ring buffer for (symbol, timeframe) and return its newest bars.
+        
+        The first call (or a request for more bars than are buffered) loads the
+        full history; later calls ask the terminal only for bars opened at or
+        after the newest stored bar, which also refreshes that still-forming bar.
+        A terminal with fewer bars than requested is loaded once; its buffer
+        then grows through incremental fetches.
+        """
+        key = (symbol, timeframe)
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.capacity < bars:
+            buffer = BarRingBuffer(self._buffer_capacity(bars), self._rates_dtype())
+            with self._buffer_lock:
+                self._buffers[key] = buffer
+            self._exhausted.discard(key)
+        
+        if len(buffer) < bars and key not in self._exhausted:
+            rates = self.mt5.copy_rates_from_pos(symbol, mt5_timeframe, 0, bars)
+            if rates is None or len(rates) == 0:
+                return None
+            with self._buffer_lock:
+                buffer.clear()
+                buffer.append(rates)
+            if len(rates) < bars:
+                self._exhausted.add(key)
+        else:
+            date_from = datetime.fromtimestamp(buffer.last_time, tz=timezone.utc)
+            # Bar times are in broker server time, which usually runs ahead of UTC
+            date_to = datetime.now(timezone.utc) + timedelta(days=1)
+            rates = self.mt5.copy_rates_range(symbol, mt5_timeframe, date_from, date_to)
+            if rates is None:
+                return None
+            with self._buffer_lock:
+                buffer.append(rates)
+        
+        return buffer.view(bars)
+    
+    def _rates_dtype(self) -> np.dtype:
+        """Record layout of fetched and buffered bars."""
+        return COMPACT_RATES_DTYPE if self.compact else RATES_DTYPE
+    
+    def _buffer_capacity(self, bars: int) -> int:
+        """Ring buffer size for a request of `bars` bars, within max_bars."""
+        capacity = max(self.buffer_capacity, bars)
+        return capacity if self.max_bars is None else min(capacity, self.max_bars)
+    
+    def clear_buffers(self):
+        """Drop all buffered bars so the next incremental fetch reloads history."""
+        self._buffers.clear()
+        self._exhausted.clear()
+
+    def buffered_bars(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """Copies of the bars in every ring buffer, keyed by (symbol, timeframe)."""
+        with self._buffer_lock:
+            return {key: buffer.view().copy() for key, buffer in self._buffers.items() if len(buffer)}
+
+    def restore_buffers(self, bars: Dict[Tuple[str, str], np.ndarray]):
+        """
+        Refill ring buffers from buffered_bars() output, e.g. after a restart.
+
+        The next incremental fetch of a restored pair then only requests the
+        bars from its newest buffered one onwards. Bars in another record
+        layout (compact setting changed) are skipped and reload in full.
+        """
+        for key, rates in bars.items():
+            if rates.dtype != self._rates_dtype() or len(rates) == 0:
+                continue
+            buffer = BarRingBuffer(self._buffer_capacity(len(rates)), self._rates_dtype())
+            buffer.append(rates)
+            self._buffers[key] = buffer
+
+    def buffer_nbytes(self) -> int:
+        """Memory held by the incremental-fetch ring buffers."""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+    
+    def buffer_ceiling(self) -> Optional[int]:
+        """Most memory one (symbol, timeframe) buffer can hold, or None without max_bars."""
+        if self.max_bars is None:
+            return None
+        return 2 * self._buffer_capacity(self.max_bars) * self._rates_dtype().itemsize
+    
     def get_symbol_info(self, symbol: str) -> Optional[Dict]:
         """Get symbol information."""
         if not self.connected:
             return None
         
-        info = mt5.symbol_info(symbol)
+        info = self.mt5.symbol_info(symbol)
         if info is None:
             print(f"❌ Symbol {symbol} not found")
             return None
@@ -145,7 +308,7 @@ class MT5Connector:
         if not self.connected:
             return []
         
-        symbols = mt5.symbols_get()
+        symbols = self.mt5.symbols_get()
         if symbols is None:
             return []
         
@@ -158,7 +321,7 @@ class MT5Connector:
         if not self.connected:
             return None
         
-        tick = mt5.symbol_info_tick(symbol)
+        tick = self.mt5.symbol_info_tick(symbol)
         if tick is None:
             return None
         
@@ -170,7 +333,27 @@ class MT5Connector:
             'time': datetime.fromtimestamp(tick.time)
         }
     
-    def stream_live_data(self, symbol: str, timeframe: str, callback, interval: int = 60):
+    def now(self) -> int:
+        """Current broker server time in epoch seconds (the clock bar times are quoted in)."""
+        return int(time.time()) + self.server_offset
+    
+    def sync_server_time(self, symbol: str) -> bool:
+        """
+        Set server_offset from the time of the latest tick of symbol.
+        
+        The offset is rounded to the nearest half hour, so this only works
+        while the symbol is trading and its last tick is recent.
+        """
+        if not self.connected:
+            return False
+        tick = self.mt5.symbol_info_tick(symbol)
+        if tick is None:
+            return False
+        self.server_offset = int(round((tick.time - time.time()) / 1800)) * 1800
+        return True
+    
+    def stream_live_data(self, symbol: str, timeframe: str, callback, interval: int = None,
+                         bars: Optional[int] = None):
         """
         Stream live data continuously.
         
@@ -178,26 +361,124 @@ class MT5Connector:
             symbol: Currency pair
             timeframe: Timeframe
             callback: Function to call with new data
-            interval: Update interval in seconds
+            interval: Update interval in seconds (default: right after each bar close)
+            bars: Bars per update (default: from fetch_planner, else 200)
         """
+        if bars is None:
+            bars = self.fetch_planner.bars_for(timeframe) if self.fetch_planner else 200
+        
         print(f"🔄 Starting live data stream for {symbol} ({timeframe})")
-        print(f"   Updates every {interval} seconds. Press Ctrl+C to stop.")
+        if interval is None:
+            print(f"   Updates after every {timeframe} bar close. Press Ctrl+C to stop.")
+        else:
+            print(f"   Updates every {interval} seconds. Press Ctrl+C to stop.")
         
         try:
+            if interval is None:
+                def update(close_time, batch):
+                    data = self.get_live_data(symbol, timeframe, bars=bars, incremental=True)
+                    if data is not None:
+                        callback(data, symbol, timeframe)
+                
+                BarCloseScheduler([(symbol, timeframe)]).run(self, update)
+                print("⏹️ No more data to stream")
+                return
+            
             while True:
-                data = self.get_live_data(symbol, timeframe, bars=200)
+                data = self.get_live_data(symbol, timeframe, bars=bars, incremental=True)
                 if data is not None:
                     callback(data, symbol, timeframe)
                 
-                time.sleep(interval)
+                if not self.wait(interval):
+                    print("⏹️ No more data to stream")
+                    break
         
         except KeyboardInterrupt:
             print("\n⏹️ Live stream stopped by user")
     
+    def get_ticks(self, symbol: str, since_msc: int, count: int = 100000) -> Optional[np.ndarray]:
+        """
+        Get bid/ask ticks newer than since_msc (epoch milliseconds).
+        
+        Returns:
+            Structured tick array (time, bid, ask, ..., time_msc), or None on error
+        """
+        if not self.connected:
+            return None
+        
+        date_from = datetime.fromtimestamp(since_msc / 1000, tz=timezone.utc)
+        ticks = self.mt5.copy_ticks_from(symbol, date_from, count, self.mt5.COPY_TICKS_INFO)
+        if ticks is None:
+            print(f"❌ Failed to get ticks for {symbol}: {self.mt5.last_error()}")
+            return None
+        return ticks[ticks['time_msc'] > since_msc]
+    
+    @staticmethod
+    def _tick_msc(ticks: np.ndarray) -> np.ndarray:
+        """Tick times in epoch milliseconds."""
+        if 'time_msc' in ticks.dtype.names:
+            return ticks['time_msc']
+        return ticks['time'].astype(np.int64) * 1000
+    
+    def _last_tick_msc(self, symbol: str) -> Optional[int]:
+        """Time of the latest tick in epoch milliseconds."""
+        tick = self.mt5.symbol_info_tick(symbol)
+        return None if tick is None else int(tick.time_msc)
+    
+    def stream_bars(self, symbol: str, aggregator: BarAggregator, interval: float = 1.0,
+                    history_bars: int = 0):
+        """
+        Feed a symbol's ticks into a BarAggregator, which builds every
+        timeframe and fires its bar-close callbacks.
+        
+        Args:
+            symbol: Currency pair
+            aggregator: Aggregator receiving the ticks
+            interval: Polling interval in seconds
+            history_bars: Closed M1 bars to seed the aggregator with first
+        """
+        since = self._last_tick_msc(symbol)
+        if since is None:
+            print(f"❌ No ticks available for {symbol}")
+            return
+        
+        if history_bars:
+            forming = 1 if self.serves_forming_bar else 0
+            history = self.get_live_data(symbol, 'M1', history_bars + forming, as_array=True)
+            if history is not None:
+                aggregator.update_bars(history[:len(history) - forming])
+        
+        print(f"🔄 Streaming {symbol} ticks into {', '.join(aggregator.timeframes)} bars")
+        print(f"   Polling every {interval} seconds. Press Ctrl+C to stop.")
+        
+        try:
+            while True:
+                ticks = self.get_ticks(symbol, since)
+                if ticks is not None and len(ticks):
+                    aggregator.update_ticks(ticks)
+                    since = int(self._tick_msc(ticks)[-1])
+                
+                if not self.wait(interval):
+                    print("⏹️ No more data to stream")
+                    break
+        
+        except KeyboardInterrupt:
+            print("\n⏹️ Tick stream stopped by user")
+    
+    def wait(self, seconds: float) -> bool:
+        """
+        Wait before the next update.
+        
+        Returns:
+            bool: False when no further data will arrive
+        """
+        time.sleep(seconds)
+        return True
+    
     def disconnect(self):
         """Disconnect from MT5."""
         if self.connected:
-            mt5.shutdown()
+            self.mt5.shutdown()
             self.connected = False
             print("✅ Disconnected from MT5")
     
@@ -0,0 +1,297 @@
+"""
+Offline replay of recorded MT5 data through the MT5Connector API.
+
+Bars are read from `<data_dir>/<SYMBOL>_<TF>.npy` files holding MT5 rates
+arrays (see export_history) and ticks, when available, from
+`<data_dir>/<SYMBOL>_ticks.npy` with at least time/bid/ask fields. Optional
+symbol properties are read from `<data_dir>/symbols.json`. All files are
+memory-mapped, so replaying long histories for many pairs only touches the
+pages that are actually served.
+"""
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from data.bars import TIMEFRAME_SECONDS, compact_rates
+from data.mt5_connector import MT5Connector
+
+
+class ReplayConnector(MT5Connector):
+    """
+    Serves recorded bars and ticks as if they came from a live terminal.
+
+    The replay clock starts at `start` (default: the first recorded bar) and
+    runs at `speed` times real time. With speed=None it only moves when
+    wait() is called, so stream_live_data and live monitoring run as fast as
+    the analysis allows. Only bars that have closed by the replay clock are
+    served, so no future prices leak into the analysis; unlike the terminal,
+    get_live_data therefore never returns a forming bar.
+    """
+
+    serves_forming_bar = False
+
+    def __init__(self, data_dir: str = 'data/replay', speed: Optional[float] = None,
+                 start: Optional[Union[datetime, int]] = None):
+        """
+        Args:
+            data_dir: Directory with the recorded .npy files
+            speed: Replay seconds per wall-clock second (None = as fast as possible)
+            start: Replay start time (datetime or epoch seconds)
+        """
+        super().__init__()
+        self.data_dir = Path(data_dir)
+        self.speed = speed
+        self.start = int(start.timestamp()) if isinstance(start, datetime) else start
+        self._origin = 0
+        self._end = 0
+        self._skipped = 0.0
+        self._wall_start = 0.0
+        self._rates: Dict[Tuple[str, str], Optional[np.ndarray]] = {}
+        self._ticks: Dict[str, Optional[np.ndarray]] = {}
+        self._symbols: Dict[str, Dict] = {}
+
+    def connect(self, login: Optional[int] = None, password: Optional[str] = None,
+                server: Optional[str] = None) -> bool:
+        """Open the replay data directory; credentials are ignored."""
+        bar_files = [p for p in sorted(self.data_dir.glob('*_*.npy')) if not p.stem.endswith('_ticks')]
+        if not bar_files:
+            print(f"❌ No replay data found in {self.data_dir}")
+            return False
+
+        first_times = []
+        last_times = []
+        for path in bar_files:
+            rates = np.load(path, mmap_mode='r')
+            if len(rates):
+                period = TIMEFRAME_SECONDS.get(path.stem.rsplit('_', 1)[1], 0)
+                first_times.append(int(rates['time'][0]))
+                last_times.append(int(rates['time'][-1]) + period)
+        if not first_times:
+            print(f"❌ Replay data in {self.data_dir} is empty")
+            return False
+
+        symbols_path = self.data_dir / 'symbols.json'
+        if symbols_path.exists():
+            with open(symbols_path, 'r') as f:
+                self._symbols = json.load(f)
+
+        self._origin = self.start if self.start is not None else min(first_times)
+        self._end = max(last_times)
+        self._skipped = 0.0
+        self._wall_start = time.monotonic()
+        self.connected = True
+
+        print(f"\n{'='*60}")
+        print(f"MT5 REPLAY")
+        print(f"{'='*60}")
+        print(f"Data: {self.data_dir} ({len(bar_files)} bar files)")
+        print(f"From: {datetime.fromtimestamp(self._origin)}")
+        print(f"To:   {datetime.fromtimestamp(self._end)}")
+        print(f"Speed: {'as fast as possible' if self.speed is None else f'{self.speed:g}x'}")
+        print(f"{'='*60}\n")
+        return True
+
+    def now(self) -> int:
+        """Current replay time in epoch seconds."""
+        elapsed = 0.0
+        if self.speed is not None:
+            elapsed = (time.monotonic() - self._wall_start) * self.speed
+        return int(self._origin + self._skipped + elapsed)
+
+    def sync_server_time(self, symbol: str) -> bool:
+        """The replay clock already runs in the recorded bar times."""
+        return True
+
+    def wait(self, seconds: float) -> bool:
+        """Let `seconds` of replay time pass; False once the recording is exhausted."""
+        if self.speed is None:
+            self._skipped += seconds
+        else:
+            time.sleep(seconds / self.speed)
+        return self.now() < self._end
+
+    def _load_rates(self, symbol: str, timeframe: str) -> Optional[np.ndarray]:
+        """Memory-mapped rates for (symbol, timeframe), or None if not recorded."""
+        key = (symbol, timeframe)
+        if key not in self._rates:
+            path = self.data_dir / f"{symbol}_{timeframe}.npy"
+            self._rates[key] = np.load(path, mmap_mode='r') if path.exists() else None
+        return self._rates[key]
+
+    def _load_ticks(self, symbol: str) -> Optional[np.ndarray]:
+        """Memory-mapped ticks for symbol, or None if not recorded."""
+        if symbol not in self._ticks:
+            path = self.data_dir / f"{symbol}_ticks.npy"
+            self._ticks[symbol] = np.load(path, mmap_mode='r') if path.exists() else None
+        return self._ticks[symbol]
+
+    def _closed_bars(self, symbol: str, timeframe: str, bars: int) -> Optional[np.ndarray]:
+        """The last `bars` bars of (symbol, timeframe) closed by the replay clock."""
+        rates = self._load_rates(symbol, timeframe)
+        if rates is None:
+            return None
+        period = TIMEFRAME_SECONDS.get(timeframe, 0)
+        end = int(np.searchsorted(rates['time'], self.now() - period, side='right'))
+        return np.asarray(rates[max(0, end - bars):end])
+
+    def get_live_data(self, symbol: str, timeframe: str, bars: int = 500,
+                      as_array: bool = False,
+                      incremental: bool = False) -> Optional[Union[pd.DataFrame, np.ndarray]]:
+        """
+        Get recorded OHLC data up to the replay clock.
+
+        Same arguments and return values as MT5Connector.get_live_data. The
+        array returned with as_array is a read-only view of the memory-mapped
+        file (a compact copy with compact set), so incremental has nothing
+        left to save and is ignored.
+        """
+        if not self.connected:
+            print("❌ Not connected to replay data. Call connect() first.")
+            return None
+
+        if self.max_bars is not None:
+            bars = min(bars, self.max_bars)
+        rates = self._closed_bars(symbol, timeframe.upper(), bars)
+        if rates is None or len(rates) == 0:
+            print(f"❌ No replay data for {symbol} ({timeframe}) at {datetime.fromtimestamp(self.now())}")
+            return None
+        if self.compact:
+            rates = compact_rates(rates)
+            rates.flags.writeable = False
+
+        if as_array:
+            print(f"✅ Fetched {len(rates)} bars for {symbol} ({timeframe})")
+            return rates
+
+        df = self._rates_to_frame(rates)
+        print(f"✅ Fetched {len(df)} bars for {symbol} ({timeframe})")
+        return df
+
+    def get_symbol_info(self, symbol: str) -> Optional[Dict]:
+        """Recorded symbol properties, with defaults for anything not in symbols.json."""
+        if not self.connected:
+            return None
+
+        if symbol not in self.get_available_symbols():
+            print(f"❌ Symbol {symbol} not found")
+            return None
+
+        digits = 3 if 'JPY' in symbol else 5
+        info = {
+            'symbol': symbol,
+            'description': symbol,
+            'point': 10.0 ** -digits,
+            'digits': digits,
+            'spread': 0,
+            'trade_contract_size': 100000.0,
+            'currency_base': symbol[:3],
+            'currency_profit': symbol[3:6],
+        }
+        info.update(self._symbols.get(symbol, {}))
+
+        price = self.get_current_price(symbol)
+        info['bid'] = price['bid'] if price else None
+        info['ask'] = price['ask'] if price else None
+        return info
+
+    def get_available_symbols(self) -> List[str]:
+        """Symbols with recorded bars."""
+        if not self.connected:
+            return []
+        return sorted({p.stem.rsplit('_', 1)[0] for p in self.data_dir.glob('*_*.npy')
+                       if not p.stem.endswith('_ticks')})
+
+    def get_current_price(self, symbol: str) -> Optional[Dict]:
+        """Last recorded tick, or the close of the latest closed bar when no ticks were recorded."""
+        if not self.connected:
+            return None
+
+        now = self.now()
+        ticks = self._load_ticks(symbol)
+        if ticks is not None:
+            idx = int(np.searchsorted(ticks['time'], now, side='right')) - 1
+            if idx < 0:
+                return None
+            bid = float(ticks['bid'][idx])
+            ask = float(ticks['ask'][idx])
+            tick_time = int(ticks['time'][idx])
+        else:
+            timeframe = next((tf for tf in TIMEFRAME_SECONDS if self._load_rates(symbol, tf) is not None), None)
+            if timeframe is None:
+                return None
+            last = self._closed_bars(symbol, timeframe, 1)
+            if len(last) == 0:
+                return None
+            digits = self._symbols.get(symbol, {}).get('digits', 3 if 'JPY' in symbol else 5)
+            bid = float(last['close'][0])
+            ask = bid + int(last['spread'][0]) * 10.0 ** -digits
+            tick_time = int(last['time'][0]) + TIMEFRAME_SECONDS[timeframe]
+
+        return {
+            'symbol': symbol,
+            'bid': bid,
+            'ask': ask,
+            'spread': ask - bid,
+            'time': datetime.fromtimestamp(tick_time)
+        }
+
+    def get_ticks(self, symbol: str, since_msc: int, count: int = 100000) -> Optional[np.ndarray]:
+        """Recorded ticks after since_msc up to the replay clock."""
+        if not self.connected:
+            return None
+        ticks = self._load_ticks(symbol)
+        if ticks is None:
+            print(f"❌ No replay ticks for {symbol}")
+            return None
+        msc = self._tick_msc(ticks)
+        lo = int(np.searchsorted(msc, since_msc, side='right'))
+        hi = int(np.searchsorted(msc, self.now() * 1000, side='right'))
+        return np.asarray(ticks[lo:min(hi, lo + count)])
+
+    def _last_tick_msc(self, symbol: str) -> Optional[int]:
+        """Replay clock in epoch milliseconds (ticks after it have not happened yet)."""
+        return self.now() * 1000 if self._load_ticks(symbol) is not None else None
+
+    def disconnect(self):
+        """Close the replay."""
+        if self.connected:
+            self._rates.clear()
+            self._ticks.clear()
+            self.connected = False
+            print("✅ Replay closed")
+
+
+def export_history(connector: MT5Connector, data_dir: str, symbols: List[str],
+                   timeframes: List[str], bars: int = 100000) -> int:
+    """
+    Record bars from a connected terminal into replay files.
+
+    Returns:
+        int: Number of bar files written
+    """
+    out = Path(data_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    written = 0
+    symbol_info = {}
+    for symbol in symbols:
+        for timeframe in timeframes:
+            rates = connector.get_live_data(symbol, timeframe, bars, as_array=True)
+            if rates is None:
+                continue
+            np.save(out / f"{symbol}_{timeframe.upper()}.npy", np.asarray(rates))
+            written += 1
+
+        info = connector.get_symbol_info(symbol)
+        if info:
+            symbol_info[symbol] = {k: v for k, v in info.items() if k not in ('bid', 'ask')}
+
+    with open(out / 'symbols.json', 'w') as f:
+        json.dump(symbol_info, f, indent=2)
+
+    print(f"✅ Exported {written} bar files to {out}")
+    return written
@@ -0,0 +1,108 @@
+"""
+Derive higher-timeframe bars from one M1 series.
+
+Bars are bucketed like the terminal builds them: each bar opens at a
+multiple of its period (weekly bars on Sunday) and aggregates the M1 bars
+inside it. Buckets are only created where M1 bars exist, so session breaks
+and weekends leave no empty bars behind.
+"""
+from typing import Dict, Iterator, Sequence, Tuple
+import numpy as np
+
+from data.bars import RATES_DTYPE, TIMEFRAME_SECONDS, bar_open_time
+
+
+def bucket_starts(time: np.ndarray, timeframe: str) -> np.ndarray:
+    """Index of the first source bar of every timeframe bucket."""
+    if len(time) == 0:
+        return np.zeros(0, dtype=np.intp)
+    buckets = bar_open_time(time, timeframe)
+    return np.r_[0, np.flatnonzero(buckets[1:] != buckets[:-1]) + 1]
+
+
+def _reduce(rates: np.ndarray, starts: np.ndarray, timeframe: str, out: np.ndarray):
+    """Aggregate the source bars between bucket starts into out."""
+    ends = np.r_[starts[1:], len(rates)]
+    out['time'] = bar_open_time(rates['time'][starts], timeframe)
+    out['open'] = rates['open'][starts]
+    out['high'] = np.maximum.reduceat(rates['high'], starts)
+    out['low'] = np.minimum.reduceat(rates['low'], starts)
+    out['close'] = rates['close'][ends - 1]
+    out['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    out['spread'] = np.minimum.reduceat(rates['spread'], starts)
+    out['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+
+
+def resample(rates: np.ndarray, timeframe: str) -> np.ndarray:
+    """Bars of one timeframe built from a shorter-timeframe rates array."""
+    starts = bucket_starts(rates['time'], timeframe)
+    out = np.empty(len(starts), dtype=RATES_DTYPE)
+    if len(starts):
+        _reduce(rates, starts, timeframe, out)
+    return out
+
+
+class TimeframeSet:
+    """
+    Bars of several timeframes derived from one M1 series.
+
+    All timeframes live in a single contiguous rates buffer; indexing with
+    a timeframe returns a read-only view of its section, so the set can be
+    passed wherever a dict of per-timeframe data is expected. The first M1
+    row of every bar is kept, which maps bars between timeframes without
+    any time arithmetic.
+    """
+
+    def __init__(self, m1: np.ndarray, timeframes: Sequence[str]):
+        """
+        Args:
+            m1: M1 rates array in time order (the newest bar may be forming)
+            timeframes: Timeframes to build; 'M1' stores a copy of the input
+        """
+        unknown = [tf for tf in timeframes if tf not in TIMEFRAME_SECONDS]
+        if unknown:
+            raise ValueError(f"Unsupported timeframes: {unknown}")
+
+        self.timeframes = sorted(set(timeframes), key=TIMEFRAME_SECONDS.get)
+        self.m1_count = len(m1)
+        self._starts: Dict[str, np.ndarray] = {
+            tf: bucket_starts(m1['time'], tf) for tf in self.timeframes
+        }
+
+        self._sections: Dict[str, Tuple[int, int]] = {}
+        offset = 0
+        for tf in self.timeframes:
+            self._sections[tf] = (offset, offset + len(self._starts[tf]))
+            offset += len(self._starts[tf])
+
+        self.buffer = np.empty(offset, dtype=RATES_DTYPE)
+        for tf in self.timeframes:
+            lo, hi = self._sections[tf]
+            if hi > lo:
+                _reduce(m1, self._starts[tf], tf, self.buffer[lo:hi])
+        self.buffer.flags.writeable = False
+
+    def __getitem__(self, timeframe: str) -> np.ndarray:
+        lo, hi = self._sections[timeframe]
+        return self.buffer[lo:hi]
+
+    def __contains__(self, timeframe: str) -> bool:
+        return timeframe in self._sections
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.timeframes)
+
+    def __len__(self) -> int:
+        return len(self.timeframes)
+
+    def m1_index(self, timeframe: str) -> np.ndarray:
+        """First M1 row of every bar of timeframe."""
+        return self._starts[timeframe]
+
+    def bar_of_m1(self, timeframe: str, m1_idx) -> np.ndarray:
+        """Bar of timeframe that contains each M1 row."""
+        return np.searchsorted(self._starts[timeframe], m1_idx, side='right') - 1
+
+    def map_index(self, from_tf: str, to_tf: str, idx) -> np.ndarray:
+        """Bar of to_tf containing the start of each from_tf bar idx."""
+        return self.bar_of_m1(to_tf, self._starts[from_tf][idx])
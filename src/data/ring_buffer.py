@@ -0,0 +1,106 @@
+"""
+Fixed-capacity ring buffer for the most recent bars of one symbol/timeframe.
+"""
+from typing import Optional
+import numpy as np
+
+from data.bars import RATES_DTYPE
+
+
+class BarRingBuffer:
+    """
+    Holds the latest `capacity` bars in time order.
+
+    Every record is written twice, at slot i and slot i + capacity, so the
+    newest bars always form one contiguous slice of the backing array and
+    view() never has to copy.
+    """
+
+    def __init__(self, capacity: int, dtype: np.dtype = RATES_DTYPE):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(2 * capacity, dtype=self.dtype)
+        self._next = 0  # Slot the next bar is written to
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the buffer, independent of how full it is."""
+        return self._data.nbytes
+
+    @property
+    def last_time(self) -> Optional[int]:
+        """Open time of the newest bar, or None when empty."""
+        if self._count == 0:
+            return None
+        return int(self._data['time'][(self._next - 1) % self.capacity])
+
+    @property
+    def first_time(self) -> Optional[int]:
+        """Open time of the oldest bar, or None when empty."""
+        if self._count == 0:
+            return None
+        return int(self._data['time'][(self._next - self._count) % self.capacity])
+
+    def clear(self):
+        """Drop all bars."""
+        self._next = 0
+        self._count = 0
+
+    def append(self, rates: np.ndarray) -> int:
+        """
+        Add bars in time order and return how many new bars were stored.
+
+        A bar with the same open time as the newest stored bar replaces it
+        (the terminal keeps updating the bar that is still forming); bars
+        older than that are ignored.
+        """
+        if len(rates) == 0:
+            return 0
+
+        last_time = self.last_time
+        if last_time is not None:
+            times = rates['time']
+            if times[0] <= last_time:
+                same = np.flatnonzero(times == last_time)
+                if len(same):
+                    self._write((self._next - 1) % self.capacity, rates[same[-1]:same[-1] + 1])
+                rates = rates[times > last_time]
+
+        rates = rates[-self.capacity:]
+        if len(rates) == 0:
+            return 0
+
+        self._write(self._next, rates)
+        self._next = (self._next + len(rates)) % self.capacity
+        self._count = min(self.capacity, self._count + len(rates))
+        return len(rates)
+
+    def _write(self, slot: int, rates: np.ndarray):
+        """Copy records into their slots and the mirrored slots."""
+        slots = (slot + np.arange(len(rates))) % self.capacity
+        for name in self.dtype.names:
+            values = rates[name]
+            target = self.dtype[name]
+            if target.kind == 'u' and values.dtype.itemsize > target.itemsize:
+                # Saturate instead of wrapping, e.g. uint64 volumes in a compact buffer
+                values = np.minimum(values, np.iinfo(target).max)
+            self._data[name][slots] = values
+            self._data[name][slots + self.capacity] = values
+
+    def view(self, bars: Optional[int] = None) -> np.ndarray:
+        """
+        Read-only contiguous view of the newest `bars` bars (all by default).
+
+        The view reflects later appends; copy it to keep a snapshot.
+        """
+        count = self._count if bars is None else min(bars, self._count)
+        end = self._next if self._next >= count else self._next + self.capacity
+        view = self._data[end - count:end]
+        view.flags.writeable = False
+        return view
@@ -0,0 +1,152 @@
+"""
+Bar arrays in shared memory for process-pool analysis.
+
+Submitting bars to a ProcessPoolExecutor pickles them into every task. A
+SharedBarStore instead copies each (symbol, timeframe) window once into a
+multiprocessing.shared_memory segment and hands out a small SharedBars
+handle; workers attach to the segment and analyze read-only NumPy views of
+it without copying.
+
+Every publish creates a new segment, so a worker still analyzing the
+previous window is never affected by the next one. Segments are reference
+counted: the store holds one reference to the latest window per key and
+every published handle holds one until it is released, and a segment is
+unlinked when the last reference goes.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Dict, Hashable, Optional
+import numpy as np
+
+from data.bars import BarArrays, BarData, as_bar_arrays
+
+
+def _pack(data: BarData) -> np.ndarray:
+    """Bars as one structured array (rates arrays pass through unchanged)."""
+    if isinstance(data, np.ndarray) and data.dtype.names is not None:
+        return data
+    bars = as_bar_arrays(data)
+    columns = [('time', bars.time), ('open', bars.open), ('high', bars.high),
+               ('low', bars.low), ('close', bars.close), ('tick_volume', bars.volume)]
+    columns = [(name, column) for name, column in columns if column is not None]
+    packed = np.empty(len(bars), dtype=[(name, column.dtype) for name, column in columns])
+    for name, column in columns:
+        packed[name] = column
+    return packed
+
+
+@dataclass(frozen=True, slots=True)
+class SharedBars:
+    """Picklable handle to one bar window in shared memory."""
+    name: str
+    dtype: np.dtype
+    length: int
+    digits: Optional[int] = None
+
+
+def call_with_bars(handle: SharedBars, fn: Callable, *args):
+    """
+    Return fn(*args, bars) with read-only bars attached from shared memory.
+
+    Meant to be submitted to a process pool with a handle from
+    SharedBarStore.publish(). Bar labels are the bar times, as for MT5
+    rates arrays.
+    """
+    segment = shared_memory.SharedMemory(name=handle.name)
+    try:
+        rates = np.ndarray((handle.length,), dtype=handle.dtype, buffer=segment.buf)
+        rates.flags.writeable = False
+        bars = BarArrays.from_rates(rates)
+        bars.digits = handle.digits
+        result = fn(*args, bars)
+        del rates, bars
+        return result
+    finally:
+        try:
+            segment.close()
+        except BufferError:
+            pass  # Something still views the buffer; the mapping goes with it
+
+
+class SharedBarStore:
+    """
+    Publishes bar windows to shared memory and manages segment lifetimes.
+
+    Thread-safe, so handles can be released from executor callbacks.
+    Create the store before the process pool starts its workers: on POSIX
+    the workers then share this process's resource tracker, instead of
+    starting their own, which would unlink segments they merely attached
+    to when they exit.
+    """
+
+    def __init__(self):
+        if os.name == 'posix':
+            resource_tracker.ensure_running()
+        self._lock = threading.Lock()
+        self._segments: Dict[str, shared_memory.SharedMemory] = {}
+        self._refs: Dict[str, int] = {}
+        self._latest: Dict[Hashable, SharedBars] = {}
+
+    def publish(self, key: Hashable, data: BarData) -> SharedBars:
+        """
+        Copy bars into a new segment that becomes the latest window of key.
+
+        The returned handle holds a reference; release() it once the task
+        using it has finished.
+        """
+        rates = _pack(data)
+        segment = shared_memory.SharedMemory(create=True, size=max(rates.nbytes, 1))
+        np.ndarray(rates.shape, dtype=rates.dtype, buffer=segment.buf)[:] = rates
+        handle = SharedBars(segment.name, rates.dtype, len(rates),
+                            data.digits if isinstance(data, BarArrays) else None)
+
+        with self._lock:
+            self._segments[handle.name] = segment
+            self._refs[handle.name] = 2  # the store's latest + the caller's
+            previous = self._latest.get(key)
+            self._latest[key] = handle
+            if previous is not None:
+                self._release(previous)
+        return handle
+
+    def acquire(self, key: Hashable) -> Optional[SharedBars]:
+        """Another reference to the latest window of key, or None."""
+        with self._lock:
+            handle = self._latest.get(key)
+            if handle is not None:
+                self._refs[handle.name] += 1
+            return handle
+
+    def release(self, handle: SharedBars):
+        """Drop a reference taken by publish() or acquire()."""
+        with self._lock:
+            self._release(handle)
+
+    def _release(self, handle: SharedBars):
+        refs = self._refs.get(handle.name)
+        if refs is None:
+            return
+        if refs > 1:
+            self._refs[handle.name] = refs - 1
+            return
+        del self._refs[handle.name]
+        segment = self._segments.pop(handle.name)
+        segment.close()
+        segment.unlink()
+
+    def nbytes(self) -> int:
+        """Shared memory held by live segments."""
+        with self._lock:
+            return sum(segment.size for segment in self._segments.values())
+
+    def close(self):
+        """Unlink every segment, whatever its reference count."""
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+                segment.unlink()
+            self._segments.clear()
+            self._refs.clear()
+            self._latest.clear()
@@ -0,0 +1,87 @@
+"""
+Versioned on-disk snapshots of the live analysis state.
+
+After a restart every ring buffer would reload its full history and every
+pair would be analyzed before the first report. A snapshot keeps, per
+(symbol, timeframe), the buffered bars and the last cycle's input
+fingerprint, results and bar times, so a restored LiveForexAnalyzer only
+fetches the bars that closed while it was down and skips the analysis of
+pairs whose input has not changed since.
+
+File layout (little-endian):
+
+    magic    8 bytes  b'FXSTATE\\0'
+    version  uint16   SNAPSHOT_VERSION
+    crc32    uint32   of the payload
+    payload           zlib-compressed pickle of a StateSnapshot
+
+The payload pickles the analyzers' result dataclasses, and unpickling can
+run code, so only load snapshots this program wrote. A file with another
+format version or a bad checksum is ignored rather than half-restored.
+"""
+import os
+import pickle
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+MAGIC = b'FXSTATE\0'
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct('<8sHI')
+
+Key = Tuple[str, str]
+
+
+@dataclass(frozen=True, slots=True)
+class StateSnapshot:
+    """Live analysis state of several (symbol, timeframe) pairs."""
+    bars: Dict[Key, np.ndarray] = field(default_factory=dict)
+    cycles: Dict[Key, tuple] = field(default_factory=dict)  # (fingerprint, results, bar times)
+    digits: Dict[str, Optional[int]] = field(default_factory=dict)
+    saved_at: float = field(default_factory=time.time)
+
+
+def save_snapshot(path: str, snapshot: StateSnapshot) -> int:
+    """Write a snapshot, replacing the file atomically, and return its size in bytes."""
+    payload = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL), 1)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload)))
+        f.write(payload)
+    os.replace(tmp, path)
+    return _HEADER.size + len(payload)
+
+
+def load_snapshot(path: str) -> Optional[StateSnapshot]:
+    """The snapshot at path, or None if there is none or it cannot be used."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+            payload = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(header) < _HEADER.size:
+        print(f"⚠️ Ignoring truncated state snapshot {path}")
+        return None
+    magic, version, crc = _HEADER.unpack(header)
+    if magic != MAGIC:
+        print(f"⚠️ {path} is not a state snapshot")
+        return None
+    if version != SNAPSHOT_VERSION:
+        print(f"⚠️ Ignoring state snapshot {path}: format version {version}, expected {SNAPSHOT_VERSION}")
+        return None
+    if zlib.crc32(payload) != crc:
+        print(f"⚠️ Ignoring damaged state snapshot {path}")
+        return None
+
+    try:
+        snapshot = pickle.loads(zlib.decompress(payload))
+    except Exception as e:
+        # E.g. result classes that changed shape since the snapshot was written
+        print(f"⚠️ Could not read state snapshot {path}: {e}")
+        return None
+    return snapshot if isinstance(snapshot, StateSnapshot) else None
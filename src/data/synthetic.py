@@ -0,0 +1,230 @@
+"""
+Vectorized synthetic forex market for tests, demos and load benchmarks.
+
+Prices follow log returns whose drift and volatility switch between market
+regimes (a Markov chain with geometric regime durations), with clustered
+volatility (autoregressive log-volatility) and shocks correlated across
+pairs through a Cholesky factor. Bars come out as MT5 rates arrays, so they
+feed the analyzers, the bar store and the replay connector directly.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+from data.bars import BarArrays, COMPACT_RATES_DTYPE, RATES_DTYPE, TIMEFRAME_SECONDS, bar_open_time
+from indicators.kernels import exponential_filter
+
+
+SeedLike = Union[None, int, np.random.SeedSequence]
+
+# name: (drift in per-bar sigmas, volatility multiplier, mean duration in bars)
+REGIMES = {
+    'trend_up': (0.06, 1.0, 120),
+    'trend_down': (-0.06, 1.0, 120),
+    'range': (0.0, 0.7, 200),
+    'volatile': (0.0, 1.8, 60),
+}
+
+_TRADING_SECONDS_PER_YEAR = 260 * 86400
+
+
+def base_price(pair: str) -> float:
+    """Typical price level used to start a synthetic pair."""
+    if 'JPY' in pair:
+        return 110.00
+    return 1.1000 if 'USD' in pair else 1.3000
+
+
+def price_digits(pair: str) -> int:
+    """Quote digits of a pair (3 for JPY pairs, 5 otherwise)."""
+    return 3 if 'JPY' in pair else 5
+
+
+def default_correlation(pairs: Sequence[str]) -> np.ndarray:
+    """
+    Correlation matrix from shared currencies.
+
+    Pairs sharing their base or quote currency move together, pairs where
+    one's base is the other's quote move against each other.
+    """
+    k = len(pairs)
+    corr = np.eye(k)
+    for i in range(k):
+        for j in range(i + 1, k):
+            a, b = pairs[i], pairs[j]
+            if a[:3] == b[:3] or a[3:6] == b[3:6]:
+                rho = 0.6
+            elif a[:3] == b[3:6] or a[3:6] == b[:3]:
+                rho = -0.6
+            else:
+                rho = 0.2
+            corr[i, j] = corr[j, i] = rho
+    return corr
+
+
+def _cholesky(corr: np.ndarray) -> np.ndarray:
+    """Cholesky factor, repairing a matrix that is not positive definite."""
+    try:
+        return np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(corr)
+        fixed = vectors @ np.diag(np.clip(values, 1e-6, None)) @ vectors.T
+        scale = np.sqrt(np.diag(fixed))
+        return np.linalg.cholesky(fixed / np.outer(scale, scale))
+
+
+def trading_times(start: int, periods: int, timeframe: str, weekends: bool = False) -> np.ndarray:
+    """Bar open times from start, skipping Saturdays and Sundays unless weekends."""
+    period = TIMEFRAME_SECONDS[timeframe]
+    start = bar_open_time(start, timeframe)
+    if weekends or timeframe == 'W1':  # Weekly bars open on Sunday
+        return start + period * np.arange(periods, dtype=np.int64)
+
+    per_week = max(1, 7 * 86400 // period)
+    candidates = start + period * np.arange(periods * 7 // 5 + per_week + 7, dtype=np.int64)
+    weekday = (candidates // 86400 + 3) % 7  # 1970-01-01 was a Thursday, Monday = 0
+    return candidates[weekday < 5][:periods]
+
+
+class SyntheticMarket:
+    """
+    Seedable generator of correlated bars for several pairs.
+
+    All randomness comes from one numpy Generator seeded by a SeedSequence;
+    spawn() hands out statistically independent markets for parallel workers.
+    """
+
+    def __init__(self, pairs: Sequence[str], timeframe: str = 'H1', seed: SeedLike = None,
+                 correlation: Optional[np.ndarray] = None, annual_vol: float = 0.08,
+                 vol_of_vol: float = 0.35, vol_half_life: int = 50,
+                 regimes: Dict[str, tuple] = None):
+        """
+        Args:
+            pairs: Pair names (their currencies drive the default correlation)
+            timeframe: Bar timeframe (M1..W1)
+            seed: Integer seed or SeedSequence (None = fresh entropy)
+            correlation: Pair correlation matrix (default: default_correlation)
+            annual_vol: Annualized volatility of every pair
+            vol_of_vol: Standard deviation of log-volatility
+            vol_half_life: Half-life in bars of volatility shocks
+            regimes: name -> (drift in per-bar sigmas, vol multiplier, mean duration)
+        """
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+        self.pairs = list(pairs)
+        self.timeframe = timeframe
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.correlation = default_correlation(self.pairs) if correlation is None else np.asarray(correlation)
+        self.annual_vol = annual_vol
+        self.vol_of_vol = vol_of_vol
+        self.vol_half_life = vol_half_life
+        self.regimes = regimes or REGIMES
+
+    def spawn(self, n: int) -> List['SyntheticMarket']:
+        """Independent markets with the same settings, one per worker."""
+        return [SyntheticMarket(self.pairs, self.timeframe, child, self.correlation, self.annual_vol,
+                                self.vol_of_vol, self.vol_half_life, self.regimes)
+                for child in self.seed_sequence.spawn(n)]
+
+    def _regime_path(self, periods: int) -> np.ndarray:
+        """Regime index per bar; each switch moves to one of the other regimes."""
+        k = len(self.regimes)
+        durations = np.array([r[2] for r in self.regimes.values()], dtype=np.float64)
+        min_mean = durations.min()
+        segments = int(periods / min_mean) + 16
+        while True:
+            if k > 1:
+                steps = self.rng.integers(1, k, size=segments)
+                states = (self.rng.integers(k) + np.cumsum(steps)) % k
+            else:
+                states = np.zeros(segments, dtype=np.int64)
+            lengths = self.rng.geometric(1.0 / durations[states])
+            if lengths.sum() >= periods:
+                return np.repeat(states, lengths)[:periods]
+            segments *= 2
+
+    def _volatility(self, periods: int) -> np.ndarray:
+        """Clustered volatility multiplier with mean 1 (log-volatility is a stationary AR(1))."""
+        decay = 0.5 ** (1.0 / self.vol_half_life)
+        innovation = np.sqrt(1.0 - decay ** 2)
+        noise = self.rng.standard_normal(periods)
+        noise[0] /= innovation  # Start from the stationary distribution
+        log_vol = self.vol_of_vol * innovation * exponential_filter(noise, decay)
+        return np.exp(log_vol - 0.5 * self.vol_of_vol ** 2)
+
+    def generate(self, periods: int, start: Optional[Union[datetime, int]] = None,
+                 weekends: bool = False, compact: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Generate bars for every pair.
+
+        Args:
+            periods: Bars per pair
+            start: First bar time (default: so that the last bar is recent)
+            weekends: Keep bars on Saturdays and Sundays
+            compact: Return COMPACT_RATES_DTYPE arrays (float32 prices)
+
+        Returns:
+            Dict of pair -> MT5 rates array
+        """
+        period = TIMEFRAME_SECONDS[self.timeframe]
+        if start is None:
+            start = int(datetime.now().timestamp()) - (periods * 7 // 5 + 7) * period
+        elif isinstance(start, datetime):
+            start = int(start.timestamp())
+        times = trading_times(start, periods, self.timeframe, weekends)
+
+        sigma = self.annual_vol * np.sqrt(period / _TRADING_SECONDS_PER_YEAR)
+        params = np.array([r[:2] for r in self.regimes.values()])
+
+        k = len(self.pairs)
+        shocks = self.rng.standard_normal((periods, k))
+        if k > 1:
+            shocks = shocks @ _cholesky(self.correlation).T
+
+        bars = {}
+        for j, pair in enumerate(self.pairs):
+            regime = self._regime_path(periods)
+            vol = sigma * params[regime, 1] * self._volatility(periods)
+            z = shocks[:, j]
+            log_returns = sigma * params[regime, 0] + vol * z
+            log_returns[0] = 0.0
+
+            digits = price_digits(pair)
+            close = base_price(pair) * np.exp(np.cumsum(log_returns))
+            open_ = np.empty(periods)
+            open_[0] = close[0]
+            open_[1:] = close[:-1]
+            gaps = np.flatnonzero(np.diff(times) > period) + 1
+            open_[gaps] *= np.exp(vol[gaps] * self.rng.standard_normal(len(gaps)))
+
+            wick = 0.5 * vol
+            high = np.maximum(open_, close) * np.exp(wick * np.abs(self.rng.standard_normal(periods)))
+            low = np.minimum(open_, close) * np.exp(-wick * np.abs(self.rng.standard_normal(periods)))
+
+            rates = np.empty(periods, dtype=COMPACT_RATES_DTYPE if compact else RATES_DTYPE)
+            rates['time'] = times
+            rates['open'] = np.round(open_, digits)
+            rates['high'] = np.round(high, digits)
+            rates['low'] = np.round(low, digits)
+            rates['close'] = np.round(close, digits)
+            activity = (vol / sigma) * (0.5 + np.abs(z))
+            rates['tick_volume'] = self.rng.poisson(max(1.0, period / 60 * 40) * activity)
+            rates['spread'] = np.maximum(1, np.rint(8 * params[regime, 1])).astype(np.int32)
+            rates['real_volume'] = 0
+            bars[pair] = rates
+
+        return bars
+
+
+def generate_frame(pair: str, timeframe: str = 'H1', periods: int = 200,
+                   seed: SeedLike = None, compact: bool = False) -> pd.DataFrame:
+    """
+    Synthetic bars of one pair as a timestamp/open/high/low/close/volume DataFrame.
+
+    With compact, prices are float32 and volume uint32.
+    """
+    rates = SyntheticMarket([pair], timeframe, seed).generate(periods, compact=compact)[pair]
+    return BarArrays.from_rates(rates).to_frame()
@@ -0,0 +1,152 @@
+"""
+Vectorized sanity checks for bar data before it reaches the analyzers.
+
+Every check is a handful of array operations over the OHLC columns, so the
+whole stage costs about as much as one indicator and can run on every live
+cycle for every symbol.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+from data.bars import BarData, TIMEFRAME_SECONDS, as_bar_arrays
+from indicators.kernels import ewm_mean
+
+
+def robust_z(values: np.ndarray) -> np.ndarray:
+    """Robust z-score using the median and the median absolute deviation."""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return np.zeros(len(values))
+    median = np.median(finite)
+    mad = np.median(np.abs(finite - median))
+    if mad == 0:
+        mad = np.mean(np.abs(finite - median)) or 1.0
+    return 0.6745 * (values - median) / mad
+
+
+def _relative_to_recent(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Values divided by the typical size of the values before them.
+
+    The scale is an exponentially weighted mean of absolute values up to the
+    previous bar, so volatility regimes do not turn into false spikes and a
+    spike does not dampen itself.
+    """
+    size = np.abs(np.where(np.isfinite(values), values, 0.0))
+    scale = np.empty(len(values))
+    scale[0] = np.inf
+    scale[1:] = ewm_mean(size, span)[:-1]
+    scale[scale == 0] = np.inf
+    return values / scale
+
+
+def _weekend_gap(prev_time: np.ndarray, next_time: np.ndarray) -> np.ndarray:
+    """True where the gap between two bars spans a Saturday and is under four days."""
+    days = prev_time // 86400
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday, Monday = 0
+    saturday = (days + (5 - weekday) % 7) * 86400
+    return (saturday < next_time) & (next_time - prev_time <= 4 * 86400)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ValidationReport:
+    """Per-bar findings of validate_bars (boolean masks aligned with the bars)."""
+    invalid_ohlc: np.ndarray    # Non-finite or non-positive prices, high/low not enclosing open/close
+    out_of_order: np.ndarray    # Time not after the previous bar (duplicate or backwards)
+    gap_before: np.ndarray      # More than one period since the previous bar, weekends excluded
+    weekend_gap: np.ndarray     # Gap over a weekend (expected, not an error)
+    spikes: np.ndarray          # Isolated price spikes by robust z-score
+    period: Optional[int]       # Expected bar spacing in seconds
+
+    @property
+    def valid(self) -> np.ndarray:
+        """Bars safe to analyze (gaps do not invalidate the bars around them)."""
+        return ~(self.invalid_ohlc | self.out_of_order | self.spikes)
+
+    @property
+    def ok(self) -> bool:
+        """True when nothing was flagged."""
+        return not (self.invalid_ohlc.any() or self.out_of_order.any()
+                    or self.gap_before.any() or self.spikes.any())
+
+    def summary(self) -> Dict[str, int]:
+        """Number of bars flagged by each check."""
+        return {
+            'bars': len(self.invalid_ohlc),
+            'invalid_ohlc': int(self.invalid_ohlc.sum()),
+            'out_of_order': int(self.out_of_order.sum()),
+            'gaps': int(self.gap_before.sum()),
+            'weekend_gaps': int(self.weekend_gap.sum()),
+            'spikes': int(self.spikes.sum()),
+        }
+
+    def clean(self, data: BarData) -> BarData:
+        """
+        Data without the invalid bars, in the same representation.
+
+        Returns the input itself when every bar is valid, so the common case
+        costs no copy.
+        """
+        valid = self.valid
+        if valid.all():
+            return data
+        if isinstance(data, (pd.DataFrame, np.ndarray)):
+            return data[valid]
+        return data.take(valid)
+
+
+def validate_bars(data: BarData, timeframe: Optional[str] = None,
+                  spike_threshold: float = 15.0, spike_window: int = 50) -> ValidationReport:
+    """
+    Check bars for bad prices, ordering problems, gaps and spikes.
+
+    Args:
+        data: DataFrame, MT5 rates array or BarArrays
+        timeframe: Expected bar spacing (default: the median spacing)
+        spike_threshold: Robust z-score above which a move counts as a spike
+        spike_window: Span in bars of the recent move size spikes are measured against
+
+    Returns:
+        ValidationReport with one mask per check
+    """
+    bars = as_bar_arrays(data)
+    n = len(bars)
+    o, h, l, c = bars.open, bars.high, bars.low, bars.close
+
+    with np.errstate(invalid='ignore'):
+        finite = np.isfinite(o) & np.isfinite(h) & np.isfinite(l) & np.isfinite(c)
+        invalid_ohlc = (~finite | (l <= 0)
+                        | (h < np.maximum(o, c)) | (l > np.minimum(o, c)) | (h < l))
+
+    out_of_order = np.zeros(n, dtype=bool)
+    gap_before = np.zeros(n, dtype=bool)
+    weekend_gap = np.zeros(n, dtype=bool)
+    period = TIMEFRAME_SECONDS.get(timeframe.upper()) if timeframe else None
+
+    time = bars.epoch_seconds()
+    if time is not None and n > 1:
+        spacing = np.diff(time)
+        out_of_order[1:] = spacing <= 0
+        if period is None:
+            positive = spacing[spacing > 0]
+            period = int(np.median(positive)) if len(positive) else None
+        if period:
+            gap = spacing > period
+            weekend = gap & _weekend_gap(time[:-1], time[1:])
+            gap_before[1:] = gap & ~weekend
+            weekend_gap[1:] = weekend
+
+    spikes = np.zeros(n, dtype=bool)
+    if n > 2:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # A bad close jumps away and straight back: two opposite outsized returns
+            z = robust_z(_relative_to_recent(np.diff(np.log(c)), spike_window))
+            jump = np.abs(z) > spike_threshold
+            spikes[1:-1] = jump[:-1] & jump[1:] & (np.sign(z[:-1]) != np.sign(z[1:]))
+            # A bad tick inside a bar shows up as an outsized range
+            spikes |= robust_z(_relative_to_recent(np.log(h / l), spike_window)) > spike_threshold
+        spikes &= ~invalid_ohlc
+
+    return ValidationReport(invalid_ohlc, out_of_order, gap_before, weekend_gap, spikes, period)
@@ -1,12 +1,16 @@
 """
 Chart pattern recognition module.
 """
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Dict, Tuple, Optional, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+from data.bars import BarArrays, BarData, as_bar_arrays
+from indicators.kernels import rolling_std, swing_pivots
+from utils.result_table import ResultBuilder, ResultTable
+
 
 class PatternType(Enum):
     HEAD_AND_SHOULDERS = "head_and_shoulders"
@@ -23,20 +27,21 @@ class PatternType(Enum):
     PENNANT = "pennant"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ChartPattern:
-    """Represents a chart pattern."""
+    """Represents a chart pattern (immutable; duration is precomputed)."""
     pattern_type: PatternType
     start_idx: int
     end_idx: int
-    key_points: List[Tuple[int, float]]  # (index, price) pairs
+    key_points: Tuple[Tuple[int, float], ...]  # (index, price) pairs
     confidence: float  # 0.0 to 1.0
     target_price: Optional[float] = None
     stop_loss: Optional[float] = None
+    duration: int = field(init=False, repr=False, compare=False)
     
-    @property
-    def duration(self) -> int:
-        return self.end_idx - self.start_idx
+    def __post_init__(self):
+        object.__setattr__(self, 'key_points', tuple(self.key_points))
+        object.__setattr__(self, 'duration', self.end_idx - self.start_idx)
 
 
 class ChartPatternRecognizer:
@@ -45,43 +50,42 @@ class ChartPatternRecognizer:
     def __init__(self, min_pattern_length: int = 20):
         self.min_pattern_length = min_pattern_length
         self.tolerance = 0.02  # 2% tolerance for pattern matching
+        self.pivot_window = 5
+        self.flag_lookback = 20
+    
+    def warmup_bars(self) -> int:
+        """Bars needed by the longest pattern search (flags look back and ahead)."""
+        return max(2 * self.flag_lookback + 1, 2 * self.pivot_window + 1, self.min_pattern_length)
     
-    def find_all_patterns(self, data: pd.DataFrame) -> List[ChartPattern]:
-        """Find all chart patterns in the data."""
-        patterns = []
+    def find_all_patterns(self, data: BarData,
+                          columnar: bool = False) -> Union[List[ChartPattern], ResultTable]:
+        """
+        Find all chart patterns in the data.
+        
+        Accepts a DataFrame, an MT5 rates array or BarArrays. With
+        columnar=True the patterns are returned as a ResultTable.
+        """
+        bars = as_bar_arrays(data)
+        patterns = ResultBuilder(ChartPattern)
         
         # Find pivot points first
-        pivots = self._find_pivot_points(data)
+        pivots = self._find_pivot_points(bars, self.pivot_window)
         
         # Look for different pattern types
-        patterns.extend(self._find_head_and_shoulders(data, pivots))
-        patterns.extend(self._find_double_tops_bottoms(data, pivots))
-        patterns.extend(self._find_triangles(data, pivots))
-        patterns.extend(self._find_wedges(data, pivots))
-        patterns.extend(self._find_flags_pennants(data, pivots))
+        self._find_head_and_shoulders(bars, pivots, patterns)
+        self._find_double_tops_bottoms(bars, pivots, patterns)
+        self._find_triangles(bars, pivots, patterns)
+        self._find_wedges(bars, pivots, patterns)
+        self._find_flags_pennants(bars, pivots, patterns)
         
-        return patterns
+        return patterns.build(columnar)
     
-    def _find_pivot_points(self, data: pd.DataFrame, window: int = 5) -> List[Tuple[int, float, str]]:
+    def _find_pivot_points(self, bars: BarArrays, window: int = 5) -> List[Tuple[int, float, str]]:
         """Find swing highs and lows."""
-        pivots = []
-        
-        for i in range(window, len(data) - window):
-            # Check for swing high
-            if all(data['high'].iloc[i] >= data['high'].iloc[i-j] for j in range(1, window+1)) and \
-               all(data['high'].iloc[i] >= data['high'].iloc[i+j] for j in range(1, window+1)):
-                pivots.append((i, data['high'].iloc[i], 'high'))
-            
-            # Check for swing low
-            elif all(data['low'].iloc[i] <= data['low'].iloc[i-j] for j in range(1, window+1)) and \
-                 all(data['low'].iloc[i] <= data['low'].iloc[i+j] for j in range(1, window+1)):
-                pivots.append((i, data['low'].iloc[i], 'low'))
-        
-        return pivots
+        return swing_pivots(bars.high, bars.low, window, bars.digits)
     
-    def _find_head_and_shoulders(self, data: pd.DataFrame, pivots: List[Tuple[int, float, str]]) -> List[ChartPattern]:
+    def _find_head_and_shoulders(self, bars: BarArrays, pivots: List[Tuple[int, float, str]], patterns: ResultBuilder):
         """Find head and shoulders patterns."""
-        patterns = []
         highs = [p for p in pivots if p[2] == 'high']
         
         # Need at least 3 highs for H&S
@@ -102,7 +106,7 @@ class ChartPatternRecognizer:
                 if len(neckline_lows) >= 2:
                     neckline_price = np.mean([p[1] for p in neckline_lows])
                     
-                    pattern = ChartPattern(
+                    patterns.append(
                         pattern_type=PatternType.HEAD_AND_SHOULDERS,
                         start_idx=left_shoulder[0],
                         end_idx=right_shoulder[0],
@@ -111,14 +115,9 @@ class ChartPatternRecognizer:
                         target_price=neckline_price - (head[1] - neckline_price),
                         stop_loss=head[1]
                     )
-                    patterns.append(pattern)
-        
-        return patterns
     
-    def _find_double_tops_bottoms(self, data: pd.DataFrame, pivots: List[Tuple[int, float, str]]) -> List[ChartPattern]:
+    def _find_double_tops_bottoms(self, bars: BarArrays, pivots: List[Tuple[int, float, str]], patterns: ResultBuilder):
         """Find double top and double bottom patterns."""
-        patterns = []
-        
         # Double tops
         highs = [p for p in pivots if p[2] == 'high']
         for i in range(len(highs) - 1):
@@ -134,7 +133,7 @@ class ChartPatternRecognizer:
                 if valley_lows:
                     valley = min(valley_lows, key=lambda x: x[1])
                     
-                    pattern = ChartPattern(
+                    patterns.append(
                         pattern_type=PatternType.DOUBLE_TOP,
                         start_idx=first_top[0],
                         end_idx=second_top[0],
@@ -143,7 +142,6 @@ class ChartPatternRecognizer:
                         target_price=valley[1] - (first_top[1] - valley[1]),
                         stop_loss=max(first_top[1], second_top[1])
                     )
-                    patterns.append(pattern)
         
         # Double bottoms
         lows = [p for p in pivots if p[2] == 'low']
@@ -159,7 +157,7 @@ class ChartPatternRecognizer:
                 if peak_highs:
                     peak = max(peak_highs, key=lambda x: x[1])
                     
-                    pattern = ChartPattern(
+                    patterns.append(
                         pattern_type=PatternType.DOUBLE_BOTTOM,
                         start_idx=first_bottom[0],
                         end_idx=second_bottom[0],
@@ -168,17 +166,12 @@ class ChartPatternRecognizer:
                         target_price=peak[1] + (peak[1] - first_bottom[1]),
                         stop_loss=min(first_bottom[1], second_bottom[1])
                     )
-                    patterns.append(pattern)
-        
-        return patterns
     
-    def _find_triangles(self, data: pd.DataFrame, pivots: List[Tuple[int, float, str]]) -> List[ChartPattern]:
+    def _find_triangles(self, bars: BarArrays, pivots: List[Tuple[int, float, str]], patterns: ResultBuilder):
         """Find triangle patterns (ascending, descending, symmetrical)."""
-        patterns = []
-        
         # Need at least 4 pivots for triangle
         if len(pivots) < 4:
-            return patterns
+            return
         
         # Look for triangle patterns in sliding windows
         for i in range(len(pivots) - 3):
@@ -197,22 +190,17 @@ class ChartPatternRecognizer:
                 triangle_type = self._classify_triangle(high_slope, low_slope)
                 
                 if triangle_type:
-                    pattern = ChartPattern(
+                    patterns.append(
                         pattern_type=triangle_type,
                         start_idx=pattern_pivots[0][0],
                         end_idx=pattern_pivots[-1][0],
                         key_points=pattern_pivots,
                         confidence=self._calculate_triangle_confidence(highs, lows),
-                        target_price=self._calculate_triangle_target(data, pattern_pivots, triangle_type)
+                        target_price=self._calculate_triangle_target(bars, pattern_pivots, triangle_type)
                     )
-                    patterns.append(pattern)
-        
-        return patterns
     
-    def _find_wedges(self, data: pd.DataFrame, pivots: List[Tuple[int, float, str]]) -> List[ChartPattern]:
+    def _find_wedges(self, bars: BarArrays, pivots: List[Tuple[int, float, str]], patterns: ResultBuilder):
         """Find rising and falling wedge patterns."""
-        patterns = []
-        
         for i in range(len(pivots) - 3):
             pattern_pivots = pivots[i:i+4]
             highs = [p for p in pattern_pivots if p[2] == 'high']
@@ -224,73 +212,73 @@ class ChartPatternRecognizer:
                 
                 # Rising wedge: both slopes positive, converging
                 if high_slope > 0 and low_slope > 0 and high_slope < low_slope:
-                    pattern = ChartPattern(
+                    patterns.append(
                         pattern_type=PatternType.WEDGE_RISING,
                         start_idx=pattern_pivots[0][0],
                         end_idx=pattern_pivots[-1][0],
                         key_points=pattern_pivots,
                         confidence=0.7
                     )
-                    patterns.append(pattern)
                 
                 # Falling wedge: both slopes negative, converging
                 elif high_slope < 0 and low_slope < 0 and high_slope > low_slope:
-                    pattern = ChartPattern(
+                    patterns.append(
                         pattern_type=PatternType.WEDGE_FALLING,
                         start_idx=pattern_pivots[0][0],
                         end_idx=pattern_pivots[-1][0],
                         key_points=pattern_pivots,
                         confidence=0.7
                     )
-                    patterns.append(pattern)
-        
-        return patterns
     
-    def _find_flags_pennants(self, data: pd.DataFrame, pivots: List[Tuple[int, float, str]]) -> List[ChartPattern]:
+    def _find_flags_pennants(self, bars: BarArrays, pivots: List[Tuple[int, float, str]], patterns: ResultBuilder):
         """Find flag and pennant patterns."""
-        patterns = []
-        
         # Flags and pennants typically follow strong moves
         # Look for consolidation after strong price movement
+        lookback = self.flag_lookback
+        consolidation_length = 15
+        close = bars.close
+        n = len(close)
         
-        for i in range(20, len(data) - 20):  # Need room before and after
-            # Check for strong move before consolidation
-            lookback_start = max(0, i - 20)
-            strong_move = abs(data['close'].iloc[i] - data['close'].iloc[lookback_start])
-            avg_range = data['close'].iloc[lookback_start:i].std()
-            
-            if strong_move > avg_range * 2:  # Strong move detected
-                # Look for consolidation pattern after
-                consolidation_end = min(len(data), i + 15)
-                consolidation_data = data.iloc[i:consolidation_end]
-                
-                if len(consolidation_data) > 5:
-                    # Check if price is consolidating (low volatility)
-                    consolidation_range = consolidation_data['high'].max() - consolidation_data['low'].min()
-                    
-                    if consolidation_range < strong_move * 0.3:  # Consolidation is small relative to move
-                        # Determine if bull or bear flag
-                        move_direction = 'up' if data['close'].iloc[i] > data['close'].iloc[lookback_start] else 'down'
-                        
-                        pattern_type = PatternType.FLAG_BULL if move_direction == 'up' else PatternType.FLAG_BEAR
-                        
-                        pattern = ChartPattern(
-                            pattern_type=pattern_type,
-                            start_idx=i,
-                            end_idx=consolidation_end - 1,
-                            key_points=[(i, data['close'].iloc[i]), (consolidation_end - 1, data['close'].iloc[consolidation_end - 1])],
-                            confidence=0.6
-                        )
-                        patterns.append(pattern)
+        if n <= 2 * lookback:  # Need room before and after
+            return
+        
+        candidates = np.arange(lookback, n - lookback)
         
-        return patterns
+        # Strong move over the lookback window versus its close price spread
+        strong_move = np.abs(close[candidates] - close[candidates - lookback])
+        avg_range = rolling_std(close, lookback)[candidates - 1]
+        
+        # Consolidation range over the bars that follow
+        highs = sliding_window_view(bars.high, consolidation_length).max(axis=1)
+        lows = sliding_window_view(bars.low, consolidation_length).min(axis=1)
+        consolidation_range = highs[candidates] - lows[candidates]
+        
+        # Strong move detected and consolidation is small relative to move
+        with np.errstate(invalid='ignore'):
+            is_flag = (strong_move > avg_range * 2) & (consolidation_range < strong_move * 0.3)
+        
+        for i in candidates[is_flag].tolist():
+            end = i + consolidation_length - 1
+            
+            # Determine if bull or bear flag
+            move_direction = 'up' if close[i] > close[i - lookback] else 'down'
+            pattern_type = PatternType.FLAG_BULL if move_direction == 'up' else PatternType.FLAG_BEAR
+            
+            patterns.append(
+                pattern_type=pattern_type,
+                start_idx=i,
+                end_idx=end,
+                key_points=[(i, bars.price(close[i])), (end, bars.price(close[end]))],
+                confidence=0.6
+            )
     
     def _calculate_trendline_slope(self, points: List[Tuple[int, float, str]]) -> float:
         """Calculate slope of trendline through points."""
         if len(points) < 2:
             return 0
         
-        x_vals = [p[0] for p in points]
+        # Relative to the first point, so the fit does not depend on where the window starts
+        x_vals = [p[0] - points[0][0] for p in points]
         y_vals = [p[1] for p in points]
         
         return np.polyfit(x_vals, y_vals, 1)[0]
@@ -326,13 +314,13 @@ class ChartPatternRecognizer:
         # Simple confidence based on number of touch points
         return min(0.8, (len(highs) + len(lows)) / 6)
     
-    def _calculate_triangle_target(self, data: pd.DataFrame, pivots: List, triangle_type: PatternType) -> float:
+    def _calculate_triangle_target(self, bars: BarArrays, pivots: List, triangle_type: PatternType) -> float:
         """Calculate price target for triangle breakout."""
         # Simple target calculation - height of triangle added to breakout point
         prices = [p[1] for p in pivots]
         triangle_height = max(prices) - min(prices)
         
-        current_price = data['close'].iloc[pivots[-1][0]]
+        current_price = bars.price(bars.close[pivots[-1][0]])
         
         if triangle_type == PatternType.TRIANGLE_ASCENDING:
             return current_price + triangle_height
@@ -3,10 +3,14 @@ Divergence and convergence analysis module.
 """
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+from data.bars import BarArrays, BarData, as_bar_arrays
+from indicators.kernels import ewm_mean, result_dtype, rolling_max, rolling_mean, rolling_min, swing_points
+from utils.result_table import ResultBuilder, ResultTable
+
 
 class DivergenceType(Enum):
     BULLISH_REGULAR = "bullish_regular"
@@ -22,28 +26,30 @@ class ConvergenceType(Enum):
     MULTI_INDICATOR = "multi_indicator"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Divergence:
-    """Represents a divergence pattern."""
+    """Represents a divergence pattern (immutable; duration is precomputed)."""
     divergence_type: DivergenceType
     start_idx: int
     end_idx: int
-    price_points: List[Tuple[int, float]]  # Price swing points
-    indicator_points: List[Tuple[int, float]]  # Indicator swing points
+    price_points: Tuple[Tuple[int, float], ...]  # Price swing points
+    indicator_points: Tuple[Tuple[int, float], ...]  # Indicator swing points
     strength: float  # 0.0 to 1.0
+    duration: int = field(init=False, repr=False, compare=False)
     
-    @property
-    def duration(self) -> int:
-        return self.end_idx - self.start_idx
+    def __post_init__(self):
+        object.__setattr__(self, 'price_points', tuple(self.price_points))
+        object.__setattr__(self, 'indicator_points', tuple(self.indicator_points))
+        object.__setattr__(self, 'duration', self.end_idx - self.start_idx)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Convergence:
-    """Represents a convergence pattern."""
+    """Represents a convergence pattern (immutable)."""
     convergence_type: ConvergenceType
     timestamp: int
     price: float
-    indicators: Dict[str, float]
+    indicators: Dict[str, float] = field(hash=False)  # Compared but not hashed
     strength: float
     signal_direction: str  # 'buy' or 'sell'
 
@@ -58,103 +64,150 @@ class DivergenceConvergenceAnalyzer:
         self.macd_signal = 9
         self.stoch_k = 14
         self.stoch_d = 3
+        self.signal_warmup = 50  # Bars of history before convergence signals are trusted
+    
+    def warmup_bars(self) -> int:
+        """Bars needed before every indicator (and convergence signal) is valid."""
+        return max(self.macd_slow + self.macd_signal, self.rsi_period + 1,
+                   self.stoch_k + self.stoch_d, self.signal_warmup)
     
-    def calculate_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+    def calculate_indicators(self, data: BarData) -> pd.DataFrame:
         """Calculate technical indicators for divergence analysis."""
-        df = data.copy()
+        bars = as_bar_arrays(data).to_prices()
+        df = data.copy() if isinstance(data, pd.DataFrame) else bars.to_frame()
         
+        for name, values in self._indicator_arrays(bars).items():
+            df[name] = values
+        
+        return df
+    
+    def _indicator_arrays(self, bars: BarArrays) -> Dict[str, np.ndarray]:
+        """Indicator series aligned with the bars, computed on plain arrays."""
         # RSI
-        df['rsi'] = self._calculate_rsi(df['close'], self.rsi_period)
+        rsi = self._calculate_rsi(bars.close, self.rsi_period)
         
         # MACD
-        macd_data = self._calculate_macd(df['close'], self.macd_fast, self.macd_slow, self.macd_signal)
-        df['macd'] = macd_data['macd']
-        df['macd_signal'] = macd_data['signal']
-        df['macd_histogram'] = macd_data['histogram']
+        macd_data = self._calculate_macd(bars.close, self.macd_fast, self.macd_slow, self.macd_signal)
         
         # Stochastic
-        stoch_data = self._calculate_stochastic(df['high'], df['low'], df['close'], self.stoch_k, self.stoch_d)
-        df['stoch_k'] = stoch_data['%K']
-        df['stoch_d'] = stoch_data['%D']
+        stoch_data = self._calculate_stochastic(bars.high, bars.low, bars.close, self.stoch_k, self.stoch_d)
         
-        return df
+        return {
+            'rsi': rsi,
+            'macd': macd_data['macd'],
+            'macd_signal': macd_data['signal'],
+            'macd_histogram': macd_data['histogram'],
+            'stoch_k': stoch_data['%K'],
+            'stoch_d': stoch_data['%D']
+        }
     
-    def find_divergences(self, data: pd.DataFrame) -> List[Divergence]:
-        """Find all types of divergences."""
-        df = self.calculate_indicators(data)
-        divergences = []
+    def find_divergences(self, data: BarData,
+                         columnar: bool = False) -> Union[List[Divergence], ResultTable]:
+        """
+        Find all types of divergences.
+        
+        Accepts a DataFrame, an MT5 rates array or BarArrays. With
+        columnar=True the divergences are returned as a ResultTable.
+        """
+        bars = as_bar_arrays(data).to_prices()
+        indicators = self._indicator_arrays(bars)
+        divergences = ResultBuilder(Divergence)
         
         # Find price and indicator swing points
-        price_highs = self._find_swing_points(df['high'], 'high')
-        price_lows = self._find_swing_points(df['low'], 'low')
+        price_highs = self._find_swing_points(bars.high, 'high')
+        price_lows = self._find_swing_points(bars.low, 'low')
         
-        rsi_highs = self._find_swing_points(df['rsi'], 'high')
-        rsi_lows = self._find_swing_points(df['rsi'], 'low')
+        rsi_highs = self._find_swing_points(indicators['rsi'], 'high')
+        rsi_lows = self._find_swing_points(indicators['rsi'], 'low')
         
-        macd_highs = self._find_swing_points(df['macd'], 'high')
-        macd_lows = self._find_swing_points(df['macd'], 'low')
+        macd_highs = self._find_swing_points(indicators['macd'], 'high')
+        macd_lows = self._find_swing_points(indicators['macd'], 'low')
         
         # Find RSI divergences
-        divergences.extend(self._find_rsi_divergences(price_highs, price_lows, rsi_highs, rsi_lows, df))
+        self._find_rsi_divergences(price_highs, price_lows, rsi_highs, rsi_lows, indicators, divergences)
         
         # Find MACD divergences
-        divergences.extend(self._find_macd_divergences(price_highs, price_lows, macd_highs, macd_lows, df))
+        self._find_macd_divergences(price_highs, price_lows, macd_highs, macd_lows, indicators, divergences)
         
-        return divergences
+        return divergences.build(columnar)
     
-    def find_convergences(self, data: pd.DataFrame) -> List[Convergence]:
-        """Find convergence signals across multiple indicators."""
-        df = self.calculate_indicators(data)
-        convergences = []
-        
-        for i in range(50, len(df)):  # Need history for reliable signals
-            # MACD signal line crossover
-            if self._is_macd_bullish_crossover(df, i):
-                convergence = Convergence(
+    def find_convergences(self, data: BarData,
+                          columnar: bool = False) -> Union[List[Convergence], ResultTable]:
+        """
+        Find convergence signals across multiple indicators.
+        
+        Accepts a DataFrame, an MT5 rates array or BarArrays. With
+        columnar=True the convergences are returned as a ResultTable.
+        """
+        bars = as_bar_arrays(data).to_prices()
+        indicators = self._indicator_arrays(bars)
+        convergences = ResultBuilder(Convergence)
+        
+        close = bars.close
+        macd = indicators['macd']
+        signal = indicators['macd_signal']
+        rsi = indicators['rsi']
+        stoch_k = indicators['stoch_k']
+        
+        # MACD signal line crossovers
+        bullish_cross = np.zeros(len(close), dtype=bool)
+        bearish_cross = np.zeros(len(close), dtype=bool)
+        bullish_cross[1:] = (macd[1:] > signal[1:]) & (macd[:-1] <= signal[:-1])
+        bearish_cross[1:] = (macd[1:] < signal[1:]) & (macd[:-1] >= signal[:-1])
+        
+        # Multi-indicator convergence: RSI, MACD and Stochastic aligned
+        with np.errstate(invalid='ignore'):
+            multi_buy = (rsi < 30) & (macd > signal) & (stoch_k < 20)  # Oversold
+            multi_sell = (rsi > 70) & (macd < signal) & (stoch_k > 80)  # Overbought
+        
+        signals = bullish_cross | bearish_cross | multi_buy | multi_sell
+        signals[:self.signal_warmup] = False  # Need history for reliable signals
+        
+        for i in np.flatnonzero(signals).tolist():
+            if bullish_cross[i] or bearish_cross[i]:
+                convergences.append(
                     convergence_type=ConvergenceType.MACD_SIGNAL,
                     timestamp=i,
-                    price=df['close'].iloc[i],
-                    indicators={'macd': df['macd'].iloc[i], 'signal': df['macd_signal'].iloc[i]},
-                    strength=self._calculate_macd_strength(df, i),
-                    signal_direction='buy'
+                    price=close[i],
+                    indicators={'macd': macd[i], 'signal': signal[i]},
+                    strength=self._calculate_macd_strength(indicators, close, i),
+                    signal_direction='buy' if bullish_cross[i] else 'sell'
                 )
-                convergences.append(convergence)
             
-            elif self._is_macd_bearish_crossover(df, i):
-                convergence = Convergence(
-                    convergence_type=ConvergenceType.MACD_SIGNAL,
+            if multi_buy[i] or multi_sell[i]:
+                convergences.append(
+                    convergence_type=ConvergenceType.MULTI_INDICATOR,
                     timestamp=i,
-                    price=df['close'].iloc[i],
-                    indicators={'macd': df['macd'].iloc[i], 'signal': df['macd_signal'].iloc[i]},
-                    strength=self._calculate_macd_strength(df, i),
-                    signal_direction='sell'
+                    price=close[i],
+                    indicators={'rsi': rsi[i], 'macd': macd[i], 'stoch_k': stoch_k[i]},
+                    strength=0.8,
+                    signal_direction='buy' if multi_buy[i] else 'sell'
                 )
-                convergences.append(convergence)
-            
-            # Multi-indicator convergence
-            multi_signal = self._check_multi_indicator_convergence(df, i)
-            if multi_signal:
-                convergences.append(multi_signal)
         
-        return convergences
+        return convergences.build(columnar)
     
-    def _calculate_rsi(self, prices: pd.Series, period: int) -> pd.Series:
+    def _calculate_rsi(self, prices: np.ndarray, period: int) -> np.ndarray:
         """Calculate RSI indicator."""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+        delta = np.empty(len(prices), dtype=result_dtype(prices))
+        delta[:1] = np.nan
+        delta[1:] = np.diff(prices)
+        
+        with np.errstate(invalid='ignore'):
+            gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+            loss = rolling_mean(np.where(delta < 0, -delta, 0.0), period)
         
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = gain / loss
+            rsi = 100 - (100 / (1 + rs))
         return rsi
     
-    def _calculate_macd(self, prices: pd.Series, fast: int, slow: int, signal: int) -> Dict[str, pd.Series]:
+    def _calculate_macd(self, prices: np.ndarray, fast: int, slow: int, signal: int) -> Dict[str, np.ndarray]:
         """Calculate MACD indicator."""
-        ema_fast = prices.ewm(span=fast).mean()
-        ema_slow = prices.ewm(span=slow).mean()
+        ema_fast = ewm_mean(prices, fast)
+        ema_slow = ewm_mean(prices, slow)
         
         macd = ema_fast - ema_slow
-        signal_line = macd.ewm(span=signal).mean()
+        signal_line = ewm_mean(macd, signal)
         histogram = macd - signal_line
         
         return {
@@ -163,43 +216,28 @@ class DivergenceConvergenceAnalyzer:
             'histogram': histogram
         }
     
-    def _calculate_stochastic(self, high: pd.Series, low: pd.Series, close: pd.Series, k_period: int, d_period: int) -> Dict[str, pd.Series]:
+    def _calculate_stochastic(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                              k_period: int, d_period: int) -> Dict[str, np.ndarray]:
         """Calculate Stochastic oscillator."""
-        lowest_low = low.rolling(window=k_period).min()
-        highest_high = high.rolling(window=k_period).max()
+        lowest_low = rolling_min(low, k_period)
+        highest_high = rolling_max(high, k_period)
         
-        k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
-        d_percent = k_percent.rolling(window=d_period).mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
+        d_percent = rolling_mean(k_percent, d_period)
         
         return {
             '%K': k_percent,
             '%D': d_percent
         }
     
-    def _find_swing_points(self, series: pd.Series, point_type: str, window: int = 5) -> List[Tuple[int, float]]:
+    def _find_swing_points(self, series: np.ndarray, point_type: str, window: int = 5) -> List[Tuple[int, float]]:
         """Find swing highs or lows in a series."""
-        points = []
-        
-        for i in range(window, len(series) - window):
-            if pd.isna(series.iloc[i]):
-                continue
-            
-            if point_type == 'high':
-                if all(series.iloc[i] >= series.iloc[i-j] for j in range(1, window+1)) and \
-                   all(series.iloc[i] >= series.iloc[i+j] for j in range(1, window+1)):
-                    points.append((i, series.iloc[i]))
-            
-            elif point_type == 'low':
-                if all(series.iloc[i] <= series.iloc[i-j] for j in range(1, window+1)) and \
-                   all(series.iloc[i] <= series.iloc[i+j] for j in range(1, window+1)):
-                    points.append((i, series.iloc[i]))
-        
-        return points
+        return swing_points(series, point_type, window)
     
-    def _find_rsi_divergences(self, price_highs: List, price_lows: List, rsi_highs: List, rsi_lows: List, df: pd.DataFrame) -> List[Divergence]:
+    def _find_rsi_divergences(self, price_highs: List, price_lows: List, rsi_highs: List, rsi_lows: List,
+                              indicators: Dict[str, np.ndarray], divergences: ResultBuilder):
         """Find RSI divergences."""
-        divergences = []
-        
         # Bearish divergence (price makes higher high, RSI makes lower high)
         for i in range(len(price_highs) - 1):
             for j in range(len(rsi_highs) - 1):
@@ -209,7 +247,7 @@ class DivergenceConvergenceAnalyzer:
                 # Check if time periods align
                 if abs(ph1[0] - rh1[0]) <= 5 and abs(ph2[0] - rh2[0]) <= 5:
                     if ph2[1] > ph1[1] and rh2[1] < rh1[1]:  # Bearish divergence
-                        divergence = Divergence(
+                        divergences.append(
                             divergence_type=DivergenceType.BEARISH_REGULAR,
                             start_idx=min(ph1[0], rh1[0]),
                             end_idx=max(ph2[0], rh2[0]),
@@ -217,7 +255,6 @@ class DivergenceConvergenceAnalyzer:
                             indicator_points=[rh1, rh2],
                             strength=self._calculate_divergence_strength(ph1, ph2, rh1, rh2)
                         )
-                        divergences.append(divergence)
         
         # Bullish divergence (price makes lower low, RSI makes higher low)
         for i in range(len(price_lows) - 1):
@@ -227,7 +264,7 @@ class DivergenceConvergenceAnalyzer:
                 
                 if abs(pl1[0] - rl1[0]) <= 5 and abs(pl2[0] - rl2[0]) <= 5:
                     if pl2[1] < pl1[1] and rl2[1] > rl1[1]:  # Bullish divergence
-                        divergence = Divergence(
+                        divergences.append(
                             divergence_type=DivergenceType.BULLISH_REGULAR,
                             start_idx=min(pl1[0], rl1[0]),
                             end_idx=max(pl2[0], rl2[0]),
@@ -235,14 +272,10 @@ class DivergenceConvergenceAnalyzer:
                             indicator_points=[rl1, rl2],
                             strength=self._calculate_divergence_strength(pl1, pl2, rl1, rl2)
                         )
-                        divergences.append(divergence)
-        
-        return divergences
     
-    def _find_macd_divergences(self, price_highs: List, price_lows: List, macd_highs: List, macd_lows: List, df: pd.DataFrame) -> List[Divergence]:
+    def _find_macd_divergences(self, price_highs: List, price_lows: List, macd_highs: List, macd_lows: List,
+                               indicators: Dict[str, np.ndarray], divergences: ResultBuilder):
         """Find MACD divergences."""
-        divergences = []
-        
         # Similar logic to RSI divergences but with MACD
         # Bearish divergence
         for i in range(len(price_highs) - 1):
@@ -252,7 +285,7 @@ class DivergenceConvergenceAnalyzer:
                 
                 if abs(ph1[0] - mh1[0]) <= 5 and abs(ph2[0] - mh2[0]) <= 5:
                     if ph2[1] > ph1[1] and mh2[1] < mh1[1]:
-                        divergence = Divergence(
+                        divergences.append(
                             divergence_type=DivergenceType.BEARISH_REGULAR,
                             start_idx=min(ph1[0], mh1[0]),
                             end_idx=max(ph2[0], mh2[0]),
@@ -260,66 +293,6 @@ class DivergenceConvergenceAnalyzer:
                             indicator_points=[mh1, mh2],
                             strength=self._calculate_divergence_strength(ph1, ph2, mh1, mh2)
                         )
-                        divergences.append(divergence)
-        
-        return divergences
-    
-    def _is_macd_bullish_crossover(self, df: pd.DataFrame, idx: int) -> bool:
-        """Check for MACD bullish signal line crossover."""
-        if idx < 1:
-            return False
-        
-        return (df['macd'].iloc[idx] > df['macd_signal'].iloc[idx] and
-                df['macd'].iloc[idx-1] <= df['macd_signal'].iloc[idx-1])
-    
-    def _is_macd_bearish_crossover(self, df: pd.DataFrame, idx: int) -> bool:
-        """Check for MACD bearish signal line crossover."""
-        if idx < 1:
-            return False
-        
-        return (df['macd'].iloc[idx] < df['macd_signal'].iloc[idx] and
-                df['macd'].iloc[idx-1] >= df['macd_signal'].iloc[idx-1])
-    
-    def _check_multi_indicator_convergence(self, df: pd.DataFrame, idx: int) -> Optional[Convergence]:
-        """Check for convergence across multiple indicators."""
-        if idx < 20:  # Need sufficient history
-            return None
-        
-        # Check if multiple indicators align
-        rsi = df['rsi'].iloc[idx]
-        macd = df['macd'].iloc[idx]
-        macd_signal = df['macd_signal'].iloc[idx]
-        stoch_k = df['stoch_k'].iloc[idx]
-        
-        # Bullish convergence
-        if (rsi < 30 and  # RSI oversold
-            macd > macd_signal and  # MACD above signal
-            stoch_k < 20):  # Stochastic oversold
-            
-            return Convergence(
-                convergence_type=ConvergenceType.MULTI_INDICATOR,
-                timestamp=idx,
-                price=df['close'].iloc[idx],
-                indicators={'rsi': rsi, 'macd': macd, 'stoch_k': stoch_k},
-                strength=0.8,
-                signal_direction='buy'
-            )
-        
-        # Bearish convergence
-        elif (rsi > 70 and  # RSI overbought
-              macd < macd_signal and  # MACD below signal
-              stoch_k > 80):  # Stochastic overbought
-            
-            return Convergence(
-                convergence_type=ConvergenceType.MULTI_INDICATOR,
-                timestamp=idx,
-                price=df['close'].iloc[idx],
-                indicators={'rsi': rsi, 'macd': macd, 'stoch_k': stoch_k},
-                strength=0.8,
-                signal_direction='sell'
-            )
-        
-        return None
     
     def _calculate_divergence_strength(self, p1: Tuple, p2: Tuple, i1: Tuple, i2: Tuple) -> float:
         """Calculate strength of divergence pattern."""
@@ -334,12 +307,13 @@ class DivergenceConvergenceAnalyzer:
         
         return min(1.0, (price_change + indicator_change + time_alignment) / 3)
     
-    def _calculate_macd_strength(self, df: pd.DataFrame, idx: int) -> float:
+    def _calculate_macd_strength(self, indicators: Dict[str, np.ndarray], close: np.ndarray, idx: int) -> float:
         """Calculate MACD signal strength."""
-        macd_diff = abs(df['macd'].iloc[idx] - df['macd_signal'].iloc[idx])
-        histogram = abs(df['macd_histogram'].iloc[idx])
+        macd_diff = abs(indicators['macd'][idx] - indicators['macd_signal'][idx])
+        histogram = abs(indicators['macd_histogram'][idx])
         
         # Normalize by recent volatility
-        recent_volatility = df['close'].iloc[max(0, idx-20):idx].std()
+        recent = close[max(0, idx-20):idx]
+        recent_volatility = np.nanstd(recent, ddof=1) if len(recent) > 1 else np.nan
         
-        return min(1.0, (macd_diff + histogram) / recent_volatility if recent_volatility > 0 else 0.5)
\ No newline at end of file
+        return min(1.0, (macd_diff + histogram) / recent_volatility if recent_volatility > 0 else 0.5)
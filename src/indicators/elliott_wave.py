@@ -1,12 +1,14 @@
 """
 Elliott Wave analysis for identifying impulsive and corrective wave patterns.
 """
-import pandas as pd
-import numpy as np
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+from data.bars import BarData, as_bar_arrays
+from indicators.kernels import swing_pivots
+from utils.result_table import ResultBuilder, ResultTable
+
 
 class WaveType(Enum):
     IMPULSE = "impulse"
@@ -19,9 +21,9 @@ class WaveDirection(Enum):
     DOWN = "down"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Wave:
-    """Represents an Elliott Wave."""
+    """Represents an Elliott Wave (immutable; length and duration are precomputed)."""
     start_idx: int
     end_idx: int
     start_price: float
@@ -30,16 +32,12 @@ class Wave:
     direction: WaveDirection
     degree: int  # Wave degree (1=minor, 2=intermediate, 3=primary, etc.)
     label: str  # Wave label (1, 2, 3, 4, 5, A, B, C)
+    length: float = field(init=False, repr=False, compare=False)  # Wave length in price points
+    duration: int = field(init=False, repr=False, compare=False)  # Wave duration in periods
     
-    @property
-    def length(self) -> float:
-        """Calculate wave length in price points."""
-        return abs(self.end_price - self.start_price)
-    
-    @property
-    def duration(self) -> int:
-        """Calculate wave duration in periods."""
-        return self.end_idx - self.start_idx
+    def __post_init__(self):
+        object.__setattr__(self, 'length', abs(self.end_price - self.start_price))
+        object.__setattr__(self, 'duration', self.end_idx - self.start_idx)
 
 
 class ElliottWaveAnalyzer:
@@ -49,24 +47,19 @@ class ElliottWaveAnalyzer:
         self.min_wave_length = min_wave_length
         self.fibonacci_ratios = [0.236, 0.382, 0.5, 0.618, 0.786, 1.0, 1.272, 1.618, 2.618]
     
-    def find_pivot_points(self, data: pd.DataFrame, window: int = 5) -> List[Tuple[int, float, str]]:
+    def warmup_bars(self, window: int = 5) -> int:
+        """Bars needed before the first pivot point can be confirmed."""
+        return 2 * window + 1
+    
+    def find_pivot_points(self, data: BarData, window: int = 5) -> List[Tuple[int, float, str]]:
         """Find swing highs and lows (pivot points)."""
-        highs = data['high'].rolling(window=window*2+1, center=True).max()
-        lows = data['low'].rolling(window=window*2+1, center=True).min()
-        
-        pivots = []
-        
-        for i in range(window, len(data) - window):
-            if data['high'].iloc[i] == highs.iloc[i]:
-                pivots.append((i, data['high'].iloc[i], 'high'))
-            elif data['low'].iloc[i] == lows.iloc[i]:
-                pivots.append((i, data['low'].iloc[i], 'low'))
-        
-        return pivots
+        bars = as_bar_arrays(data)
+        return swing_pivots(bars.high, bars.low, window, bars.digits)
     
-    def identify_impulse_waves(self, pivots: List[Tuple[int, float, str]]) -> List[Wave]:
+    def identify_impulse_waves(self, pivots: List[Tuple[int, float, str]],
+                               columnar: bool = False) -> Union[List[Wave], ResultTable]:
         """Identify 5-wave impulse patterns."""
-        impulse_waves = []
+        impulse_waves = ResultBuilder(Wave)
         
         # Look for 5-wave patterns (alternating high-low or low-high)
         for i in range(len(pivots) - 4):
@@ -74,24 +67,23 @@ class ElliottWaveAnalyzer:
             
             # Check for valid 5-wave structure
             if self._is_valid_impulse_sequence(sequence):
-                waves = self._create_impulse_waves(sequence)
-                impulse_waves.extend(waves)
+                self._create_impulse_waves(sequence, impulse_waves)
         
-        return impulse_waves
+        return impulse_waves.build(columnar)
     
-    def identify_corrective_waves(self, pivots: List[Tuple[int, float, str]]) -> List[Wave]:
+    def identify_corrective_waves(self, pivots: List[Tuple[int, float, str]],
+                                  columnar: bool = False) -> Union[List[Wave], ResultTable]:
         """Identify 3-wave corrective patterns (ABC)."""
-        corrective_waves = []
+        corrective_waves = ResultBuilder(Wave)
         
         # Look for 3-wave patterns
         for i in range(len(pivots) - 2):
             sequence = pivots[i:i+3]
             
             if self._is_valid_corrective_sequence(sequence):
-                waves = self._create_corrective_waves(sequence)
-                corrective_waves.extend(waves)
+                self._create_corrective_waves(sequence, corrective_waves)
         
-        return corrective_waves
+        return corrective_waves.build(columnar)
     
     def _is_valid_impulse_sequence(self, sequence: List[Tuple[int, float, str]]) -> bool:
         """Check if sequence forms valid 5-wave impulse pattern."""
@@ -139,16 +131,15 @@ class ElliottWaveAnalyzer:
         
         return types in [pattern1, pattern2]
     
-    def _create_impulse_waves(self, sequence: List[Tuple[int, float, str]]) -> List[Wave]:
-        """Create Wave objects for impulse pattern."""
-        waves = []
+    def _create_impulse_waves(self, sequence: List[Tuple[int, float, str]], waves: ResultBuilder):
+        """Add the waves of an impulse pattern."""
         direction = WaveDirection.UP if sequence[0][2] == 'low' else WaveDirection.DOWN
         
         for i in range(4):  # 4 waves in 5-point sequence
             start_idx, start_price, _ = sequence[i]
             end_idx, end_price, _ = sequence[i + 1]
             
-            wave = Wave(
+            waves.append(
                 start_idx=start_idx,
                 end_idx=end_idx,
                 start_price=start_price,
@@ -158,17 +149,13 @@ class ElliottWaveAnalyzer:
                 degree=1,
                 label=str((i % 5) + 1)  # Labels 1, 2, 3, 4, 5
             )
-            waves.append(wave)
             
             # Alternate direction for corrective waves (2, 4)
             if i in [0, 2]:  # After waves 1 and 3
                 direction = WaveDirection.DOWN if direction == WaveDirection.UP else WaveDirection.UP
-        
-        return waves
     
-    def _create_corrective_waves(self, sequence: List[Tuple[int, float, str]]) -> List[Wave]:
-        """Create Wave objects for corrective pattern."""
-        waves = []
+    def _create_corrective_waves(self, sequence: List[Tuple[int, float, str]], waves: ResultBuilder):
+        """Add the waves of a corrective pattern."""
         direction = WaveDirection.DOWN if sequence[0][2] == 'high' else WaveDirection.UP
         labels = ['A', 'B', 'C']
         
@@ -176,7 +163,7 @@ class ElliottWaveAnalyzer:
             start_idx, start_price, _ = sequence[i]
             end_idx, end_price, _ = sequence[i + 1]
             
-            wave = Wave(
+            waves.append(
                 start_idx=start_idx,
                 end_idx=end_idx,
                 start_price=start_price,
@@ -186,12 +173,9 @@ class ElliottWaveAnalyzer:
                 degree=1,
                 label=labels[i]
             )
-            waves.append(wave)
             
             # Alternate direction
             direction = WaveDirection.UP if direction == WaveDirection.DOWN else WaveDirection.DOWN
-        
-        return waves
     
     def calculate_fibonacci_levels(self, wave: Wave) -> Dict[str, float]:
         """Calculate Fibonacci retracement and extension levels for a wave."""
@@ -214,12 +198,16 @@ class ElliottWaveAnalyzer:
         
         return levels
     
-    def analyze_wave_structure(self, data: pd.DataFrame) -> Dict[str, List[Wave]]:
-        """Complete Elliott Wave analysis of price data."""
+    def analyze_wave_structure(self, data: BarData, columnar: bool = False) -> Dict[str, List[Wave]]:
+        """
+        Complete Elliott Wave analysis of price data.
+        
+        With columnar=True the impulse and corrective waves are ResultTables.
+        """
         pivots = self.find_pivot_points(data)
         
-        impulse_waves = self.identify_impulse_waves(pivots)
-        corrective_waves = self.identify_corrective_waves(pivots)
+        impulse_waves = self.identify_impulse_waves(pivots, columnar)
+        corrective_waves = self.identify_corrective_waves(pivots, columnar)
         
         return {
             'impulse': impulse_waves,
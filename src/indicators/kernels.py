@@ -0,0 +1,136 @@
+"""
+Vectorized array kernels shared by the indicator modules.
+
+All functions take plain NumPy arrays (views from data.bars.BarArrays) and
+return arrays aligned with their input, NaN-padded where a window is not yet
+full, matching the pandas rolling/ewm semantics the analyzers were built on.
+
+Series derived from float32 input stay float32 (see result_dtype): sums
+accumulate in float64 and results are written straight into the output
+array, so a float32 history costs no float64 copy of its length.
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data.bars import to_prices
+
+
+def result_dtype(values: np.ndarray) -> np.dtype:
+    """Float type of a series derived from values: float32 stays float32, anything else is float64."""
+    return np.dtype(np.float32) if values.dtype == np.float32 else np.dtype(np.float64)
+
+
+def _trailing(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """Apply reducer over trailing windows; the first window-1 entries are NaN."""
+    out = np.full(len(values), np.nan, dtype=result_dtype(values))
+    if window <= len(values):
+        reducer(sliding_window_view(values, window), axis=1, out=out[window - 1:])
+    return out
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean, like Series.rolling(window).mean()."""
+    return _trailing(values, window, lambda w, axis, out: np.mean(w, axis=axis, dtype=np.float64, out=out))
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing maximum, like Series.rolling(window).max()."""
+    return _trailing(values, window, np.max)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing minimum, like Series.rolling(window).min()."""
+    return _trailing(values, window, np.min)
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing sample standard deviation, like Series.rolling(window).std()."""
+    return _trailing(values, window,
+                     lambda w, axis, out: np.std(w, axis=axis, dtype=np.float64, ddof=1, out=out))
+
+
+def exponential_filter(values: np.ndarray, decay: float) -> np.ndarray:
+    """
+    Recursive filter y[t] = decay * y[t-1] + values[t], with y[-1] = 0.
+
+    Evaluated block by block with cumulative sums, so the cost is vectorized
+    while the rescaling factor stays well inside float64 range.
+    """
+    values = np.asarray(values)
+    out = np.empty(len(values), dtype=result_dtype(values))
+    if decay <= 0.0:
+        out[:] = values
+        return out
+
+    block = max(1, int(np.log(1e12) / -np.log(decay)))
+    powers = decay ** np.arange(block)
+
+    carry = 0.0
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        scale = powers[:len(chunk)]
+        filtered = scale * (decay * carry + np.cumsum(chunk / scale))
+        out[start:start + len(chunk)] = filtered
+        carry = filtered[-1]
+
+    return out
+
+
+def ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Exponentially weighted mean, like Series.ewm(span=span).mean() (adjust=True).
+
+    Input is expected to be free of NaN.
+    """
+    decay = 1.0 - 2.0 / (span + 1)
+    values = np.asarray(values)
+    out = exponential_filter(values, decay)
+    out /= exponential_filter(np.ones(len(values), dtype=out.dtype), decay)
+    return out
+
+
+def centered_extremes(values: np.ndarray, window: int, point_type: str) -> np.ndarray:
+    """
+    Mask of bars that are the extreme of the centered (2*window+1) window.
+
+    The mask covers bars window..len-window-1; bars whose window contains
+    NaN never qualify.
+    """
+    size = 2 * window + 1
+    if len(values) < size:
+        return np.zeros(0, dtype=bool)
+
+    windows = sliding_window_view(values, size)
+    centre = values[window:len(values) - window]
+    if point_type == 'high':
+        return centre >= windows.max(axis=1)
+    return centre <= windows.min(axis=1)
+
+
+def swing_pivots(high: np.ndarray, low: np.ndarray, window: int,
+                 digits: Optional[int] = None) -> List[Tuple[int, float, str]]:
+    """
+    Swing highs and lows as (index, price, 'high'|'low'), in index order.
+
+    A bar that qualifies as both is reported as a high. With digits, high
+    and low are fixed-point points (see data.bars.to_points): the extremes
+    are found on the integers and only the reported prices are converted.
+    """
+    is_high = centered_extremes(high, window, 'high')
+    is_low = centered_extremes(low, window, 'low') & ~is_high
+
+    idx = np.flatnonzero(is_high | is_low)
+    kind = is_high[idx]
+    idx += window
+    prices = np.where(kind, high[idx], low[idx])
+    if digits is not None:
+        prices = to_prices(prices, digits)
+    return [(i, p, 'high' if h else 'low')
+            for i, p, h in zip(idx.tolist(), prices, kind.tolist())]
+
+
+def swing_points(series: np.ndarray, point_type: str, window: int) -> List[Tuple[int, float]]:
+    """Swing highs or lows of a single series as (index, value)."""
+    mask = centered_extremes(series, window, point_type)
+    return [(i + window, series[i + window]) for i in np.flatnonzero(mask).tolist()]
@@ -1,12 +1,15 @@
 """
 Trend analysis and identification module.
 """
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Union
+from dataclasses import dataclass, field
 from enum import Enum
 
+from data.bars import BarData, as_bar_arrays
+from indicators.kernels import rolling_mean
+from utils.result_table import ResultBuilder, ResultTable
+
 
 class TrendDirection(Enum):
     UPTREND = "uptrend"
@@ -20,9 +23,9 @@ class TrendStrength(Enum):
     STRONG = "strong"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TrendMove:
-    """Represents a trend movement."""
+    """Represents a trend movement (immutable; derived values are precomputed)."""
     start_idx: int
     end_idx: int
     start_price: float
@@ -31,18 +34,15 @@ class TrendMove:
     strength: TrendStrength
     slope: float
     r_squared: float  # Correlation coefficient
+    duration: int = field(init=False, repr=False, compare=False)
+    price_change: float = field(init=False, repr=False, compare=False)
+    percentage_change: float = field(init=False, repr=False, compare=False)
     
-    @property
-    def duration(self) -> int:
-        return self.end_idx - self.start_idx
-    
-    @property
-    def price_change(self) -> float:
-        return self.end_price - self.start_price
-    
-    @property
-    def percentage_change(self) -> float:
-        return (self.price_change / self.start_price) * 100
+    def __post_init__(self):
+        price_change = self.end_price - self.start_price
+        object.__setattr__(self, 'duration', self.end_idx - self.start_idx)
+        object.__setattr__(self, 'price_change', price_change)
+        object.__setattr__(self, 'percentage_change', (price_change / self.start_price) * 100)
 
 
 class TrendAnalyzer:
@@ -51,16 +51,27 @@ class TrendAnalyzer:
     def __init__(self, min_trend_length: int = 10):
         self.min_trend_length = min_trend_length
     
-    def identify_trends(self, data: pd.DataFrame, window: int = 20) -> List[TrendMove]:
-        """Identify trend movements using moving averages and linear regression."""
-        trends = []
+    def warmup_bars(self, window: int = 20) -> int:
+        """Bars needed to fill the long moving average and complete one trend."""
+        return window + self.min_trend_length
+    
+    def identify_trends(self, data: BarData, window: int = 20,
+                        columnar: bool = False) -> Union[List[TrendMove], ResultTable]:
+        """
+        Identify trend movements using moving averages and linear regression.
+        
+        Accepts a DataFrame, an MT5 rates array or BarArrays; the input is not
+        modified. With columnar=True the trends are returned as a ResultTable.
+        """
+        bars = as_bar_arrays(data).to_prices()
+        trends = ResultBuilder(TrendMove)
         
         # Calculate moving averages
-        data['ma_short'] = data['close'].rolling(window=window//2).mean()
-        data['ma_long'] = data['close'].rolling(window=window).mean()
+        ma_short = rolling_mean(bars.close, window // 2)
+        ma_long = rolling_mean(bars.close, window)
         
         # Find trend changes
-        trend_changes = self._find_trend_changes(data)
+        trend_changes = self._find_trend_changes(ma_short, ma_long)
         
         # Create trend moves between changes
         for i in range(len(trend_changes) - 1):
@@ -68,60 +79,51 @@ class TrendAnalyzer:
             end_idx = trend_changes[i + 1]
             
             if end_idx - start_idx >= self.min_trend_length:
-                trend_move = self._analyze_trend_segment(data, start_idx, end_idx)
-                if trend_move:
-                    trends.append(trend_move)
+                self._analyze_trend_segment(bars.close, start_idx, end_idx, trends)
         
-        return trends
+        return trends.build(columnar)
     
-    def _find_trend_changes(self, data: pd.DataFrame) -> List[int]:
+    def _find_trend_changes(self, ma_short: np.ndarray, ma_long: np.ndarray) -> List[int]:
         """Find points where trend direction changes."""
+        n = len(ma_short)
         changes = [0]  # Start with first index
         
         # Compare short MA vs long MA to determine trend
-        for i in range(1, len(data) - 1):
-            if pd.isna(data['ma_short'].iloc[i]) or pd.isna(data['ma_long'].iloc[i]):
-                continue
-            
-            current_trend = self._get_trend_direction_at_point(data, i)
-            previous_trend = self._get_trend_direction_at_point(data, i - 1)
-            
-            if current_trend != previous_trend:
-                changes.append(i)
+        directions = self._trend_directions(ma_short, ma_long)
+        valid = ~(np.isnan(ma_short) | np.isnan(ma_long))
         
-        changes.append(len(data) - 1)  # End with last index
+        if n > 2:
+            changed = valid[1:n - 1] & (directions[1:n - 1] != directions[:n - 2])
+            changes.extend((np.flatnonzero(changed) + 1).tolist())
+        
+        changes.append(n - 1)  # End with last index
         return changes
     
-    def _get_trend_direction_at_point(self, data: pd.DataFrame, idx: int) -> TrendDirection:
-        """Determine trend direction at specific point."""
-        if pd.isna(data['ma_short'].iloc[idx]) or pd.isna(data['ma_long'].iloc[idx]):
-            return TrendDirection.SIDEWAYS
+    def _trend_directions(self, ma_short: np.ndarray, ma_long: np.ndarray) -> np.ndarray:
+        """Trend direction per bar: 1 uptrend, -1 downtrend, 0 sideways (or no data)."""
+        directions = np.zeros(len(ma_short), dtype=np.int8)
         
-        ma_short = data['ma_short'].iloc[idx]
-        ma_long = data['ma_long'].iloc[idx]
+        # Small threshold to avoid noise; NaN comparisons leave the bar sideways
+        with np.errstate(invalid='ignore'):
+            directions[ma_short > ma_long * 1.001] = 1
+            directions[ma_short < ma_long * 0.999] = -1
         
-        if ma_short > ma_long * 1.001:  # Small threshold to avoid noise
-            return TrendDirection.UPTREND
-        elif ma_short < ma_long * 0.999:
-            return TrendDirection.DOWNTREND
-        else:
-            return TrendDirection.SIDEWAYS
+        return directions
     
-    def _analyze_trend_segment(self, data: pd.DataFrame, start_idx: int, end_idx: int) -> Optional[TrendMove]:
+    def _analyze_trend_segment(self, close: np.ndarray, start_idx: int, end_idx: int, trends: ResultBuilder):
         """Analyze a specific trend segment using linear regression."""
-        segment = data.iloc[start_idx:end_idx + 1]
+        y = close[start_idx:end_idx + 1]
         
-        if len(segment) < self.min_trend_length:
-            return None
+        if len(y) < self.min_trend_length:
+            return
         
         # Linear regression
-        x = np.arange(len(segment))
-        y = segment['close'].values
+        x = np.arange(len(y))
         
         # Remove NaN values
         valid_mask = ~np.isnan(y)
         if np.sum(valid_mask) < self.min_trend_length:
-            return None
+            return
         
         x_valid = x[valid_mask]
         y_valid = y[valid_mask]
@@ -138,11 +140,11 @@ class TrendAnalyzer:
         direction = self._classify_trend_direction(slope, r_squared)
         strength = self._classify_trend_strength(abs(slope), r_squared)
         
-        return TrendMove(
+        trends.append(
             start_idx=start_idx,
             end_idx=end_idx,
-            start_price=segment['close'].iloc[0],
-            end_price=segment['close'].iloc[-1],
+            start_price=y[0],
+            end_price=y[-1],
             direction=direction,
             strength=strength,
             slope=slope,
@@ -1,12 +1,16 @@
 """
 Enhanced Elliott Wave Counter with detailed wave identification.
 """
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Union
 from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
 
+from data.bars import BarArrays, BarData, as_bar_arrays
+from indicators.kernels import swing_pivots
+from utils.result_table import ResultBuilder, ResultTable
+
 
 class WaveDegree(Enum):
     """Elliott Wave degrees from smallest to largest."""
@@ -20,9 +24,9 @@ class WaveDegree(Enum):
     SUPERCYCLE = "Supercycle"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WaveCount:
-    """Detailed wave count information."""
+    """Detailed wave count information (immutable)."""
     wave_number: str  # "1", "2", "3", "4", "5", "A", "B", "C"
     wave_type: str  # "impulse" or "correction"
     degree: WaveDegree
@@ -30,8 +34,8 @@ class WaveCount:
     end_idx: int
     start_price: float
     end_price: float
-    start_time: pd.Timestamp
-    end_time: pd.Timestamp
+    start_time: datetime  # pd.Timestamp, or int epoch seconds for raw arrays
+    end_time: datetime
     direction: str  # "up" or "down"
     length_points: float
     length_percent: float
@@ -55,74 +59,58 @@ class WaveCounter:
             'wave_c_extension': [1.0, 1.618]
         }
     
-    def identify_wave_counts(self, data: pd.DataFrame) -> List[WaveCount]:
-        """Identify and count all Elliott Waves in the data."""
+    def warmup_bars(self) -> int:
+        """Bars needed before the first zigzag pivot can be confirmed."""
+        return 2 * self.sensitivity + 1
+    
+    def identify_wave_counts(self, data: BarData,
+                             columnar: bool = False) -> Union[List[WaveCount], ResultTable]:
+        """
+        Identify and count all Elliott Waves in the data.
+        
+        Accepts a DataFrame, an MT5 rates array or BarArrays. With
+        columnar=True the waves are returned as a ResultTable.
+        """
+        bars = as_bar_arrays(data)
+        wave_counts = ResultBuilder(WaveCount)
+        
         # Find all pivot points
-        pivots = self._find_zigzag_pivots(data)
+        pivots = self._find_zigzag_pivots(bars)
         
         if len(pivots) < 5:
-            return []
+            return wave_counts.build(columnar)
         
-        wave_counts = []
+        # Price spread used to grade wave degree
+        avg_range = bars.price(np.nanstd(bars.close, ddof=1))
         
         # Identify impulse waves (5-wave patterns)
-        impulse_waves = self._identify_impulse_waves(pivots, data)
-        wave_counts.extend(impulse_waves)
+        self._identify_impulse_waves(pivots, bars, avg_range, wave_counts)
         
         # Identify corrective waves (3-wave patterns)
-        corrective_waves = self._identify_corrective_waves(pivots, data)
-        wave_counts.extend(corrective_waves)
+        self._identify_corrective_waves(pivots, bars, avg_range, wave_counts)
         
         # Sort by start index
-        wave_counts.sort(key=lambda w: w.start_idx)
+        if columnar:
+            return wave_counts.to_table().sort_by('start_idx')
         
-        return wave_counts
+        waves = wave_counts.to_list()
+        waves.sort(key=lambda w: w.start_idx)
+        return waves
     
-    def _find_zigzag_pivots(self, data: pd.DataFrame) -> List[Tuple[int, float, str]]:
+    def _find_zigzag_pivots(self, bars: BarArrays) -> List[Tuple[int, float, str]]:
         """Find zigzag pivot points (swing highs and lows)."""
-        pivots = []
-        window = self.sensitivity
-        
-        for i in range(window, len(data) - window):
-            # Check for swing high
-            is_high = True
-            for j in range(1, window + 1):
-                if data['high'].iloc[i] < data['high'].iloc[i-j] or \
-                   data['high'].iloc[i] < data['high'].iloc[i+j]:
-                    is_high = False
-                    break
-            
-            if is_high:
-                pivots.append((i, data['high'].iloc[i], 'high'))
-                continue
-            
-            # Check for swing low
-            is_low = True
-            for j in range(1, window + 1):
-                if data['low'].iloc[i] > data['low'].iloc[i-j] or \
-                   data['low'].iloc[i] > data['low'].iloc[i+j]:
-                    is_low = False
-                    break
-            
-            if is_low:
-                pivots.append((i, data['low'].iloc[i], 'low'))
-        
-        return pivots
+        return swing_pivots(bars.high, bars.low, self.sensitivity, bars.digits)
     
-    def _identify_impulse_waves(self, pivots: List[Tuple], data: pd.DataFrame) -> List[WaveCount]:
+    def _identify_impulse_waves(self, pivots: List[Tuple], bars: BarArrays, avg_range: float,
+                                waves: ResultBuilder):
         """Identify 5-wave impulse patterns."""
-        impulse_waves = []
-        
         # Need at least 5 pivots for a complete impulse
         for i in range(len(pivots) - 4):
             sequence = pivots[i:i+5]
             
             # Check if this is a valid impulse sequence
             if self._is_valid_impulse(sequence):
-                waves = self._create_impulse_count(sequence, data)
-                impulse_waves.extend(waves)
-        
-        return impulse_waves
+                self._create_impulse_count(sequence, bars, avg_range, waves)
     
     def _is_valid_impulse(self, sequence: List[Tuple]) -> bool:
         """Validate if sequence forms a proper 5-wave impulse."""
@@ -174,9 +162,9 @@ class WaveCounter:
         
         return True
     
-    def _create_impulse_count(self, sequence: List[Tuple], data: pd.DataFrame) -> List[WaveCount]:
+    def _create_impulse_count(self, sequence: List[Tuple], bars: BarArrays, avg_range: float,
+                              waves: ResultBuilder):
         """Create detailed wave count for impulse pattern."""
-        waves = []
         is_upward = sequence[0][2] == 'low'
         
         wave_labels = ['1', '2', '3', '4', '5']
@@ -199,39 +187,31 @@ class WaveCounter:
                 if prev_wave_length > 0:
                     fib_ratio = length_points / prev_wave_length
             
-            wave = WaveCount(
+            waves.append(
                 wave_number=label,
                 wave_type='impulse',
-                degree=self._determine_degree(length_points, data),
+                degree=self._determine_degree(length_points, avg_range),
                 start_idx=start_idx,
                 end_idx=end_idx,
                 start_price=start_price,
                 end_price=end_price,
-                start_time=data.index[start_idx] if hasattr(data.index, '__getitem__') else data['timestamp'].iloc[start_idx],
-                end_time=data.index[end_idx] if hasattr(data.index, '__getitem__') else data['timestamp'].iloc[end_idx],
+                start_time=bars.label_at(start_idx),
+                end_time=bars.label_at(end_idx),
                 direction=direction,
                 length_points=length_points,
                 length_percent=length_percent,
                 fibonacci_ratio=fib_ratio
             )
-            
-            waves.append(wave)
-        
-        return waves
     
-    def _identify_corrective_waves(self, pivots: List[Tuple], data: pd.DataFrame) -> List[WaveCount]:
+    def _identify_corrective_waves(self, pivots: List[Tuple], bars: BarArrays, avg_range: float,
+                                   waves: ResultBuilder):
         """Identify 3-wave corrective patterns (ABC)."""
-        corrective_waves = []
-        
         # Need at least 3 pivots for a correction
         for i in range(len(pivots) - 2):
             sequence = pivots[i:i+3]
             
             if self._is_valid_correction(sequence):
-                waves = self._create_corrective_count(sequence, data)
-                corrective_waves.extend(waves)
-        
-        return corrective_waves
+                self._create_corrective_count(sequence, bars, avg_range, waves)
     
     def _is_valid_correction(self, sequence: List[Tuple]) -> bool:
         """Validate if sequence forms a proper ABC correction."""
@@ -246,9 +226,9 @@ class WaveCounter:
         
         return zigzag_up or zigzag_down
     
-    def _create_corrective_count(self, sequence: List[Tuple], data: pd.DataFrame) -> List[WaveCount]:
+    def _create_corrective_count(self, sequence: List[Tuple], bars: BarArrays, avg_range: float,
+                                 waves: ResultBuilder):
         """Create detailed wave count for corrective pattern."""
-        waves = []
         wave_labels = ['A', 'B', 'C']
         
         for idx, label in enumerate(wave_labels):
@@ -269,31 +249,24 @@ class WaveCounter:
                 if wave_a_length > 0:
                     fib_ratio = length_points / wave_a_length
             
-            wave = WaveCount(
+            waves.append(
                 wave_number=label,
                 wave_type='correction',
-                degree=self._determine_degree(length_points, data),
+                degree=self._determine_degree(length_points, avg_range),
                 start_idx=start_idx,
                 end_idx=end_idx,
                 start_price=start_price,
                 end_price=end_price,
-                start_time=data.index[start_idx] if hasattr(data.index, '__getitem__') else data['timestamp'].iloc[start_idx],
-                end_time=data.index[end_idx] if hasattr(data.index, '__getitem__') else data['timestamp'].iloc[end_idx],
+                start_time=bars.label_at(start_idx),
+                end_time=bars.label_at(end_idx),
                 direction=direction,
                 length_points=length_points,
                 length_percent=length_percent,
                 fibonacci_ratio=fib_ratio
             )
-            
-            waves.append(wave)
-        
-        return waves
     
-    def _determine_degree(self, wave_length: float, data: pd.DataFrame) -> WaveDegree:
-        """Determine wave degree based on length and timeframe."""
-        # Calculate average price range
-        avg_range = data['close'].std()
-        
+    def _determine_degree(self, wave_length: float, avg_range: float) -> WaveDegree:
+        """Determine wave degree based on length relative to the close price spread."""
         ratio = wave_length / avg_range if avg_range > 0 else 0
         
         if ratio > 5:
@@ -1,27 +1,143 @@
 """
 Live MT5 forex analysis with Elliott Wave counting.
 """
+import argparse
+import asyncio
 import json
+import os
 import sys
-from datetime import datetime
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from data.async_connector import AsyncConnector
+from data.bar_scheduler import BarCloseScheduler, last_bar_close
+from data.bars import as_bar_arrays
+from data.fetch_planner import FetchPlanner
 from data.mt5_connector import MT5Connector
+from data.replay_connector import ReplayConnector
+from data.shared_bars import SharedBarStore, call_with_bars
+from data.state_snapshot import StateSnapshot, load_snapshot, save_snapshot
+from data.validation import validate_bars
+from utils.metrics import StageMetrics
+from utils.result_diff import ResultDiff, analyzer_params, diff_results, input_fingerprint
 from analyzers.multi_timeframe_analyzer import MultiTimeframeAnalyzer
 from indicators.wave_counter import WaveCounter
 from indicators.trend_analysis import TrendAnalyzer
 from indicators.chart_patterns import ChartPatternRecognizer
 
+# Analyzer stages by priority: under a cycle budget the last ones are deferred first
+ANALYSIS_STAGES = ('waves', 'trends', 'patterns', 'movements')
+
+
+def analyze_bars(wave_counter: WaveCounter, trend_analyzer: TrendAnalyzer,
+                 pattern_recognizer: ChartPatternRecognizer, symbol: str, timeframe: str, data) -> Dict:
+    """
+    Run the analyzer stack on the bars of one pair.
+    
+    A module-level function so that it can run in a worker process.
+    """
+    return analyze_bars_timed(wave_counter, trend_analyzer, pattern_recognizer, symbol, timeframe, data)[0]
+
+
+def analyze_bars_timed(wave_counter: WaveCounter, trend_analyzer: TrendAnalyzer,
+                       pattern_recognizer: ChartPatternRecognizer, symbol: str, timeframe: str,
+                       data, stages: Tuple[str, ...] = ANALYSIS_STAGES, deadline: Optional[float] = None,
+                       estimates: Optional[Dict[str, float]] = None) -> Tuple[Dict, Dict[str, float]]:
+    """
+    analyze_bars plus the seconds each analyzer took, keyed like the results.
+    
+    Stages run in the given order, highest priority first. With a deadline
+    (epoch seconds), a stage after the first that is not expected to finish
+    in time according to estimates (seconds per stage) is skipped, and so is
+    every stage after it; skipped stages have None results.
+    """
+    pip_analyzer = MultiTimeframeAnalyzer(symbol, pip_intervals=(20, 30))
+    runners = {
+        'waves': wave_counter.identify_wave_counts,
+        'trends': trend_analyzer.identify_trends,
+        'patterns': pattern_recognizer.find_all_patterns,
+        'movements': lambda bars: pip_analyzer.analyze_timeframe(bars, timeframe),
+    }
+    results, durations = {}, {}
+    skipping = False
+    for i, stage in enumerate(stages):
+        if deadline is not None and i > 0 and not skipping:
+            skipping = time.time() + (estimates or {}).get(stage, 0.0) > deadline
+        if skipping:
+            results[stage] = None
+            continue
+        started = time.perf_counter()
+        results[stage] = runners[stage](data)
+        durations[stage] = time.perf_counter() - started
+    return results, durations
+
+
+def deferred_stages(results: Dict) -> Tuple[str, ...]:
+    """Stages of a partial result that were skipped to meet a deadline."""
+    return tuple(stage for stage, items in results.items() if items is None)
+
 
 class LiveForexAnalyzer:
     """Live forex analysis using MT5 data."""
     
-    def __init__(self, config_path: str = 'config/pairs.json'):
-        self.connector = MT5Connector()
+    def __init__(self, config_path: str = 'config/pairs.json', connector: MT5Connector = None):
+        """
+        Args:
+            config_path: Path to the pairs configuration
+            connector: Data source (default: a live MT5Connector; pass a
+                data.replay_connector.ReplayConnector to run offline)
+        """
+        self.connector = connector if connector is not None else MT5Connector()
         self.config = self._load_config(config_path)
         
         # Initialize analyzers
         self.wave_counter = WaveCounter(sensitivity=5)
         self.trend_analyzer = TrendAnalyzer()
         self.pattern_recognizer = ChartPatternRecognizer()
+        
+        # Fetch sizes from the analyzers' warm-up plus the configured lookback
+        self.fetch_planner = FetchPlanner.from_config(
+            self.config, [self.wave_counter, self.trend_analyzer, self.pattern_recognizer])
+        if self.connector.fetch_planner is None:
+            self.connector.fetch_planner = self.fetch_planner
+        
+        # Bounded mode: a hard history limit per symbol and timeframe. The
+        # analyzers keep no state between cycles, so pivots, waves and
+        # patterns only ever cover the buffered bars and age out with them.
+        if self.fetch_planner.max_bars is not None:
+            self.connector.max_bars = self.fetch_planner.max_bars
+        
+        # Analyze prices as integer points at each symbol's quote digits
+        self.fixed_point = self.config.get('analysis_settings', {}).get('fixed_point_prices', False)
+        self._digits = {}
+        
+        # Last input fingerprint, results and bar times per (symbol, timeframe)
+        self._last_cycle: Dict[Tuple[str, str], Tuple[tuple, Dict, Optional[np.ndarray]]] = {}
+        # Times of the bars after gaps already reported, per (symbol, timeframe)
+        self._seen_gaps: Dict[Tuple[str, str], set] = {}
+        
+        # Per-stage latency histograms; 'metrics' settings choose the exports
+        self.metrics = StageMetrics()
+        self.metrics_settings = self.config.get('analysis_settings', {}).get('metrics', {})
+        self._metric_exports = 0
+        
+        # Latency budget per monitoring cycle: stages that would overrun it
+        # are deferred until the cycle's critical results are out
+        self.cycle_budget = self.config.get('analysis_settings', {}).get('cycle_budget_seconds')
+        self._deferred: List[Tuple[str, str, Dict, object]] = []
+        
+        # Bars and last results are snapshotted to 'path' for warm restarts
+        self.snapshot_settings = self.config.get('analysis_settings', {}).get('state_snapshot', {})
+        self._checkpoints = 0  # Cycles since the last snapshot
+        self._unsaved = 0  # Pair results since the last snapshot
+        self._saved_at = time.monotonic()
+        
+        # Keep bars as float32 prices and 32-bit counters
+        if self.config.get('analysis_settings', {}).get('compact_bars', False):
+            self.connector.compact = True
     
     def _load_config(self, path: str):
         """Load configuration."""
@@ -54,31 +170,329 @@ class LiveForexAnalyzer:
         
         return True
     
-    def analyze_pair(self, symbol: str, timeframe: str = 'H1', bars: int = 200):
-        """Analyze a single currency pair."""
-        print(f"\n{'='*70}")
-        print(f"📊 LIVE ANALYSIS: {symbol} - {timeframe}")
-        print(f"{'='*70}")
-        print(f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    def _symbol_digits(self, symbol: str):
+        """Quote digits of symbol from the terminal (cached), or None if unknown."""
+        if symbol not in self._digits:
+            info = self.connector.get_symbol_info(symbol)
+            self._digits[symbol] = info['digits'] if info else None
+        return self._digits[symbol]
+    
+    def fetch_pair(self, symbol: str, timeframe: str = 'H1', bars: int = None,
+                   snapshot: bool = False) -> Optional[Dict]:
+        """
+        Fetch, validate and prepare the bars of one pair for analysis.
         
-        # Get live data from MT5
-        data = self.connector.get_live_data(symbol, timeframe, bars)
+        Args:
+            symbol: Currency pair
+            timeframe: Timeframe to fetch
+            bars: Number of bars (default: the fetch plan)
+            snapshot: Copy the bars out of the connector's ring buffer, so
+                they stay valid while the next fetch runs
+        
+        Returns:
+            Dict with 'data' and 'current_price', or None if nothing was fetched
+        """
+        if bars is None:
+            bars = self.fetch_planner.bars_for(timeframe)
+        
+        # Get live data from MT5 (raw rates array, no DataFrame conversion)
+        with self.metrics.time('fetch', symbol, timeframe):
+            data = self.connector.get_live_data(symbol, timeframe, bars, as_array=True, incremental=True)
+            current_price = self.connector.get_current_price(symbol) if data is not None else None
         
         if data is None:
             print(f"❌ Could not fetch data for {symbol}")
+            self.metrics.increment('fetch_failed', symbol, timeframe)
+            return None
+        
+        data = self._prepare(symbol, timeframe, data, snapshot)
+        return {'data': data, 'current_price': current_price}
+    
+    def _prepare(self, symbol: str, timeframe: str, data, snapshot: bool = False):
+        """Validate and clean fetched bars, converting them to points if configured."""
+        with self.metrics.time('prepare', symbol, timeframe):
+            # Drop bad bars before they distort pivots; gaps are only reported
+            report = validate_bars(data, timeframe)
+            if not report.ok:
+                issues = report.summary()
+                new_gaps = self._new_gaps(symbol, timeframe, data, report)
+                if issues['invalid_ohlc'] or issues['out_of_order'] or issues['spikes'] or new_gaps:
+                    print(f"⚠️ Data issues: {issues['invalid_ohlc']} invalid, {issues['out_of_order']} out of order, "
+                          f"{issues['gaps']} gaps ({new_gaps} new), {issues['spikes']} spikes")
+                data = report.clean(data)
+            else:
+                self._seen_gaps.pop((symbol, timeframe), None)
+            
+            if self.fixed_point:
+                digits = self._symbol_digits(symbol)
+                if digits is not None:
+                    data = as_bar_arrays(data).to_points(digits)
+            elif snapshot and isinstance(data, np.ndarray):
+                data = data.copy()
+        
+        return data
+    
+    def _new_gaps(self, symbol: str, timeframe: str, data, report) -> int:
+        """Count the gaps not reported in earlier cycles; gaps that left the window are forgotten."""
+        times = as_bar_arrays(data).epoch_seconds()
+        after_gap = np.flatnonzero(report.gap_before)
+        gaps = set((after_gap if times is None else times[after_gap]).tolist())
+        seen = self._seen_gaps.get((symbol, timeframe), set())
+        self._seen_gaps[(symbol, timeframe)] = gaps
+        return len(gaps - seen)
+    
+    def analyze_pair(self, symbol: str, timeframe: str = 'H1', bars: int = None,
+                     deadline: Optional[float] = None) -> Optional[Dict]:
+        """
+        Analyze a single currency pair (bars default to the fetch plan).
+        
+        When the fetched bars are the same as in the previous call, the
+        previous results are returned without running the analyzers. With a
+        deadline, stages that would overrun it are skipped and queued for
+        run_deferred().
+        """
+        self._print_header(symbol, timeframe)
+        
+        fetched = self.fetch_pair(symbol, timeframe, bars)
+        if fetched is None:
+            return None
+        
+        fingerprint = self._fingerprint(symbol, timeframe, fetched['data'])
+        cached = self._unchanged(symbol, timeframe, fingerprint)
+        if cached is not None:
+            return cached
+        
+        results, durations = analyze_bars_timed(self.wave_counter, self.trend_analyzer,
+                                                self.pattern_recognizer, symbol, timeframe, fetched['data'],
+                                                **self._budget_options(symbol, timeframe, deadline))
+        self._record(symbol, timeframe, durations)
+        changes = self._remember(symbol, timeframe, fingerprint, fetched['data'], results)
+        self._report(symbol, timeframe, results, len(fetched['data']), fetched['current_price'], changes)
+        if deferred_stages(results):
+            # The bars stay valid until this pair's next fetch
+            self._deferred.append((symbol, timeframe, results, fetched['data']))
+        return results
+    
+    def run_deferred(self):
+        """Run the stages analyze_pair() deferred, completing their partial results."""
+        deferred, self._deferred = self._deferred, []
+        for symbol, timeframe, results, data in deferred:
+            try:
+                done, durations = analyze_bars_timed(self.wave_counter, self.trend_analyzer, self.pattern_recognizer,
+                                                     symbol, timeframe, data, stages=deferred_stages(results))
+            except Exception as e:
+                print(f"❌ Error analyzing {symbol}: {e}")
+                self.metrics.increment('error', symbol, timeframe)
+                continue
+            self._complete(symbol, timeframe, results, done, durations)
+    
+    def refresh_pair(self, symbol: str, timeframe: str = 'H1', bars: int = None) -> Optional[Dict]:
+        """
+        Fetch and analyze one pair without printing a report.
+        
+        Returns:
+            Dict with 'results', 'changes' (None on the first cycle) and a
+            JSON-friendly 'summary', or None when nothing was fetched or the
+            bars are unchanged since the previous call
+        """
+        fetched = self.fetch_pair(symbol, timeframe, bars)
+        if fetched is None:
+            return None
+        
+        fingerprint = self._fingerprint(symbol, timeframe, fetched['data'])
+        if self._unchanged(symbol, timeframe, fingerprint) is not None:
+            return None
+        
+        results, durations = analyze_bars_timed(self.wave_counter, self.trend_analyzer,
+                                                self.pattern_recognizer, symbol, timeframe, fetched['data'])
+        self._record(symbol, timeframe, durations)
+        changes = self._remember(symbol, timeframe, fingerprint, fetched['data'], results)
+        self._record_latency(symbol, timeframe)
+        return {'results': results, 'changes': changes,
+                'summary': self._summarize(fetched['data'], results, fetched['current_price'])}
+    
+    def _fingerprint(self, symbol: str, timeframe: str, data) -> tuple:
+        """Identity of an analysis input, including the analyzer settings."""
+        return input_fingerprint(data, symbol, timeframe, analyzer_params(
+            self.wave_counter, self.trend_analyzer, self.pattern_recognizer))
+    
+    def _unchanged(self, symbol: str, timeframe: str, fingerprint: tuple) -> Optional[Dict]:
+        """Previous results if the input has not changed since the last cycle, else None."""
+        last = self._last_cycle.get((symbol, timeframe))
+        if last is None or last[0] != fingerprint:
+            return None
+        print(f"⏭️ No new data for {symbol} ({timeframe}), results unchanged")
+        self.metrics.increment('unchanged', symbol, timeframe)
+        return last[1]
+    
+    def _remember(self, symbol: str, timeframe: str, fingerprint: tuple, data,
+                  results: Dict) -> Optional[Dict[str, ResultDiff]]:
+        """Store a cycle's results and return their differences to the previous cycle."""
+        # Copied: the bars can be a view of the connector's ring buffer
+        times = as_bar_arrays(data).epoch_seconds()
+        times = None if times is None else np.array(times)
+        last = self._last_cycle.get((symbol, timeframe))
+        self._last_cycle[(symbol, timeframe)] = (fingerprint, results, times)
+        self._unsaved += 1
+        if last is None:
+            return None
+        # Stages deferred in either cycle have nothing to compare
+        return {kind: diff_results(last[1][kind], items, last[2], times)
+                for kind, items in results.items()
+                if items is not None and last[1].get(kind) is not None}
+    
+    def _print_changes(self, changes: Optional[Dict[str, ResultDiff]]):
+        """Print what changed since the previous cycle."""
+        if changes is None:
             return
+        parts = [f"{kind}: +{len(d.added)} ~{len(d.changed)} -{len(d.removed)}"
+                 for kind, d in changes.items() if d]
+        print(f"🆕 Since last cycle: {', '.join(parts) if parts else 'no changes'}")
+        for wave in changes['waves'].added[-3:]:
+            print(f"   + Wave {wave.wave_number} ({wave.wave_type}): {wave.direction} "
+                  f"{wave.start_price:.5f} → {wave.end_price:.5f}")
+        for pattern in changes['patterns'].added[-3:] if 'patterns' in changes else ():
+            print(f"   + {pattern.pattern_type.value}: Confidence {pattern.confidence:.2f}")
+    
+    def _record(self, symbol: str, timeframe: str, durations: Dict[str, float]):
+        """Record the analyzer durations of one pair."""
+        for stage, seconds in durations.items():
+            self.metrics.observe(stage, symbol, timeframe, seconds)
+    
+    def _deadline(self) -> Optional[float]:
+        """End of a cycle starting now under the cycle budget, or None without one."""
+        return None if self.cycle_budget is None else time.time() + self.cycle_budget
+    
+    def _budget_options(self, symbol: str, timeframe: str, deadline: Optional[float]) -> Dict:
+        """analyze_bars_timed options to meet a deadline, estimating stages by their mean duration."""
+        if deadline is None:
+            return {}
+        return {'deadline': deadline,
+                'estimates': {stage: self.metrics.mean(stage, symbol, timeframe) or 0.0
+                              for stage in ANALYSIS_STAGES}}
+    
+    def _complete(self, symbol: str, timeframe: str, results: Dict, done: Dict, durations: Dict[str, float]):
+        """Fill deferred stages into a partial result (the one remembered for the next diff) and report them."""
+        self._record(symbol, timeframe, durations)
+        results.update(done)
+        self._unsaved += 1
+        parts = ', '.join(f"{stage} {len(items)}" for stage, items in done.items())
+        print(f"🕓 {symbol} ({timeframe}) deferred stages done: {parts}")
+    
+    def _record_latency(self, symbol: str, timeframe: str):
+        """Record how long after its latest bar close a pair's results came out."""
+        now = self.connector.now()
+        self.metrics.observe_latency(symbol, timeframe, now - last_bar_close(now, timeframe))
+    
+    def _report(self, symbol: str, timeframe: str, results: Dict, bars: int,
+                current_price: Optional[Dict], changes: Optional[Dict[str, ResultDiff]]):
+        """Print a pair's results and changes, timing the output as the report stage."""
+        with self.metrics.time('report', symbol, timeframe):
+            self._print_results(results, bars, current_price)
+            self._print_changes(changes)
+        self._record_latency(symbol, timeframe)
+        if deferred_stages(results):
+            self.metrics.increment('partial', symbol, timeframe)
+    
+    def _submit_analysis(self, cpu_pool: Executor, shared: Optional[SharedBarStore],
+                         symbol: str, timeframe: str, data, **options) -> Future:
+        """
+        Analyze one pair in cpu_pool, passing the bars through shared memory if a store is given.
+        
+        Options (stages, deadline, estimates) go to analyze_bars_timed.
+        """
+        analyzers = (self.wave_counter, self.trend_analyzer, self.pattern_recognizer)
+        run = partial(analyze_bars_timed, **options) if options else analyze_bars_timed
+        if shared is None:
+            return cpu_pool.submit(run, *analyzers, symbol, timeframe, data)
+        handle = shared.publish((symbol, timeframe), data)
+        future = cpu_pool.submit(call_with_bars, handle, run, *analyzers, symbol, timeframe)
+        future.add_done_callback(lambda _: shared.release(handle))
+        return future
+    
+    def analyze_pairs(self, tasks: List[Tuple[str, str]], io_pool: ThreadPoolExecutor,
+                      cpu_pool: Executor, shared: Optional[SharedBarStore] = None,
+                      deadline: Optional[float] = None):
+        """
+        Analyze several (symbol, timeframe) pairs concurrently.
+        
+        Fetches run on io_pool; each pair goes to cpu_pool for analysis as
+        soon as its bars arrive, and reports are printed in completion order.
+        With a SharedBarStore the bars reach the analysis processes through
+        shared memory instead of being pickled into every task. With a
+        deadline, stages that would overrun it are skipped and run once every
+        pair has reported.
+        """
+        # Publishing copies the bars, so a snapshot is only needed for pickling
+        fetches = {io_pool.submit(self.fetch_pair, symbol, timeframe, snapshot=shared is None): (symbol, timeframe)
+                   for symbol, timeframe in tasks}
+        analyses = {}
+        for future in as_completed(fetches):
+            symbol, timeframe = fetches[future]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                print(f"❌ Error fetching {symbol}: {e}")
+                self.metrics.increment('error', symbol, timeframe)
+                continue
+            if fetched is None:
+                continue
+            fingerprint = self._fingerprint(symbol, timeframe, fetched['data'])
+            if self._unchanged(symbol, timeframe, fingerprint) is not None:
+                continue
+            fetched['fingerprint'] = fingerprint
+            work = self._submit_analysis(cpu_pool, shared, symbol, timeframe, fetched['data'],
+                                         **self._budget_options(symbol, timeframe, deadline))
+            analyses[work] = (symbol, timeframe, fetched)
+        
+        deferred = []
+        for future in as_completed(analyses):
+            symbol, timeframe, fetched = analyses[future]
+            try:
+                results, durations = future.result()
+            except Exception as e:
+                print(f"❌ Error analyzing {symbol}: {e}")
+                self.metrics.increment('error', symbol, timeframe)
+                continue
+            self._record(symbol, timeframe, durations)
+            changes = self._remember(symbol, timeframe, fetched['fingerprint'], fetched['data'], results)
+            self._print_header(symbol, timeframe)
+            self._report(symbol, timeframe, results, len(fetched['data']), fetched['current_price'], changes)
+            if deferred_stages(results):
+                deferred.append((symbol, timeframe, results, fetched['data']))
         
-        # Get current price
-        current_price = self.connector.get_current_price(symbol)
+        # Low-priority stages skipped for the deadline, after every pair's critical ones
+        analyses = {self._submit_analysis(cpu_pool, shared, symbol, timeframe, data,
+                                          stages=deferred_stages(results)): (symbol, timeframe, results)
+                    for symbol, timeframe, results, data in deferred}
+        for future in as_completed(analyses):
+            symbol, timeframe, results = analyses[future]
+            try:
+                done, durations = future.result()
+            except Exception as e:
+                print(f"❌ Error analyzing {symbol}: {e}")
+                self.metrics.increment('error', symbol, timeframe)
+                continue
+            self._complete(symbol, timeframe, results, done, durations)
+    
+    def _print_header(self, symbol: str, timeframe: str):
+        """Print the banner of a pair report."""
+        print(f"\n{'='*70}")
+        print(f"📊 LIVE ANALYSIS: {symbol} - {timeframe}")
+        print(f"{'='*70}")
+        print(f"⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    
+    def _print_results(self, results: Dict, bars: int, current_price: Optional[Dict]):
+        """Print the analyzer results of one pair."""
         if current_price:
             print(f"💹 Current Price: Bid {current_price['bid']:.5f} | Ask {current_price['ask']:.5f}")
             print(f"   Spread: {current_price['spread']:.5f}")
         
-        print(f"📈 Analyzing {len(data)} bars...")
+        print(f"📈 Analyzing {bars} bars...")
         
-        # Run Elliott Wave counting
+        # Elliott Wave counting
         print("\n🔵 Elliott Wave Count:")
-        wave_counts = self.wave_counter.identify_wave_counts(data)
+        wave_counts = results['waves']
         
         if wave_counts:
             summary = self.wave_counter.get_wave_summary(wave_counts)
@@ -95,22 +509,26 @@ class LiveForexAnalyzer:
         else:
             print("   No clear wave patterns detected yet")
         
-        # Run trend analysis
+        # Trend analysis
         print("\n📈 Trend Analysis:")
-        trends = self.trend_analyzer.identify_trends(data)
+        trends = results['trends']
         
-        if trends:
+        if trends is None:
+            print("   ⏳ Deferred (cycle budget)")
+        elif trends:
             latest_trend = trends[-1]
             print(f"   Current Trend: {latest_trend.direction.value.upper()} ({latest_trend.strength.value})")
             print(f"   Price: {latest_trend.start_price:.5f} → {latest_trend.end_price:.5f}")
             print(f"   Change: {latest_trend.percentage_change:+.2f}%")
             print(f"   R²: {latest_trend.r_squared:.3f}")
         
-        # Run chart pattern recognition
+        # Chart pattern recognition
         print("\n🎯 Chart Patterns:")
-        patterns = self.pattern_recognizer.find_all_patterns(data)
+        patterns = results['patterns']
         
-        if patterns:
+        if patterns is None:
+            print("   ⏳ Deferred (cycle budget)")
+        elif patterns:
             print(f"   Found {len(patterns)} patterns")
             for pattern in patterns[:3]:
                 print(f"   • {pattern.pattern_type.value}: Confidence {pattern.confidence:.2f}")
@@ -121,10 +539,11 @@ class LiveForexAnalyzer:
         
         # Pip analysis
         print("\n📍 Pip Movement Analysis (20-30 pips):")
-        pip_analyzer = MultiTimeframeAnalyzer(symbol, pip_intervals=(20, 30))
-        pip_movements = pip_analyzer.analyze_timeframe(data, timeframe)
+        pip_movements = results['movements']
         
-        if pip_movements:
+        if pip_movements is None:
+            print("   ⏳ Deferred (cycle budget)")
+        elif pip_movements:
             print(f"   Found {len(pip_movements)} movements")
             for mov in pip_movements[-5:]:
                 print(f"   • {mov.direction.upper()}: {mov.pip_change:.1f} pips "
@@ -133,6 +552,11 @@ class LiveForexAnalyzer:
         # Trading recommendation
         self._print_trading_recommendation(wave_counts, trends, patterns, current_price)
         
+        deferred = deferred_stages(results)
+        if deferred:
+            print(f"\n⚠️ Partial result: {', '.join(deferred)} deferred to stay within the "
+                  f"{self.cycle_budget:g}s cycle budget")
+        
         print(f"\n{'='*70}\n")
     
     def _print_trading_recommendation(self, waves, trends, patterns, current_price):
@@ -174,47 +598,420 @@ class LiveForexAnalyzer:
             print(f"   💹 Current: {current_price['bid']:.5f}")
     
     def run_live_monitoring(self, symbols: list = None, timeframe: str = 'H1', 
-                           interval: int = 300):
+                           interval: int = None, workers: int = None, timeframes: list = None):
         """
         Run continuous live monitoring.
         
+        By default a cycle runs right after each bar close and analyzes the
+        (symbol, timeframe) pairs whose bar just closed; timeframes closing
+        together (M5, M15 and H1 at the top of the hour) share one cycle.
+        Each cycle fetches on a thread pool and analyzes in a process pool,
+        so it takes about as long as the slowest pair.
+        
+        With analysis_settings.cycle_budget_seconds set, each pair runs its
+        analyzers in priority order (waves, trends, patterns, movements) and
+        defers those that would not finish within the budget; its report is
+        marked partial, and the deferred stages run after every pair of the
+        cycle has reported.
+        
         Args:
-            symbols: List of symbols to monitor (default: from config)
+            symbols: List of symbols to monitor (default: all configured pairs)
             timeframe: Timeframe to analyze
-            interval: Update interval in seconds (default: 5 minutes)
+            interval: Fixed update interval in seconds instead of bar closes
+            workers: Analysis processes (default: one per CPU, at most one
+                per symbol; 1 analyzes the symbols one after another)
+            timeframes: Several timeframes to analyze (default: [timeframe])
         """
         if symbols is None:
-            symbols = self.config.get('major_pairs', ['EURUSD'])[:3]
+            symbols = (self.config.get('major_pairs', ['EURUSD'])
+                       + self.config.get('cross_pairs', []))
+        timeframes = [tf.upper() for tf in (timeframes or [timeframe])]
+        tasks = [(symbol, tf) for tf in timeframes for symbol in symbols]
+        if workers is None:
+            workers = min(len(tasks), os.cpu_count() or 1)
         
         print(f"\n{'='*70}")
         print(f"🔴 LIVE MONITORING STARTED")
         print(f"{'='*70}")
         print(f"Symbols: {', '.join(symbols)}")
-        print(f"Timeframe: {timeframe}")
-        print(f"Update Interval: {interval} seconds ({interval//60} minutes)")
+        print(f"Timeframes: {', '.join(timeframes)}")
+        if interval is None:
+            print(f"Updates: right after each bar close")
+        else:
+            print(f"Update Interval: {interval} seconds ({interval//60} minutes)")
+        print(f"Workers: {workers}")
         print(f"Press Ctrl+C to stop")
         print(f"{'='*70}\n")
         
+        io_pool = cpu_pool = shared = None
+        if workers > 1:
+            shared = SharedBarStore()
+            io_pool = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='fetch')
+            cpu_pool = ProcessPoolExecutor(max_workers=workers)
+        
+        self._start_state()
+        self._start_metrics()
+        
+        def run_cycle(batch):
+            started = datetime.now()
+            deadline = self._deadline()
+            
+            if cpu_pool is not None:
+                self.analyze_pairs(batch, io_pool, cpu_pool, shared, deadline)
+            else:
+                for symbol, tf in batch:
+                    try:
+                        self.analyze_pair(symbol, tf, deadline=deadline)
+                    except Exception as e:
+                        print(f"❌ Error analyzing {symbol}: {e}")
+                        self.metrics.increment('error', symbol, tf)
+                self.run_deferred()
+            
+            elapsed = (datetime.now() - started).total_seconds()
+            print(f"\n⏱️ Cycle took {elapsed:.2f}s for {len(batch)} symbol/timeframe pairs")
+            self._export_metrics()
+            self._checkpoint_state()
+            
+            ceiling = self.connector.buffer_ceiling()
+            if ceiling is not None:
+                print(f"\n🧠 Bar buffers: {self.connector.buffer_nbytes() / 1e6:.1f} MB "
+                      f"(ceiling {ceiling * len(tasks) / 1e6:.1f} MB)")
+        
         try:
+            if interval is None:
+                if not self.connector.sync_server_time(symbols[0]):
+                    print("⚠️ Could not read the server clock, assuming UTC bar times")
+                cycles = []
+                
+                def on_bar_close(close_time, batch):
+                    cycles.append(close_time)
+                    closed = sorted({tf for _, tf in batch}, key=timeframes.index)
+                    print(f"\n🔄 Analysis Cycle #{len(cycles)} - "
+                          f"{datetime.fromtimestamp(close_time, timezone.utc):%Y-%m-%d %H:%M} close "
+                          f"({', '.join(closed)})")
+                    run_cycle(batch)
+                    print(f"{'='*70}")
+                
+                BarCloseScheduler(tasks).run(self.connector, on_bar_close)
+                print("\n⏹️ No more data, monitoring stopped")
+                return
+            
             cycle = 1
             while True:
                 print(f"\n🔄 Analysis Cycle #{cycle} - {datetime.now().strftime('%H:%M:%S')}")
-                
-                for symbol in symbols:
-                    try:
-                        self.analyze_pair(symbol, timeframe)
-                    except Exception as e:
-                        print(f"❌ Error analyzing {symbol}: {e}")
+                run_cycle(tasks)
                 
                 print(f"\n⏳ Next update in {interval} seconds...")
                 print(f"{'='*70}")
                 
-                import time
-                time.sleep(interval)
+                if not self.connector.wait(interval):
+                    print("\n⏹️ No more data, monitoring stopped")
+                    break
                 cycle += 1
         
         except KeyboardInterrupt:
             print("\n\n⏹️ Live monitoring stopped by user")
+        finally:
+            if cpu_pool is not None:
+                cpu_pool.shutdown(cancel_futures=True)
+                io_pool.shutdown(cancel_futures=True)
+                shared.close()
+            self._stop_state()
+            self._stop_metrics()
+    
+    async def monitor_async(self, symbols: list = None, timeframes: list = None,
+                            workers: int = None, port: int = None, host: str = '127.0.0.1'):
+        """
+        Monitor many (symbol, timeframe) pairs on one asyncio event loop.
+        
+        Every pair gets a bar stream from an AsyncConnector, so fetching
+        needs neither a thread per pair nor a thread per cycle. Streams feed
+        one bounded analysis queue drained by `workers` coroutines that run
+        the analyzers in a process pool; when analysis falls behind, the
+        queue fills up and the streams stop fetching (backpressure) instead
+        of buffering bars. Updates of the same pair are analyzed one at a
+        time and in arrival order.
+        
+        Args:
+            symbols: Symbols to monitor (default: all configured pairs)
+            timeframes: Timeframes to monitor (default: ['H1'])
+            workers: Analysis processes (default: one per CPU)
+            port: Serve the latest results as JSON over HTTP on this port
+            host: Interface to serve results on (default: this machine only)
+        """
+        if symbols is None:
+            symbols = (self.config.get('major_pairs', ['EURUSD'])
+                       + self.config.get('cross_pairs', []))
+        timeframes = [tf.upper() for tf in (timeframes or ['H1'])]
+        tasks = [(symbol, tf) for tf in timeframes for symbol in symbols]
+        if workers is None:
+            workers = min(len(tasks), os.cpu_count() or 1)
+        
+        print(f"\n{'='*70}")
+        print(f"🔴 ASYNC LIVE MONITORING STARTED")
+        print(f"{'='*70}")
+        print(f"Symbols: {', '.join(symbols)}")
+        print(f"Timeframes: {', '.join(timeframes)}")
+        print(f"Updates: right after each bar close")
+        print(f"Workers: {workers}")
+        if port is not None:
+            print(f"Results: http://{host}:{port}/")
+        print(f"{'='*70}\n")
+        
+        if not self.connector.sync_server_time(symbols[0]):
+            print("⚠️ Could not read the server clock, assuming UTC bar times")
+        
+        self._start_state()
+        aconn = AsyncConnector(self.connector, metrics=self.metrics)
+        shared = SharedBarStore()
+        cpu_pool = ProcessPoolExecutor(max_workers=workers)
+        pending: asyncio.Queue = asyncio.Queue(2 * workers)
+        # One update per pair at a time; an uncontended lock is taken without
+        # yielding, and waiters get it in FIFO order, so updates stay in order
+        pair_locks = {task: asyncio.Lock() for task in tasks}
+        latest: Dict[str, Dict] = {}
+        background = set()
+        reports = 0
+        saving: Optional[asyncio.Future] = None
+        
+        async def save(snapshot: StateSnapshot):
+            try:
+                await aconn.run(self._write_state, self.snapshot_settings['path'], snapshot)
+            except Exception as e:
+                print(f"❌ Could not save state snapshot: {e}")
+        
+        def checkpoint():
+            # Taken here between reports; pickling and writing run on the executor
+            nonlocal saving
+            if (saving is None or saving.done()) and self._checkpoint_due():
+                saving = asyncio.create_task(save(self._state_snapshot()))
+        
+        if self.fixed_point:
+            # Symbol info is a blocking call; look the digits up before the streams start
+            await asyncio.gather(*(aconn.run(self._symbol_digits, symbol) for symbol in symbols))
+        
+        async def feed(symbol: str, timeframe: str):
+            async for rates in aconn.bar_stream(symbol, timeframe):
+                # The budget runs from the arrival of the bars
+                deadline = self._deadline()
+                await pending.put((symbol, timeframe, rates, await aconn.get_current_price(symbol), deadline))
+        
+        async def complete(symbol: str, timeframe: str, data, results: Dict, current_price: Optional[Dict]):
+            try:
+                done, durations = await asyncio.wrap_future(self._submit_analysis(
+                    cpu_pool, shared, symbol, timeframe, data, stages=deferred_stages(results)))
+            except Exception as e:
+                print(f"❌ Error analyzing {symbol}: {e}")
+                self.metrics.increment('error', symbol, timeframe)
+                return
+            self._complete(symbol, timeframe, results, done, durations)
+            if self._last_cycle[(symbol, timeframe)][1] is results:  # not superseded meanwhile
+                latest[f"{symbol}/{timeframe}"] = self._summarize(data, results, current_price)
+        
+        async def analyze():
+            nonlocal reports
+            while True:
+                symbol, timeframe, rates, current_price, deadline = await pending.get()
+                try:
+                    async with pair_locks[(symbol, timeframe)]:
+                        data = self._prepare(symbol, timeframe, rates)
+                        fingerprint = self._fingerprint(symbol, timeframe, data)
+                        if self._unchanged(symbol, timeframe, fingerprint) is not None:
+                            continue
+                        results, durations = await asyncio.wrap_future(self._submit_analysis(
+                            cpu_pool, shared, symbol, timeframe, data,
+                            **self._budget_options(symbol, timeframe, deadline)))
+                        self._record(symbol, timeframe, durations)
+                        changes = self._remember(symbol, timeframe, fingerprint, data, results)
+                        self._print_header(symbol, timeframe)
+                        self._report(symbol, timeframe, results, len(data), current_price, changes)
+                        latest[f"{symbol}/{timeframe}"] = self._summarize(data, results, current_price)
+                        if deferred_stages(results):
+                            # Off the analysis queue, so the next pair's critical stages go first
+                            background.add(task := asyncio.create_task(complete(symbol, timeframe, data, results, current_price)))
+                            task.add_done_callback(background.discard)
+                        # About one export and checkpoint cycle per round of all pairs
+                        reports += 1
+                        if reports % len(tasks) == 0:
+                            self._export_metrics()
+                            self._checkpoints += 1
+                        checkpoint()
+                except Exception as e:
+                    print(f"❌ Error analyzing {symbol}: {e}")
+                    self.metrics.increment('error', symbol, timeframe)
+                finally:
+                    pending.task_done()
+        
+        async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            # Minimal HTTP: GET / lists every pair, GET /EURUSD/H1 returns one
+            try:
+                request = (await reader.readline()).decode('latin-1').split()
+                while (await reader.readline()).strip():
+                    pass
+                path = request[1].strip('/').upper() if len(request) > 1 else ''
+                if not path:
+                    status, body = '200 OK', latest
+                elif path in latest:
+                    status, body = '200 OK', latest[path]
+                else:
+                    status, body = '404 Not Found', {'error': f"no results for {path}"}
+                payload = json.dumps(body, default=str).encode()
+                writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode()
+                             + payload)
+                await writer.drain()
+            finally:
+                writer.close()
+        
+        server = await asyncio.start_server(serve, host, port) if port is not None else None
+        self._start_metrics()
+        analyzers = [asyncio.create_task(analyze()) for _ in range(workers)]
+        try:
+            await asyncio.gather(*(feed(symbol, tf) for symbol, tf in tasks))
+            await pending.join()
+            await asyncio.gather(*background)
+            print("\n⏹️ No more data, monitoring stopped")
+        finally:
+            for task in analyzers + list(background):
+                task.cancel()
+            await asyncio.gather(*analyzers, *background, return_exceptions=True)
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            if saving is not None:
+                await asyncio.gather(saving, return_exceptions=True)
+            await aconn.close()
+            cpu_pool.shutdown(cancel_futures=True)
+            shared.close()
+            self._stop_state()
+            self._stop_metrics()
+    
+    def run_async_monitoring(self, symbols: list = None, timeframes: list = None,
+                             workers: int = None, port: int = None, host: str = '127.0.0.1'):
+        """Run monitor_async until the data ends or Ctrl+C."""
+        try:
+            asyncio.run(self.monitor_async(symbols, timeframes, workers, port, host))
+        except KeyboardInterrupt:
+            print("\n\n⏹️ Live monitoring stopped by user")
+    
+    def _summarize(self, data, results: Dict, current_price: Optional[Dict]) -> Dict:
+        """JSON-friendly digest of one pair's latest results; deferred stages are None and listed as partial."""
+        times = as_bar_arrays(data).epoch_seconds()
+        patterns = results['patterns']
+        summary = {
+            'last_bar': None if times is None else datetime.fromtimestamp(int(times[-1]), timezone.utc).isoformat(),
+            'bid': current_price['bid'] if current_price else None,
+            'waves': len(results['waves']),
+            'trends': None if results['trends'] is None else len(results['trends']),
+            'patterns': None if patterns is None else [
+                {'type': p.pattern_type.value, 'confidence': round(float(p.confidence), 3)} for p in patterns[:3]],
+            'movements': None if results['movements'] is None else len(results['movements']),
+            'partial': list(deferred_stages(results)),
+        }
+        if results['waves']:
+            wave = results['waves'][-1]
+            summary['latest_wave'] = {'number': wave.wave_number, 'type': wave.wave_type,
+                                      'direction': wave.direction}
+        if results['trends']:
+            trend = results['trends'][-1]
+            summary['trend'] = {'direction': trend.direction.value, 'strength': trend.strength.value}
+        return summary
+    
+    def save_state(self, path: str):
+        """Snapshot the buffered bars and last results of every pair to path."""
+        self._write_state(path, self._state_snapshot())
+    
+    def _state_snapshot(self) -> StateSnapshot:
+        """
+        The current state, decoupled from later cycles, so it can be written
+        on another thread. Taking it restarts the checkpoint counters.
+        """
+        cycles = {key: (fingerprint, dict(results), times)
+                  for key, (fingerprint, results, times) in self._last_cycle.items()}
+        snapshot = StateSnapshot(self.connector.buffered_bars(), cycles,
+                                 {symbol: d for symbol, d in self._digits.items() if d is not None})
+        self._checkpoints = self._unsaved = 0
+        self._saved_at = time.monotonic()
+        return snapshot
+    
+    @staticmethod
+    def _write_state(path: str, snapshot: StateSnapshot):
+        """Write a snapshot taken by _state_snapshot()."""
+        started = time.perf_counter()
+        size = save_snapshot(path, snapshot)
+        print(f"💾 Saved state of {len(snapshot.cycles)} pairs to {path} "
+              f"({size / 1e6:.1f} MB in {time.perf_counter() - started:.2f}s)")
+    
+    def restore_state(self, path: str) -> bool:
+        """
+        Restore a save_state() snapshot, if there is a usable one at path.
+        
+        Ring buffers are refilled, so the next fetches only request the
+        bars that closed since, and pairs whose input is unchanged keep
+        their restored results without being analyzed again.
+        """
+        snapshot = load_snapshot(path)
+        if snapshot is None:
+            return False
+        self.connector.restore_buffers(snapshot.bars)
+        self._last_cycle.update(snapshot.cycles)
+        self._digits.update(snapshot.digits)
+        age = max(0.0, time.time() - snapshot.saved_at)
+        print(f"♻️ Restored state of {len(snapshot.cycles)} pairs from {path} (saved {age / 60:.0f} min ago)")
+        return True
+    
+    def _start_state(self):
+        """Restore the configured state snapshot."""
+        path = self.snapshot_settings.get('path')
+        if path:
+            self.restore_state(path)
+    
+    def _checkpoint_due(self) -> bool:
+        """Whether `every` cycles or `seconds` have passed since the last snapshot of new results."""
+        if not self.snapshot_settings.get('path') or not self._unsaved:
+            return False
+        every = self.snapshot_settings.get('every', 10)
+        seconds = self.snapshot_settings.get('seconds')
+        return ((bool(every) and self._checkpoints >= every)
+                or (bool(seconds) and time.monotonic() - self._saved_at >= seconds))
+    
+    def _checkpoint_state(self):
+        """Count a finished cycle and snapshot the state when one is due."""
+        self._checkpoints += 1
+        if self._checkpoint_due():
+            self.save_state(self.snapshot_settings['path'])
+    
+    def _stop_state(self):
+        """Snapshot the state on shutdown, unless nothing changed since the last snapshot."""
+        path = self.snapshot_settings.get('path')
+        if path and self._unsaved:
+            self.save_state(path)
+    
+    def _start_metrics(self):
+        """Serve the metrics over HTTP if a port is configured."""
+        port = self.metrics_settings.get('http_port')
+        if port:
+            self.metrics.serve(port)
+            print(f"📊 Metrics: http://127.0.0.1:{port}/metrics")
+    
+    def _summary_due(self) -> bool:
+        every = self.metrics_settings.get('summary_every', 10)
+        return bool(every) and self._metric_exports > 0 and self._metric_exports % every == 0
+    
+    def _export_metrics(self):
+        """Write the metrics textfile and print the summary every few cycles."""
+        path = self.metrics_settings.get('textfile')
+        if path:
+            self.metrics.write_textfile(path)
+        self._metric_exports += 1
+        if self._summary_due():
+            self.metrics.print_summary()
+    
+    def _stop_metrics(self):
+        """Print a last summary (unless the last cycle just did), then stop the HTTP endpoint."""
+        if not self._summary_due():
+            self.metrics.print_summary()
+        self.metrics.close()
     
     def disconnect(self):
         """Disconnect from MT5."""
@@ -229,7 +1026,16 @@ def main():
     print("Features: Elliott Wave • Trends • Patterns • Pip Analysis")
     print("="*70)
     
-    analyzer = LiveForexAnalyzer()
+    parser = argparse.ArgumentParser(description="Live MT5 forex analysis")
+    parser.add_argument('--replay', metavar='DIR', help='replay recorded data from DIR instead of MT5')
+    parser.add_argument('--speed', type=float, help='replay speed multiplier (default: as fast as possible)')
+    parser.add_argument('--port', type=int, help='serve async monitoring results as JSON on this port')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='interface for --port (default: 127.0.0.1; 0.0.0.0 for all)')
+    args = parser.parse_args()
+    
+    connector = ReplayConnector(args.replay, speed=args.speed) if args.replay else None
+    analyzer = LiveForexAnalyzer(connector=connector)
     
     # Connect to MT5
     if not analyzer.connect_mt5():
@@ -249,10 +1055,11 @@ def main():
     print("1. Single Analysis (analyze once)")
     print("2. Live Monitoring (continuous updates)")
     print("3. Custom Symbol Analysis")
+    print("4. Async Monitoring (many symbols and timeframes, one event loop)")
     print("="*70)
     
     try:
-        choice = input("\nEnter choice (1-3): ").strip()
+        choice = input("\nEnter choice (1-4): ").strip()
         
         if choice == '1':
             # Single analysis
@@ -262,12 +1069,12 @@ def main():
         
         elif choice == '2':
             # Live monitoring
-            symbols_input = input("Enter symbols separated by comma (default: EURUSD,GBPUSD,USDJPY): ").strip().upper()
-            symbols = [s.strip() for s in symbols_input.split(',')] if symbols_input else ['EURUSD', 'GBPUSD', 'USDJPY']
+            symbols_input = input("Enter symbols separated by comma (default: all configured pairs): ").strip().upper()
+            symbols = [s.strip() for s in symbols_input.split(',')] if symbols_input else None
             
             timeframe = input("Enter timeframe (default: H1): ").strip().upper() or "H1"
-            interval = input("Enter update interval in seconds (default: 300): ").strip()
-            interval = int(interval) if interval.isdigit() else 300
+            interval = input("Enter update interval in seconds (default: at every bar close): ").strip()
+            interval = int(interval) if interval.isdigit() else None
             
             analyzer.run_live_monitoring(symbols, timeframe, interval)
         
@@ -275,11 +1082,21 @@ def main():
             # Custom analysis
             symbol = input("Enter symbol: ").strip().upper()
             timeframe = input("Enter timeframe: ").strip().upper()
-            bars = input("Enter number of bars (default: 200): ").strip()
-            bars = int(bars) if bars.isdigit() else 200
+            bars = input(f"Enter number of bars (default: {analyzer.fetch_planner.bars_for(timeframe)}): ").strip()
+            bars = int(bars) if bars.isdigit() else None
             
             analyzer.analyze_pair(symbol, timeframe, bars)
         
+        elif choice == '4':
+            # Async monitoring
+            symbols_input = input("Enter symbols separated by comma (default: all configured pairs): ").strip().upper()
+            symbols = [s.strip() for s in symbols_input.split(',')] if symbols_input else None
+            
+            timeframes_input = input("Enter timeframes separated by comma (default: H1): ").strip().upper()
+            timeframes = [tf.strip() for tf in timeframes_input.split(',')] if timeframes_input else None
+            
+            analyzer.run_async_monitoring(symbols, timeframes, port=args.port, host=args.host)
+        
         else:
             print("Invalid choice!")
     
@@ -7,16 +7,17 @@ import io
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 import json
+from typing import Optional
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
 
 from analyzers.multi_timeframe_analyzer import MultiTimeframeAnalyzer
+from data.synthetic import generate_frame
 from indicators.elliott_wave import ElliottWaveAnalyzer
 from indicators.wave_counter import WaveCounter
 from indicators.trend_analysis import TrendAnalyzer
 from indicators.chart_patterns import ChartPatternRecognizer
 from indicators.divergence_convergence import DivergenceConvergenceAnalyzer
+from utils.result_cache import ResultCache, cached
 
 
 def load_config():
@@ -25,63 +26,18 @@ def load_config():
         return json.load(f)
 
 
-def generate_realistic_forex_data(pair: str, timeframe: str, periods: int = 200) -> pd.DataFrame:
-    """Generate more realistic forex data with trends and patterns."""
-    np.random.seed(42)
-    
-    base_price = 1.1000 if 'USD' in pair else 110.00 if 'JPY' in pair else 1.3000
-    
-    timestamps = pd.date_range(
-        start=datetime.now() - timedelta(hours=periods),
-        periods=periods,
-        freq='1h' if timeframe == 'H1' else '5min' if timeframe == 'M5' else '1min'
-    )
-    
-    # Create more realistic price movements with trends
-    prices = [base_price]
-    trend_strength = 0.0002
-    trend_duration = 50
-    
-    for i in range(1, periods):
-        # Add trend component
-        if i % trend_duration < trend_duration // 2:
-            trend_component = trend_strength
-        else:
-            trend_component = -trend_strength
-        
-        # Add random noise
-        noise = np.random.normal(0, 0.0008)
-        
-        # Add some volatility clustering
-        if i > 10 and abs(prices[-1] - prices[-10]) > 0.01:
-            noise *= 1.5
-        
-        new_price = prices[-1] + trend_component + noise
-        prices.append(max(0.5, new_price))  # Prevent negative prices
-    
-    # Generate OHLC from close prices
-    ohlc_data = []
-    for i, close_price in enumerate(prices):
-        # Generate realistic OHLC
-        volatility = 0.0005
-        high = close_price + abs(np.random.normal(0, volatility))
-        low = close_price - abs(np.random.normal(0, volatility))
-        
-        if i == 0:
-            open_price = close_price
-        else:
-            open_price = prices[i-1] + np.random.normal(0, volatility/2)
-        
-        ohlc_data.append({
-            'timestamp': timestamps[i],
-            'open': open_price,
-            'high': max(open_price, high, close_price),
-            'low': min(open_price, low, close_price),
-            'close': close_price,
-            'volume': np.random.randint(100, 1000)
-        })
-    
-    return pd.DataFrame(ohlc_data)
+def open_result_cache(config) -> Optional[ResultCache]:
+    """The configured analyzer result cache, or None."""
+    settings = config.get('analysis_settings', {}).get('result_cache', {})
+    if not settings.get('path'):
+        return None
+    return ResultCache(settings['path'], max_bytes=int(settings.get('max_mb', 512) * 2**20))
+
+
+def generate_realistic_forex_data(pair: str, timeframe: str, periods: int = 200,
+                                  seed: int = 42, compact: bool = False) -> pd.DataFrame:
+    """Generate realistic forex data with regimes, trends and volatility clustering."""
+    return generate_frame(pair, timeframe, periods, seed, compact)
 
 
 def analyze_elliott_waves(data: pd.DataFrame, pair: str):
@@ -110,12 +66,12 @@ def analyze_elliott_waves(data: pd.DataFrame, pair: str):
             print(f"  Wave {wave.label}: {wave.direction.value} from {wave.start_price:.5f} to {wave.end_price:.5f}")
 
 
-def analyze_trends(data: pd.DataFrame, pair: str):
+def analyze_trends(data: pd.DataFrame, pair: str, cache: ResultCache = None):
     """Analyze trend movements."""
     print(f"\n--- Trend Analysis for {pair} ---")
     
     trend_analyzer = TrendAnalyzer()
-    trends = trend_analyzer.identify_trends(data)
+    trends = cached(cache, trend_analyzer.identify_trends, data)
     
     print(f"Found {len(trends)} trend movements")
     
@@ -139,12 +95,12 @@ def analyze_trends(data: pd.DataFrame, pair: str):
             print(f"  {rev['from_direction']} → {rev['to_direction']} reversal")
 
 
-def analyze_chart_patterns(data: pd.DataFrame, pair: str):
+def analyze_chart_patterns(data: pd.DataFrame, pair: str, cache: ResultCache = None):
     """Analyze chart patterns."""
     print(f"\n--- Chart Pattern Analysis for {pair} ---")
     
     pattern_recognizer = ChartPatternRecognizer()
-    patterns = pattern_recognizer.find_all_patterns(data)
+    patterns = cached(cache, pattern_recognizer.find_all_patterns, data)
     
     print(f"Found {len(patterns)} chart patterns")
     
@@ -168,6 +124,7 @@ def analyze_divergence_convergence(data: pd.DataFrame, pair: str):
 def run_comprehensive_analysis():
     """Run complete analysis with all modules."""
     config = load_config()
+    cache = open_result_cache(config)
     
     print("=== COMPREHENSIVE FOREX ANALYSIS SYSTEM ===")
     print("Features: Elliott Wave, Trends, Chart Patterns, Divergence/Convergence, Multi-Timeframe")
@@ -199,13 +156,13 @@ def run_comprehensive_analysis():
     
     # Run enhanced wave counting
     print("Running detailed wave counting...")
-    wave_counts = wave_counter.identify_wave_counts(data)
+    wave_counts = cached(cache, wave_counter.identify_wave_counts, data)
     
     print("Running trend analysis...")
-    trends = trend_analyzer.identify_trends(data)
+    trends = cached(cache, trend_analyzer.identify_trends, data)
     
     print("Running chart pattern recognition...")
-    patterns = pattern_recognizer.find_all_patterns(data)
+    patterns = cached(cache, pattern_recognizer.find_all_patterns, data)
     
     print("Running divergence/convergence analysis...")
     divergences = div_conv_analyzer.find_divergences(data)
@@ -228,8 +185,8 @@ def run_comprehensive_analysis():
     # Show enhanced wave counting
     wave_counter.print_wave_analysis(wave_counts, pair)
     
-    analyze_trends(data, pair)
-    analyze_chart_patterns(data, pair)
+    analyze_trends(data, pair, cache)
+    analyze_chart_patterns(data, pair, cache)
     analyze_divergence_convergence(data, pair)
     
     print(f"\n--- Multi-Timeframe Pip Analysis ---")
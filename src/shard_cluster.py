@@ -0,0 +1,457 @@
+"""
+Coordinator/worker mode: spread (symbol, timeframe) shards over processes or machines.
+
+A coordinator owns the list of shards and hands them to workers that
+connect over a local socket (multiprocessing.connection, authenticated
+with a shared key). Messages are pickles, so the key is what keeps others
+from running code in the cluster: listening beyond loopback requires an
+explicit key, and a loopback coordinator without one makes up a random
+key and prints it. Each worker runs its own LiveForexAnalyzer and data
+source, analyzes its shards after every bar close and streams a summary of
+each new result back. When a worker disconnects or stops sending
+heartbeats, its shards are reassigned to the remaining workers.
+
+Usage (from src):
+    python shard_cluster.py coordinator --local-workers 3 --replay data/replay
+    FOREX_SHARD_KEY=... python shard_cluster.py coordinator --host 0.0.0.0 --workers 2
+    FOREX_SHARD_KEY=... python shard_cluster.py worker --connect coordinator-host:6100
+"""
+import argparse
+import ipaddress
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from multiprocessing import Process
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from data.bar_scheduler import BarCloseScheduler
+from data.replay_connector import ReplayConnector
+
+Shard = Tuple[str, str]
+
+DEFAULT_PORT = 6100
+
+
+def _authkey(key: Optional[str] = None) -> Optional[bytes]:
+    """Shared key of the cluster (default: $FOREX_SHARD_KEY), or None if neither is set."""
+    key = key or os.environ.get('FOREX_SHARD_KEY')
+    return key.encode() if key else None
+
+
+def _is_loopback(host: str) -> bool:
+    """Whether listening on host only accepts connections from this machine."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # A host name, or '' for all interfaces
+
+
+class ShardCoordinator:
+    """
+    Assigns shards to connected workers and collects their results.
+
+    All assignment state lives on the thread that runs serve(); connection
+    threads only forward messages to it through a queue.
+    """
+
+    def __init__(self, shards: List[Shard], address: Tuple[str, int] = ('localhost', DEFAULT_PORT),
+                 authkey: bytes = None, heartbeat_timeout: float = 30.0):
+        """
+        Args:
+            shards: (symbol, timeframe) pairs to cover
+            address: (host, port) to listen on; use host '0.0.0.0' for remote workers
+            authkey: Shared key workers must present (default: $FOREX_SHARD_KEY;
+                required beyond loopback, a random key is generated otherwise)
+            heartbeat_timeout: Seconds of silence after which a worker counts as failed
+        """
+        self.shards = list(dict.fromkeys((s, tf.upper()) for s, tf in shards))
+        self.address = address
+        self.authkey = authkey or _authkey()
+        if self.authkey is None:
+            if not _is_loopback(address[0]):
+                raise ValueError(f"listening on {address[0]!r} requires a shared key "
+                                 f"(FOREX_SHARD_KEY or --authkey)")
+            self.authkey = secrets.token_hex(16).encode()
+            print(f"🔑 Generated cluster key: {self.authkey.decode()} (pass it to workers with --authkey)")
+        self.heartbeat_timeout = heartbeat_timeout
+        self.owner: Dict[Shard, Optional[str]] = {shard: None for shard in self.shards}
+        self.finished: Set[Shard] = set()
+        self.latest: Dict[Shard, Dict] = {}
+        self._workers: Dict[str, Connection] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._events: queue.Queue = queue.Queue()
+        self._listener: Optional[Listener] = None
+
+    def _accept(self):
+        """Accept worker connections until the listener closes."""
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                return
+            except Exception as e:
+                print(f"⚠️ Rejected a worker connection: {e}")
+                continue
+            threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn: Connection):
+        """Forward one worker's messages to serve()."""
+        worker = None
+        try:
+            worker = conn.recv()['worker']
+            self._events.put(('join', worker, conn))
+            while True:
+                self._events.put(('message', worker, conn.recv()))
+        except (EOFError, OSError, KeyError, TypeError):
+            pass
+        if worker is not None:
+            self._events.put(('lost', worker, conn))
+
+    def _send(self, worker: str, message: Dict) -> bool:
+        """Send a message to a worker; False if its connection is gone."""
+        try:
+            self._workers[worker].send(message)
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _load(self) -> Dict[str, int]:
+        """Active shards per connected worker."""
+        load = {worker: 0 for worker in self._workers}
+        for shard, worker in self.owner.items():
+            if worker in load and shard not in self.finished:
+                load[worker] += 1
+        return load
+
+    def _assign_orphans(self):
+        """Give every unowned, unfinished shard to the least loaded worker."""
+        orphans = [shard for shard, worker in self.owner.items()
+                   if worker is None and shard not in self.finished]
+        if not orphans or not self._workers:
+            return
+        load = self._load()
+        assigned: Dict[str, List[Shard]] = {}
+        for shard in orphans:
+            worker = min(load, key=lambda w: (load[w], w))
+            load[worker] += 1
+            self.owner[shard] = worker
+            assigned.setdefault(worker, []).append(shard)
+        for worker, shards in assigned.items():
+            print(f"📦 {worker}: {', '.join(f'{s} {tf}' for s, tf in shards)}")
+            if not self._send(worker, {'type': 'assign', 'shards': shards}):
+                self._drop(worker, 'send failed')
+
+    def _drop(self, worker: str, reason: str):
+        """Forget a failed worker and free its shards."""
+        conn = self._workers.pop(worker, None)
+        if conn is None:
+            return
+        self._last_seen.pop(worker, None)
+        conn.close()
+        orphaned = [shard for shard, owner in self.owner.items() if owner == worker]
+        for shard in orphaned:
+            self.owner[shard] = None
+        active = [shard for shard in orphaned if shard not in self.finished]
+        if active:
+            print(f"💥 Lost {worker} ({reason}), reassigning {len(active)} shard(s)")
+        else:
+            print(f"👋 {worker} left")
+
+    def _handle(self, kind: str, worker: str, payload, on_result: Optional[Callable]):
+        """Apply one event from a connection thread."""
+        if kind == 'join':
+            if worker in self._workers:
+                payload.close()
+                print(f"⚠️ Duplicate worker name {worker}, connection refused")
+                return
+            self._workers[worker] = payload
+            self._last_seen[worker] = time.monotonic()
+            print(f"🤝 {worker} joined ({len(self._workers)} worker(s))")
+            return
+        if kind == 'lost':
+            if self._workers.get(worker) is payload:
+                self._drop(worker, 'disconnected')
+            return
+
+        if worker not in self._workers:
+            return  # a worker given up on; its shards already moved on
+        self._last_seen[worker] = time.monotonic()
+        message_type = payload.get('type')
+        if message_type == 'result':
+            shard = tuple(payload['shard'])
+            self.latest[shard] = payload['summary']
+            if on_result is not None:
+                on_result(worker, shard, payload)
+        elif message_type == 'done':
+            for shard in payload['shards']:
+                self.finished.add(tuple(shard))
+
+    def listen(self):
+        """Start accepting workers (serve() calls this if needed)."""
+        if self._listener is not None:
+            return
+        self._listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, daemon=True).start()
+        print(f"🧭 Coordinator listening on {self.address[0]}:{self.address[1]} "
+              f"for {len(self.shards)} shard(s)")
+
+    def serve(self, min_workers: int = 1, on_result: Optional[Callable] = None) -> Dict[Shard, Dict]:
+        """
+        Run until every shard is finished (the data sources ran out) or Ctrl+C.
+
+        Args:
+            min_workers: Workers to wait for before the first assignment, so
+                the initial shards are spread evenly
+            on_result: Called with (worker, shard, message) for every result
+
+        Returns:
+            The latest result summary per shard
+        """
+        self.listen()
+        started = False
+        try:
+            while len(self.finished) < len(self.shards):
+                try:
+                    kind, worker, payload = self._events.get(timeout=1.0)
+                    self._handle(kind, worker, payload, on_result)
+                except queue.Empty:
+                    pass
+
+                now = time.monotonic()
+                for worker, seen in list(self._last_seen.items()):
+                    if now - seen > self.heartbeat_timeout:
+                        self._drop(worker, f"no heartbeat for {self.heartbeat_timeout:.0f}s")
+
+                started = started or len(self._workers) >= min_workers
+                if started:
+                    self._assign_orphans()
+            print("\n⏹️ All shards finished")
+        except KeyboardInterrupt:
+            print("\n\n⏹️ Coordinator stopped by user")
+        finally:
+            for worker in list(self._workers):
+                self._send(worker, {'type': 'stop'})
+                self._workers.pop(worker).close()
+            self._listener.close()
+        return self.latest
+
+
+class ShardWorker:
+    """
+    Analyzes the shards a coordinator assigns to it.
+
+    Shards are analyzed right after their bars close (BarCloseScheduler),
+    and every analysis whose input changed is sent back as a result. A
+    background thread sends heartbeats while the worker waits for bars.
+    """
+
+    def __init__(self, analyzer, name: Optional[str] = None, heartbeat: float = 5.0, delay: float = 2.0):
+        """
+        Args:
+            analyzer: Connected LiveForexAnalyzer
+            name: Worker name, unique within the cluster (default: host-pid)
+            heartbeat: Seconds between heartbeats
+            delay: Seconds after a bar close before its bars are fetched
+        """
+        self.analyzer = analyzer
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat = heartbeat
+        self.delay = delay
+        self.shards: List[Shard] = []
+        self._assigned = threading.Event()
+        self._stop = threading.Event()
+        self._send_lock = threading.Lock()
+        self._conn: Optional[Connection] = None
+
+    def _send(self, message: Dict):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def _receive(self):
+        """Take assignments from the coordinator until it stops or goes away."""
+        try:
+            while not self._stop.is_set():
+                message = self._conn.recv()
+                if message['type'] == 'assign':
+                    for shard in message['shards']:
+                        if tuple(shard) not in self.shards:
+                            self.shards.append(tuple(shard))
+                    self._assigned.set()
+                elif message['type'] == 'stop':
+                    break
+        except (EOFError, OSError, TypeError):
+            pass  # TypeError: run() closed the connection under us
+        self._stop.set()
+        self._assigned.set()
+
+    def _beat(self):
+        """Tell the coordinator this worker is alive."""
+        while not self._stop.wait(self.heartbeat):
+            try:
+                self._send({'type': 'heartbeat'})
+            except (OSError, ValueError):
+                return
+
+    def run(self, address: Tuple[str, int], authkey: bytes = None):
+        """Connect to the coordinator and work until it stops or the data ends."""
+        connector = self.analyzer.connector
+        authkey = authkey or _authkey()
+        if authkey is None:
+            raise ValueError("a shared key is required (FOREX_SHARD_KEY or --authkey)")
+        self._conn = Client(address, authkey=authkey)
+        self._send({'type': 'hello', 'worker': self.name})
+        threading.Thread(target=self._receive, daemon=True).start()
+        threading.Thread(target=self._beat, daemon=True).start()
+        print(f"🔌 {self.name} connected to {address[0]}:{address[1]}")
+
+        try:
+            self._assigned.wait()
+            while not self._stop.is_set():
+                # Assignments can grow between batches, so schedule from the current list
+                scheduler = BarCloseScheduler(list(self.shards), self.delay)
+                now = connector.now()
+                close, batch = scheduler.next_batch(now - self.delay)
+                if not connector.wait(max(0.0, close + self.delay - now)):
+                    self._send({'type': 'done', 'shards': list(self.shards)})
+                    print(f"⏹️ {self.name}: no more data")
+                    break
+                for symbol, timeframe in batch:
+                    if self._stop.is_set():
+                        break
+                    self._analyze(symbol, timeframe, close)
+        except (EOFError, OSError):
+            print(f"⚠️ {self.name}: lost the coordinator")
+        except KeyboardInterrupt:
+            print(f"\n⏹️ {self.name} stopped by user")
+        finally:
+            self._stop.set()
+            self._conn.close()
+
+    def _analyze(self, symbol: str, timeframe: str, close: int):
+        """Analyze one shard and send its result."""
+        try:
+            update = self.analyzer.refresh_pair(symbol, timeframe)
+        except Exception as e:
+            print(f"❌ Error analyzing {symbol}: {e}")
+            return
+        if update is None:
+            return
+        changes = update['changes']
+        self._send({
+            'type': 'result',
+            'shard': (symbol, timeframe),
+            'close': close,
+            'summary': update['summary'],
+            'changes': None if changes is None else {
+                kind: (len(d.added), len(d.changed), len(d.removed)) for kind, d in changes.items()},
+        })
+
+
+def print_result(worker: str, shard: Shard, message: Dict):
+    """One line per streamed result."""
+    symbol, timeframe = shard
+    summary = message['summary']
+    line = (f"📥 {symbol} {timeframe} @ {datetime.fromtimestamp(message['close'], timezone.utc):%Y-%m-%d %H:%M} "
+            f"[{worker}] waves {summary['waves']}, trends {summary['trends']}, "
+            f"patterns {len(summary['patterns'])}, movements {summary['movements']}")
+    if 'trend' in summary:
+        line += f" | {summary['trend']['direction']} ({summary['trend']['strength']})"
+    if message['changes']:
+        changed = [f"{kind} +{a} ~{c} -{r}" for kind, (a, c, r) in message['changes'].items() if a or c or r]
+        if changed:
+            line += f" | 🆕 {', '.join(changed)}"
+    print(line)
+
+
+def run_worker(address: Tuple[str, int], config_path: str = '../config/pairs.json',
+               replay: Optional[str] = None, speed: Optional[float] = None,
+               start: Optional[int] = None, name: Optional[str] = None, authkey: bytes = None):
+    """Create an analyzer on MT5 (or a replay) and serve the coordinator at address."""
+    # Imported here so a coordinator-only process never loads the analyzers
+    from live_mt5_analysis import LiveForexAnalyzer
+
+    connector = ReplayConnector(replay, speed=speed, start=start) if replay else None
+    analyzer = LiveForexAnalyzer(config_path, connector=connector)
+    if not analyzer.connect_mt5():
+        return
+    try:
+        if not analyzer.connector.sync_server_time(analyzer.config.get('major_pairs', ['EURUSD'])[0]):
+            print("⚠️ Could not read the server clock, assuming UTC bar times")
+        ShardWorker(analyzer, name).run(address, authkey)
+    finally:
+        analyzer.disconnect()
+
+
+def _parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def main():
+    """Command line entry point for coordinator and worker processes."""
+    parser = argparse.ArgumentParser(description="Sharded live forex analysis")
+    parser.add_argument('role', choices=['coordinator', 'worker'])
+    parser.add_argument('--config', default='../config/pairs.json', help='pairs configuration')
+    parser.add_argument('--authkey', help='shared cluster key (default: $FOREX_SHARD_KEY)')
+    parser.add_argument('--replay', metavar='DIR', help='replay recorded data from DIR instead of MT5')
+    parser.add_argument('--speed', type=float, help='replay speed multiplier (default: as fast as possible)')
+    parser.add_argument('--start', type=int, help='replay start time in epoch seconds')
+    # Coordinator
+    parser.add_argument('--host', default='localhost', help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--symbols', help='comma separated symbols (default: all configured pairs)')
+    parser.add_argument('--timeframes', default='H1', help='comma separated timeframes')
+    parser.add_argument('--workers', type=int, default=1, help='workers to wait for before assigning')
+    parser.add_argument('--local-workers', type=int, default=0, help='worker processes to start here')
+    parser.add_argument('--heartbeat-timeout', type=float, default=30.0)
+    # Worker
+    parser.add_argument('--connect', metavar='HOST:PORT', help='coordinator address')
+    parser.add_argument('--name', help='worker name (default: host-pid)')
+    args = parser.parse_args()
+    authkey = _authkey(args.authkey)
+
+    if args.role == 'worker':
+        if authkey is None:
+            parser.error("workers need the cluster key: set FOREX_SHARD_KEY or pass --authkey")
+        address = _parse_address(args.connect or f'localhost:{DEFAULT_PORT}')
+        run_worker(address, args.config, args.replay, args.speed, args.start, args.name, authkey)
+        return
+
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(',')]
+    else:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+        symbols = config.get('major_pairs', ['EURUSD']) + config.get('cross_pairs', [])
+    timeframes = [tf.strip().upper() for tf in args.timeframes.split(',')]
+    if authkey is None and not _is_loopback(args.host):
+        parser.error(f"listening on {args.host!r} requires a cluster key: set FOREX_SHARD_KEY or pass --authkey")
+
+    coordinator = ShardCoordinator([(s, tf) for tf in timeframes for s in symbols],
+                                   (args.host, args.port), authkey, args.heartbeat_timeout)
+    coordinator.listen()
+    connect_to = ('localhost' if args.host in ('0.0.0.0', '') else args.host, args.port)
+    local = [Process(target=run_worker, args=(connect_to, args.config, args.replay, args.speed,
+                                              args.start, f"local-{i + 1}", coordinator.authkey), daemon=True)
+             for i in range(args.local_workers)]
+    for process in local:
+        process.start()
+
+    coordinator.serve(max(args.workers, args.local_workers), print_result)
+    try:
+        for process in local:
+            process.join(timeout=10)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
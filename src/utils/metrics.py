@@ -0,0 +1,224 @@
+"""
+Latency metrics for the live analysis loop.
+
+Durations are recorded per stage (fetch, prepare, waves, trends, patterns,
+movements, report) and per symbol and timeframe into fixed-bucket
+histograms, together with the end-to-end latency from a bar close to the
+report of its analysis. Recording an observation is a bisect and two
+additions under a lock, so instrumenting every stage of every pair costs
+microseconds per cycle against milliseconds of analysis.
+
+The histograms render in the Prometheus text exposition format, for a
+node_exporter textfile collector (write_textfile) or a scrape endpoint
+(serve), and as a console summary with estimated percentiles.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; everything larger lands in +Inf
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 900.0)
+
+Labels = Tuple[str, str, str]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimated q-quantile, interpolated within its bucket like PromQL histogram_quantile."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class StageMetrics:
+    """Stage durations, bar-close-to-report latency and event counts per symbol and timeframe."""
+
+    def __init__(self, prefix: str = 'forex'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages: Dict[Labels, Histogram] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._events: Dict[Labels, int] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def observe(self, stage: str, symbol: str, timeframe: str, seconds: float):
+        """Record one duration of a stage."""
+        key = (stage, symbol, timeframe)
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = Histogram(STAGE_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str, symbol: str, timeframe: str) -> Iterator[None]:
+        """Record the duration of the with block as one stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, symbol, timeframe, time.perf_counter() - started)
+
+    def mean(self, stage: str, symbol: str, timeframe: str) -> Optional[float]:
+        """Mean recorded duration of a stage, or None before its first observation."""
+        with self._lock:
+            histogram = self._stages.get((stage, symbol, timeframe))
+            return None if histogram is None else histogram.sum / histogram.count
+
+    def observe_latency(self, symbol: str, timeframe: str, seconds: float):
+        """Record the delay between a bar close and the report of its analysis."""
+        key = (symbol, timeframe)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(max(0.0, seconds))
+
+    def increment(self, event: str, symbol: str, timeframe: str):
+        """Count an event, e.g. a skipped cycle or an error."""
+        key = (event, symbol, timeframe)
+        with self._lock:
+            self._events[key] = self._events.get(key, 0) + 1
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            stages = sorted(self._stages.items())
+            latency = sorted(self._latency.items())
+            events = sorted(self._events.items())
+
+        lines: List[str] = []
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines += [f"# HELP {name} Duration of one analysis stage for one symbol and timeframe.",
+                  f"# TYPE {name} histogram"]
+        for (stage, symbol, timeframe), histogram in stages:
+            labels = f'stage="{_escape(stage)}",symbol="{_escape(symbol)}",timeframe="{_escape(timeframe)}"'
+            lines += self._render_histogram(name, labels, histogram)
+
+        name = f"{self.prefix}_bar_close_to_report_seconds"
+        lines += [f"# HELP {name} Delay from a bar close to the report of its analysis.",
+                  f"# TYPE {name} histogram"]
+        for (symbol, timeframe), histogram in latency:
+            labels = f'symbol="{_escape(symbol)}",timeframe="{_escape(timeframe)}"'
+            lines += self._render_histogram(name, labels, histogram)
+
+        name = f"{self.prefix}_events_total"
+        lines += [f"# HELP {name} Analysis events such as skipped cycles and errors.",
+                  f"# TYPE {name} counter"]
+        for (event, symbol, timeframe), count in events:
+            lines.append(f'{name}{{event="{_escape(event)}",symbol="{_escape(symbol)}",'
+                         f'timeframe="{_escape(timeframe)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(name: str, labels: str, histogram: Histogram) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, n in zip(histogram.bounds, histogram.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return lines
+
+    def write_textfile(self, path: str):
+        """Write the metrics for a textfile collector, replacing the file atomically."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int, host: str = '127.0.0.1'):
+        """Serve the metrics at http://host:port/metrics from a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the analysis output
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+
+    def close(self):
+        """Stop the HTTP endpoint, if serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def print_summary(self):
+        """Print per-stage totals over all pairs, then the slowest pairs end to end."""
+        with self._lock:
+            stages: Dict[str, Histogram] = {}
+            for (stage, _, _), histogram in self._stages.items():
+                total = stages.setdefault(stage, Histogram(STAGE_BUCKETS))
+                for i, n in enumerate(histogram.counts):
+                    total.counts[i] += n
+                total.sum += histogram.sum
+                total.count += histogram.count
+                total.max = max(total.max, histogram.max)
+            latency = sorted(self._latency.items(), key=lambda item: -item[1].quantile(0.95))
+
+        if not stages:
+            return
+        print("\n📊 Stage latency (all pairs):")
+        print(f"   {'Stage':<10} {'Count':>7} {'Mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'Max ms':>9} {'Share':>7}")
+        grand_total = sum(h.sum for h in stages.values()) or 1.0
+        for stage, h in stages.items():
+            print(f"   {stage:<10} {h.count:>7} {1000 * h.sum / h.count:>9.2f} {1000 * h.quantile(0.5):>9.2f} "
+                  f"{1000 * h.quantile(0.95):>9.2f} {1000 * h.max:>9.2f} {100 * h.sum / grand_total:>6.1f}%")
+        if latency:
+            print("   Bar close → report (p95, slowest first): " + ', '.join(
+                f"{symbol} {timeframe} {h.quantile(0.95):.1f}s" for (symbol, timeframe), h in latency[:5]))
@@ -0,0 +1,261 @@
+"""
+Content-addressed on-disk cache of analyzer results.
+
+Research and batch runs analyze the same history over and over. A
+ResultCache stores the result of an analyzer method call under a key made
+from everything that determines it:
+
+- the bars (every column, the labels and the fixed-point digits) and the
+  input type, which decides how results report bar labels;
+- the analyzer class and method, its settings and the call's keyword
+  arguments;
+- the code version: a digest of the source of the analyzer's module and
+  of the repository modules it imports, so editing an analyzer makes its
+  old entries unreachable.
+
+Entries are zlib-compressed pickles under <root>/<key[:2]>/<key>.bin with
+a checksum. A list of result dataclasses is stored as one list per
+constructor field and rebuilt through the dataclass constructor, which
+loads about three times faster than pickled objects; columnar=True
+results (ResultTable) are cheaper still. Entries are written to a
+temporary file and renamed into place, so concurrent readers never see
+half an entry and concurrent writers of the same key simply replace one
+another's identical result. A damaged entry is deleted and counts as a
+miss. A hit refreshes the entry's modification time; once the cache
+outgrows max_bytes the least recently used entries are deleted. Any
+process can evict, and a reader that loses an entry to eviction treats
+it as a miss.
+
+Unpickling can run code, so only point a cache at a directory this
+program writes.
+"""
+import hashlib
+import inspect
+import os
+import pickle
+import struct
+import sys
+import threading
+import zlib
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+import numpy as np
+
+from data.bars import BarData, as_bar_arrays
+from utils.result_diff import analyzer_params
+
+_SRC = Path(__file__).resolve().parents[1]
+_HEADER = struct.Struct('<4sI')
+_MAGIC = b'FXRC'
+_MISS = object()
+
+
+@lru_cache(maxsize=None)
+def code_version(cls: type) -> str:
+    """Digest of the source of cls's module and the repository modules it imports."""
+    module = sys.modules[cls.__module__]
+    files = {Path(module.__file__).resolve()}
+    for value in vars(module).values():
+        path = getattr(inspect.getmodule(value), '__file__', None)
+        if path and Path(path).resolve().is_relative_to(_SRC):
+            files.add(Path(path).resolve())
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(files):
+        digest.update(str(path.relative_to(_SRC)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _update_array(digest, values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'O':
+        digest.update(pickle.dumps(values.tolist()))
+        return
+    digest.update(values.dtype.str.encode())
+    digest.update(np.ascontiguousarray(values).view(np.uint8))
+
+
+def data_digest(data: BarData) -> str:
+    """Digest of a bar series' contents."""
+    bars = as_bar_arrays(data)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{type(data).__name__}:{len(bars)}:{bars.digits}".encode())
+    for name in ('time', 'open', 'high', 'low', 'close', 'volume'):
+        column = getattr(bars, name)
+        digest.update(name.encode())
+        if column is not None:
+            _update_array(digest, column)
+    if bars.labels is not bars.time:
+        _update_array(digest, bars.labels)
+    return digest.hexdigest()
+
+
+def _column(values: list):
+    """A result field's values, as an array when they are all NumPy scalars of one type."""
+    first = type(values[0])
+    if issubclass(first, np.generic) and all(type(v) is first for v in values):
+        return np.array(values, dtype=values[0].dtype)  # Iterates back into the same scalars
+    return values
+
+
+def _pack(result):
+    """
+    Serializable form of a result, column-wise for lists of one dataclass.
+
+    Only the constructor's fields are stored; __post_init__ recomputes the
+    derived (init=False) ones when _unpack rebuilds the records.
+    """
+    if isinstance(result, list) and result and is_dataclass(result[0]):
+        record_type = type(result[0])
+        names = [f.name for f in fields(record_type) if f.init]
+        if all(type(item) is record_type for item in result):
+            return ('columns', record_type, [_column([getattr(item, name) for item in result]) for name in names])
+    return ('object', result)
+
+
+def _unpack(packed):
+    if packed[0] == 'columns':
+        _, record_type, columns = packed
+        return [record_type(*row) for row in zip(*columns)]
+    return packed[1]
+
+
+class ResultCache:
+    """
+    Disk cache for analyzer method results, with a size limit and LRU eviction.
+
+    Usage:
+        cache = ResultCache('cache/results')
+        waves = cache.run(wave_counter.identify_wave_counts, bars)
+    """
+
+    def __init__(self, root: str = 'cache/results', max_bytes: int = 512 * 2**20):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._nbytes: Optional[int] = None  # Estimate, rescanned when evicting
+
+    def key(self, method: Callable, data: BarData, **kwargs) -> str:
+        """Cache key of method(data, **kwargs) for a bound analyzer method."""
+        analyzer = method.__self__
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(data_digest(data).encode())
+        digest.update(f"{type(analyzer).__qualname__}.{method.__name__}".encode())
+        digest.update(repr(analyzer_params(analyzer)).encode())
+        digest.update(repr(sorted(kwargs.items())).encode())
+        digest.update(code_version(type(analyzer)).encode())
+        return digest.hexdigest()
+
+    def run(self, method: Callable, data: BarData, **kwargs):
+        """method(data, **kwargs), from the cache if this call was made before."""
+        key = self.key(method, data, **kwargs)
+        result = self.get(key)
+        if result is _MISS:
+            result = method(data, **kwargs)
+            self.put(key, result)
+        return result
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.bin"
+
+    def get(self, key: str):
+        """The entry stored under key, or the module's miss sentinel."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            os.utime(path)  # Most recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return _MISS
+
+        try:
+            magic, crc = _HEADER.unpack_from(blob)
+            payload = blob[_HEADER.size:]
+            if magic != _MAGIC or zlib.crc32(payload) != crc:
+                raise ValueError("bad header or checksum")
+            result = _unpack(pickle.loads(zlib.decompress(payload)))
+        except Exception:
+            # Damaged, or written by result classes that have changed since
+            self._remove(path)
+            self.misses += 1
+            return _MISS
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result):
+        """Store result under key, evicting old entries if the cache is over its limit."""
+        payload = zlib.compress(pickle.dumps(_pack(result), protocol=pickle.HIGHEST_PROTOCOL), 1)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, zlib.crc32(payload)))
+            f.write(payload)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._nbytes is None:
+                self._nbytes = self.nbytes()
+            else:
+                self._nbytes += _HEADER.size + len(payload)
+            if self._nbytes > self.max_bytes:
+                self._nbytes = self._evict()
+
+    def _entries(self) -> Tuple[list, int]:
+        """(modification time, size, path) of every entry, and their total size."""
+        entries = []
+        if self.root.exists():
+            for subdir in self.root.iterdir():
+                if not subdir.is_dir():
+                    continue
+                for entry in os.scandir(subdir):
+                    if not entry.name.endswith('.bin'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Evicted by another process meanwhile
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict(self) -> int:
+        """Delete least recently used entries down to 90% of max_bytes; return the size left."""
+        entries, total = self._entries()
+        target = 0.9 * self.max_bytes
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        return total
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def nbytes(self) -> int:
+        """Size of all entries on disk."""
+        return self._entries()[1]
+
+    def clear(self):
+        """Delete every entry."""
+        entries, _ = self._entries()
+        for _, _, path in entries:
+            self._remove(path)
+        with self._lock:
+            self._nbytes = 0
+
+
+def cached(cache: Optional[ResultCache], method: Callable, data: BarData, **kwargs):
+    """method(data, **kwargs) through cache, or a plain call without one."""
+    if cache is None:
+        return method(data, **kwargs)
+    return cache.run(method, data, **kwargs)
@@ -0,0 +1,125 @@
+"""
+Change tracking for repeated analysis of a sliding bar window.
+
+Live monitoring analyzes the same symbol and timeframe every cycle. These
+helpers fingerprint the analyzed input, so a cycle without new data can
+reuse the previous results, and compare two cycles' results so only new,
+changed and vanished items need reporting. Results are matched by bar time
+rather than by index, because indices shift as the window slides.
+"""
+from dataclasses import dataclass, field, fields
+from typing import Dict, Hashable, List, Optional, Sequence
+import numpy as np
+
+from data.bars import BarData, as_bar_arrays
+
+
+def input_fingerprint(data: BarData, *params: Hashable) -> tuple:
+    """
+    Cheap identity of an analysis input.
+
+    Covers the bar count, the first and last bar times and the newest bar's
+    prices (a forming bar keeps its time while its prices move), plus any
+    analysis parameters passed in.
+    """
+    bars = as_bar_arrays(data)
+    if len(bars) == 0:
+        return (0,) + params
+    time = bars.epoch_seconds()
+    last = (float(bars.open[-1]), float(bars.high[-1]), float(bars.low[-1]), float(bars.close[-1]))
+    span = (None, None) if time is None else (int(time[0]), int(time[-1]))
+    return (len(bars),) + span + last + params
+
+
+def analyzer_params(*analyzers) -> tuple:
+    """Hashable snapshot of the analyzers' settings, for input_fingerprint."""
+    return tuple((type(a).__name__, repr(sorted(vars(a).items()))) for a in analyzers)
+
+
+@dataclass(frozen=True, slots=True)
+class ResultDiff:
+    """Items of one result kind that appeared, changed or disappeared since the last cycle."""
+    added: List = field(default_factory=list)
+    changed: List = field(default_factory=list)
+    removed: List = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+def _normalize(item, times: Optional[np.ndarray]) -> Dict:
+    """Fields of a result with bar indices replaced by bar times."""
+    def at(idx):
+        return idx if times is None else int(times[idx])
+
+    values = {}
+    for f in fields(item):
+        value = getattr(item, f.name)
+        if f.name.endswith('_idx'):
+            value = at(value)
+        elif f.name == 'key_points':
+            value = tuple((at(p[0]),) + tuple(p[1:]) for p in value)
+        values[f.name] = value
+    return values
+
+
+def _key(values: Dict) -> tuple:
+    """Identity of a result across cycles: its kind and where it starts."""
+    kind = tuple(values[name] for name in ('wave_type', 'wave_number', 'pattern_type') if name in values)
+    start = values.get('start_time', values.get('start_idx'))
+    return kind + (start,)
+
+
+def _window_start(times: Optional[np.ndarray]) -> Optional[int]:
+    """Time of the first bar of a window, if known."""
+    return int(times[0]) if times is not None and len(times) else None
+
+
+def diff_results(previous: Sequence, current: Sequence, previous_times: Optional[np.ndarray],
+                 current_times: Optional[np.ndarray]) -> ResultDiff:
+    """
+    Compare two cycles' results of one kind.
+
+    Results anchored on the first bar of their window (e.g. a trend that
+    only starts there because the data does) are clipped by the window and
+    left out of the comparison.
+
+    Args:
+        previous, current: Result dataclass objects of the two cycles
+        previous_times, current_times: Epoch seconds of each cycle's bars,
+            used to match results by time instead of by index
+    """
+    previous_start = _window_start(previous_times)
+    window_start = _window_start(current_times)
+
+    before: Dict[tuple, List] = {}
+    for item in previous:
+        values = _normalize(item, previous_times)
+        key = _key(values)
+        if previous_start is None or key[-1] != previous_start:
+            before.setdefault(key, []).append((item, values))
+
+    diff = ResultDiff()
+    for item in current:
+        values = _normalize(item, current_times)
+        key = _key(values)
+        if window_start is not None and key[-1] == window_start:
+            continue
+        candidates = before.get(key)
+        if not candidates:
+            diff.added.append(item)
+            continue
+        # Several results can share a start; an identical one is the same result
+        match = next((i for i, (_, old) in enumerate(candidates) if old == values), None)
+        if match is None:
+            candidates.pop(0)
+            diff.changed.append(item)
+        else:
+            candidates.pop(match)
+
+    # Results starting before (or on) the first bar of the new window scrolled out of it
+    for key, candidates in before.items():
+        start = key[-1]
+        if window_start is None or not isinstance(start, (int, np.integer)) or start > window_start:
+            diff.removed.extend(item for item, _ in candidates)
+    return diff
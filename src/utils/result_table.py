@@ -0,0 +1,348 @@
+"""
+Columnar storage for analysis results.
+
+Analyzers collect their results column by column through a ResultBuilder and
+return either the familiar list of dataclass objects or a ResultTable, which
+keeps one NumPy array per field and only creates objects when iterated.
+"""
+from dataclasses import fields, MISSING
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Tuple, Union, get_args, get_origin, get_type_hints
+import numpy as np
+import pandas as pd
+
+
+def _column_kind(hint) -> Tuple[str, bool]:
+    """Map a dataclass field type hint to a (kind, optional) storage spec."""
+    optional = False
+    if get_origin(hint) is Union and type(None) in get_args(hint):
+        remaining = [a for a in get_args(hint) if a is not type(None)]
+        if len(remaining) == 1:
+            hint = remaining[0]
+            optional = True
+
+    if isinstance(hint, type) and issubclass(hint, Enum):
+        return 'enum', optional
+    if hint is str:
+        return 'category', optional
+    if hint is float:
+        return 'float', optional
+    if hint is int and not optional:
+        return 'int', optional
+    if hint in (datetime, pd.Timestamp):
+        return 'time', optional
+    return 'object', optional
+
+
+class _ColumnSpec:
+    """Storage description of one result field."""
+
+    __slots__ = ('name', 'kind', 'optional', 'enum_type', 'default')
+
+    def __init__(self, name: str, kind: str, optional: bool, enum_type=None, default=MISSING):
+        self.name = name
+        self.kind = kind
+        self.optional = optional
+        self.enum_type = enum_type
+        self.default = default
+
+
+_SCHEMAS: Dict[type, List[_ColumnSpec]] = {}
+
+
+def _schema(record_type: type) -> List[_ColumnSpec]:
+    """Column specs for a result dataclass, cached per type."""
+    schema = _SCHEMAS.get(record_type)
+    if schema is None:
+        hints = get_type_hints(record_type)
+        schema = []
+        for f in fields(record_type):
+            if not f.init:
+                continue
+            kind, optional = _column_kind(hints[f.name])
+            enum_type = None
+            if kind == 'enum':
+                enum_type = hints[f.name]
+                if get_origin(enum_type) is Union:
+                    enum_type = [a for a in get_args(enum_type) if a is not type(None)][0]
+            schema.append(_ColumnSpec(f.name, kind, optional, enum_type, f.default))
+        _SCHEMAS[record_type] = schema
+    return schema
+
+
+def _encode(spec: _ColumnSpec, values: List[Any]) -> Tuple[np.ndarray, Any]:
+    """Encode a list of Python values into (array, categories)."""
+    if spec.kind == 'enum':
+        members = list(spec.enum_type)
+        lookup = {m: i for i, m in enumerate(members)}
+        codes = np.fromiter((-1 if v is None else lookup[v] for v in values),
+                            dtype=np.int16, count=len(values))
+        return codes, members
+
+    if spec.kind == 'category':
+        lookup: Dict[Any, int] = {}
+        codes = np.fromiter((-1 if v is None else lookup.setdefault(v, len(lookup)) for v in values),
+                            dtype=np.int32, count=len(values))
+        return codes, list(lookup)
+
+    if spec.kind == 'float':
+        return np.fromiter((np.nan if v is None else v for v in values),
+                           dtype=np.float64, count=len(values)), None
+
+    if spec.kind == 'int':
+        return np.fromiter(values, dtype=np.int64, count=len(values)), None
+
+    if spec.kind == 'time' and values:
+        # Positional labels (RangeIndex) stay integers, real timestamps become datetime64
+        if all(isinstance(v, (int, np.integer)) for v in values):
+            return np.fromiter(values, dtype=np.int64, count=len(values)), None
+        if all(isinstance(v, (datetime, np.datetime64)) for v in values):
+            try:
+                return pd.DatetimeIndex(values).values, None
+            except (TypeError, ValueError):
+                pass
+
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column, None
+
+
+class ResultTable:
+    """
+    Column-oriented collection of analysis results.
+
+    Behaves like a read-only sequence of the result dataclass: indexing with
+    an integer or iterating builds objects on demand, while slices, index
+    arrays and boolean masks return another ResultTable over the selected
+    rows. Enum and string fields are stored as integer codes.
+    """
+
+    def __init__(self, record_type: type, columns: Dict[str, np.ndarray],
+                 categories: Dict[str, list] = None):
+        self.record_type = record_type
+        self._schema = _schema(record_type)
+        self._columns = columns
+        self._categories = categories or {}
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_objects(cls, record_type: type, objects: List[Any]) -> 'ResultTable':
+        """Build a table from existing result objects."""
+        builder = ResultBuilder(record_type)
+        for obj in objects:
+            builder.append(**{spec.name: getattr(obj, spec.name) for spec in builder.schema})
+        return builder.to_table()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._length):
+            yield self._record(i)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("ResultTable index out of range")
+            return self._record(int(key))
+        return self.take(key)
+
+    def __repr__(self) -> str:
+        return f"ResultTable({self.record_type.__name__}, rows={self._length})"
+
+    @property
+    def columns(self) -> List[str]:
+        """Field names in dataclass order."""
+        return [spec.name for spec in self._schema]
+
+    def column(self, name: str) -> np.ndarray:
+        """Raw column array (integer codes for enum and string fields)."""
+        return self._columns[name]
+
+    def categories(self, name: str) -> list:
+        """Labels for the codes of an enum or string column."""
+        return self._categories.get(name, [])
+
+    def take(self, key) -> 'ResultTable':
+        """Select rows by slice, index array or boolean mask."""
+        columns = {name: col[key] for name, col in self._columns.items()}
+        return ResultTable(self.record_type, columns, self._categories)
+
+    def sort_by(self, name: str) -> 'ResultTable':
+        """Stable sort of the rows by one column."""
+        return self.take(np.argsort(self._columns[name], kind='stable'))
+
+    def to_list(self) -> List[Any]:
+        """Materialize all rows as result objects."""
+        return list(self)
+
+    def to_numpy(self) -> np.ndarray:
+        """Structured array of the columns; enum and string fields keep their codes."""
+        dtype = [(name, col.dtype) for name, col in self._columns.items()]
+        out = np.empty(self._length, dtype=dtype)
+        for name, col in self._columns.items():
+            out[name] = col
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame with enum and string fields as categoricals."""
+        data = {}
+        for spec in self._schema:
+            col = self._columns[spec.name]
+            if spec.kind == 'enum':
+                labels = [m.value for m in self._categories[spec.name]]
+                data[spec.name] = pd.Categorical.from_codes(col, categories=labels)
+            elif spec.kind == 'category':
+                data[spec.name] = pd.Categorical.from_codes(col, categories=self._categories[spec.name])
+            else:
+                data[spec.name] = col
+        return pd.DataFrame(data)
+
+    def _decode(self, spec: _ColumnSpec, value):
+        """Convert one stored cell back into the dataclass field value."""
+        if spec.kind in ('enum', 'category'):
+            return None if value < 0 else self._categories[spec.name][value]
+        if spec.kind == 'float':
+            if spec.optional and np.isnan(value):
+                return None
+            return float(value)
+        if spec.kind == 'int':
+            return int(value)
+        if isinstance(value, np.datetime64):
+            return pd.Timestamp(value)
+        if isinstance(value, np.integer):
+            return int(value)
+        return value
+
+    def _record(self, i: int):
+        """Build the result object for row i."""
+        return self.record_type(**{
+            spec.name: self._decode(spec, self._columns[spec.name][i])
+            for spec in self._schema
+        })
+
+
+def _encode_chunks(spec: _ColumnSpec, chunks: list) -> Tuple[np.ndarray, Any]:
+    """Encode a column collected as lists and arrays; numeric arrays skip Python values."""
+    arrays = [c for c in chunks if isinstance(c, np.ndarray)]
+    if arrays and spec.kind in ('float', 'int') and all(a.dtype.kind in 'iuf' for a in arrays):
+        dtype = np.float64 if spec.kind == 'float' else np.int64
+        return np.concatenate([c.astype(dtype, copy=False) if isinstance(c, np.ndarray)
+                               else _encode(spec, c)[0] for c in chunks]), None
+    if arrays and len(arrays) == len(chunks) and spec.kind == 'time':
+        kinds = {a.dtype.kind for a in arrays}
+        if kinds == {'M'}:
+            return np.concatenate(arrays).astype('datetime64[ns]'), None
+        if kinds <= {'i', 'u'}:
+            return np.concatenate(arrays).astype(np.int64), None
+    return _encode(spec, _flatten(chunks))
+
+
+def _flatten(chunks: list) -> list:
+    """One list of Python values from lists and arrays."""
+    if len(chunks) == 1 and isinstance(chunks[0], list):
+        return chunks[0]
+    values = []
+    for chunk in chunks:
+        if isinstance(chunk, np.ndarray) and chunk.dtype.kind == 'M':
+            # tolist() would turn datetime64[ns] into integer nanoseconds
+            values.extend(pd.DatetimeIndex(chunk))
+        elif isinstance(chunk, np.ndarray):
+            values.extend(chunk.tolist())
+        else:
+            values.extend(chunk)
+    return values
+
+
+class ResultBuilder:
+    """
+    Accumulates analysis results field by field.
+
+    Analyzers call append() with the same keyword arguments they would pass
+    to the result dataclass, then build() either the object list or a
+    ResultTable without creating intermediate objects. Arrays passed to
+    extend() are kept as they are until build().
+    """
+
+    def __init__(self, record_type: type):
+        self.record_type = record_type
+        self.schema = _schema(record_type)
+        # Rows from append() collect in _values; extend() moves them into
+        # _chunks ahead of its own columns, so the row order is kept
+        self._values: Dict[str, list] = {spec.name: [] for spec in self.schema}
+        self._chunks: Dict[str, list] = {spec.name: [] for spec in self.schema}
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, **values):
+        """Add one result row."""
+        for spec in self.schema:
+            if spec.name in values:
+                self._values[spec.name].append(values[spec.name])
+            elif spec.default is not MISSING:
+                self._values[spec.name].append(spec.default)
+            else:
+                raise TypeError(f"{self.record_type.__name__} row missing field '{spec.name}'")
+        self._length += 1
+
+    def extend(self, **columns):
+        """
+        Add many rows at once.
+
+        Each value is either a sequence/array with one entry per row or a
+        scalar repeated for every row. Arrays are not copied.
+        """
+        length = next((len(v) for v in columns.values() if isinstance(v, (list, tuple, np.ndarray))), None)
+        if length is None:
+            raise TypeError("extend() needs at least one column of values")
+
+        chunks = {}
+        for spec in self.schema:
+            values = columns.get(spec.name, spec.default)
+            if values is MISSING:
+                raise TypeError(f"{self.record_type.__name__} rows missing field '{spec.name}'")
+            if isinstance(values, tuple):
+                values = list(values)
+            elif not isinstance(values, (list, np.ndarray)):
+                values = [values] * length
+            if len(values) != length:
+                raise ValueError(f"Column '{spec.name}' has {len(values)} values, expected {length}")
+            chunks[spec.name] = values
+
+        for spec in self.schema:
+            if self._values[spec.name]:
+                self._chunks[spec.name].append(self._values[spec.name])
+                self._values[spec.name] = []
+            self._chunks[spec.name].append(chunks[spec.name])
+        self._length += length
+
+    def _column_chunks(self, name: str) -> list:
+        """Collected values of one field, as lists and arrays in row order."""
+        if self._values[name]:
+            return self._chunks[name] + [self._values[name]]
+        return self._chunks[name]
+
+    def to_list(self) -> List[Any]:
+        """Create the result objects."""
+        names = [spec.name for spec in self.schema]
+        columns = [_flatten(self._column_chunks(name)) for name in names]
+        return [self.record_type(**dict(zip(names, row))) for row in zip(*columns)]
+
+    def to_table(self) -> ResultTable:
+        """Encode the collected rows as a ResultTable."""
+        columns = {}
+        categories = {}
+        for spec in self.schema:
+            columns[spec.name], cats = _encode_chunks(spec, self._column_chunks(spec.name))
+            if cats is not None:
+                categories[spec.name] = cats
+        return ResultTable(self.record_type, columns, categories)
+
+    def build(self, columnar: bool = False):
+        """Return a ResultTable when columnar, otherwise a list of objects."""
+        return self.to_table() if columnar else self.to_list()
@@ -0,0 +1,5 @@
+"""Shared test setup: the sources are imported from src/, as when running from there."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
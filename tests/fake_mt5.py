@@ -0,0 +1,105 @@
+"""
+In-memory stand-in for the MetaTrader5 module.
+
+Serves a fixed H1 bar history per symbol, of which the first `visible`
+bars exist "so far"; the newest visible bar is the one still forming.
+advance() closes bars, and every rates call is logged in `calls`.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List, Tuple
+import numpy as np
+
+from data.bars import RATES_DTYPE
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+TIMEFRAME_MN1 = 49153
+
+START = 1_700_000_000 - 1_700_000_000 % 3600
+
+
+def make_rates(count: int, start: int = START, step: int = 3600, seed: int = 0) -> np.ndarray:
+    """A random-walk rates array in the terminal's record layout."""
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0005, count))
+    rates = np.zeros(count, dtype=RATES_DTYPE)
+    rates['time'] = start + step * np.arange(count)
+    rates['open'] = np.r_[close[0], close[:-1]]
+    rates['high'] = np.maximum(rates['open'], close) + 0.0002
+    rates['low'] = np.minimum(rates['open'], close) - 0.0002
+    rates['close'] = close
+    rates['tick_volume'] = rng.integers(1, 1000, count)
+    rates['spread'] = 10
+    return rates
+
+
+class FakeMT5:
+    """Module-like object with the MetaTrader5 calls MT5Connector makes."""
+
+    def __init__(self, rates: np.ndarray, visible: int, digits: int = 5):
+        for name, value in globals().items():
+            if name.startswith('TIMEFRAME_'):
+                setattr(self, name, value)
+        self.rates = rates.copy()
+        self.visible = visible
+        self.digits = digits
+        self.calls: List[Tuple] = []
+
+    def advance(self, bars: int = 1):
+        """Let `bars` more bars open."""
+        self.visible = min(len(self.rates), self.visible + bars)
+
+    def set_forming_close(self, close: float):
+        """Move the price of the still-forming bar."""
+        bar = self.rates[self.visible - 1]
+        bar['close'] = close
+        bar['high'] = max(bar['high'], close)
+        bar['low'] = min(bar['low'], close)
+
+    # MetaTrader5 API
+
+    def initialize(self, *args, **kwargs) -> bool:
+        return True
+
+    def login(self, *args, **kwargs) -> bool:
+        return True
+
+    def shutdown(self):
+        pass
+
+    def last_error(self):
+        return (1, 'Success')
+
+    def account_info(self):
+        return SimpleNamespace(login=1, server='Fake', balance=0.0, equity=0.0, leverage=100,
+                               currency='USD', company='Fake')
+
+    def symbol_info(self, symbol: str):
+        return SimpleNamespace(name=symbol, description=symbol, point=10.0 ** -self.digits,
+                               digits=self.digits, spread=10, trade_contract_size=100000,
+                               currency_base=symbol[:3], currency_profit=symbol[3:],
+                               bid=float(self.rates['close'][self.visible - 1]),
+                               ask=float(self.rates['close'][self.visible - 1]) + 0.0001)
+
+    def symbol_info_tick(self, symbol: str):
+        bid = float(self.rates['close'][self.visible - 1])
+        return SimpleNamespace(bid=bid, ask=bid + 0.0001, time=int(self.rates['time'][self.visible - 1]))
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, pos: int, count: int) -> np.ndarray:
+        self.calls.append(('from_pos', count))
+        end = self.visible - pos
+        return self.rates[max(0, end - count):end].copy()
+
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from: datetime, date_to: datetime) -> np.ndarray:
+        visible = self.rates[:self.visible]
+        selected = visible[(visible['time'] >= int(date_from.timestamp()))
+                           & (visible['time'] <= int(date_to.timestamp()))]
+        self.calls.append(('range', len(selected)))
+        return selected.copy()
@@ -0,0 +1,80 @@
+"""BarAggregator ticks, M1 bars, advance() and the order of bar-close callbacks."""
+import numpy as np
+import pytest
+
+from data.bar_aggregator import BarAggregator
+from fake_mt5 import make_rates
+
+# Wednesday 2024-01-03 00:00 UTC
+START = 1704240000
+
+
+def ohlcv(bar) -> tuple:
+    return (int(bar['time']), float(bar['open']), float(bar['high']), float(bar['low']),
+            float(bar['close']), int(bar['tick_volume']))
+
+
+@pytest.fixture
+def closes():
+    return []
+
+
+def aggregator(closes: list, timeframes=('M1', 'M5')) -> BarAggregator:
+    agg = BarAggregator('EURUSD', timeframes)
+    agg.on_bar_close(lambda symbol, tf, bar: closes.append((tf, int(bar['time']))))
+    return agg
+
+
+def test_ticks_build_bars_and_close_on_the_next_bucket(closes):
+    agg = aggregator(closes)
+    for time, bid in [(0, 1.10), (20, 1.12), (40, 1.09), (59, 1.11), (61, 1.13)]:
+        agg.update_tick(START + time, bid)
+
+    assert [ohlcv(bar) for bar in agg.bars('M1')] == [(START, 1.10, 1.12, 1.09, 1.11, 4)]
+    assert len(agg.bars('M5')) == 0
+    assert ohlcv(agg.forming('M1')) == (START + 60, 1.13, 1.13, 1.13, 1.13, 1)
+    assert ohlcv(agg.forming('M5')) == (START, 1.10, 1.13, 1.09, 1.13, 5)
+    assert closes == [('M1', START)]
+
+
+def test_late_tick_after_advance_does_not_reopen_the_closed_bar(closes):
+    agg = aggregator(closes, ('M1',))
+    agg.update_tick(60, 1.1)
+    agg.update_tick(70, 1.2)
+    assert agg.advance(120) == 1
+    agg.update_tick(110, 1.3)  # Belongs to the bar advance() closed
+    agg.update_tick(130, 1.4)
+
+    assert [ohlcv(bar) for bar in agg.bars('M1')] == [(60, 1.1, 1.2, 1.1, 1.2, 2)]
+    assert closes == [('M1', 60)]
+    assert ohlcv(agg.forming('M1')) == (120, 1.4, 1.4, 1.4, 1.4, 1)
+    assert agg.advance(120) == 0
+
+
+def test_m1_bars_in_batches_match_one_pass():
+    rates = make_rates(600, start=START, step=60, seed=5)
+    whole = BarAggregator('EURUSD', ('M5', 'M15', 'H1'))
+    whole.update_bars(rates)
+    batched = BarAggregator('EURUSD', ('M5', 'M15', 'H1'))
+    for chunk in np.array_split(rates, 7):
+        batched.update_bars(chunk)
+
+    for tf, period in [('M5', 300), ('M15', 900), ('H1', 3600)]:
+        bars = batched.bars(tf)
+        np.testing.assert_array_equal(bars, whole.bars(tf))
+        assert len(bars) == 600 * 60 // period - 1  # The last bucket is still forming
+        first = rates[rates['time'] < START + period]
+        assert ohlcv(bars[0]) == (START, first['open'][0], first['high'].max(), first['low'].min(),
+                                  first['close'][-1], int(first['tick_volume'].sum()))
+
+
+def test_callbacks_run_in_close_time_order_shorter_timeframes_first(closes):
+    agg = aggregator(closes, ('H1', 'M15', 'M5'))
+    agg.update_bars(make_rates(60, start=START, step=60, seed=1))
+    agg.update_bars(make_rates(1, start=START + 3600, step=60, seed=2))
+
+    # The first batch closes M5 and M15 bars interleaved; the bar at 60 min closes all three
+    assert closes[:4] == [('M5', START), ('M5', START + 300), ('M5', START + 600), ('M15', START)]
+    assert closes[-3:] == [('M5', START + 3300), ('M15', START + 2700), ('H1', START)]
+    close_times = [time + {'M5': 300, 'M15': 900, 'H1': 3600}[tf] for tf, time in closes]
+    assert close_times == sorted(close_times)
@@ -0,0 +1,90 @@
+"""BarCloseScheduler batching and timing against a simulated clock."""
+import pandas as pd
+import pytest
+
+from data.bar_scheduler import BarCloseScheduler, last_bar_close, next_bar_close
+
+# Wednesday 2024-01-03 00:00 UTC
+START = 1704240000
+HOUR = 3600
+
+
+class Clock:
+    """Connector clock that wakes up `late` seconds after every requested wait."""
+
+    def __init__(self, now: float, late: float = 0.0, end: float = float('inf')):
+        self.time = now
+        self.late = late
+        self.end = end
+        self.waits = []
+
+    def now(self) -> float:
+        return self.time
+
+    def wait(self, seconds: float) -> bool:
+        self.waits.append(seconds)
+        self.time += seconds + self.late
+        return self.time < self.end
+
+
+def test_closes_at_the_top_of_the_hour_run_as_one_batch():
+    scheduler = BarCloseScheduler([('EURUSD', 'H1'), ('EURUSD', 'm5'), ('GBPUSD', 'M15'),
+                                   ('EURUSD', 'M5')])
+    assert scheduler.timeframes == ['M5', 'M15', 'H1'] and len(scheduler.subscriptions) == 3
+
+    close, batch = scheduler.next_batch(START + 10 * HOUR - 30)
+    assert close == START + 10 * HOUR
+    assert batch == [('EURUSD', 'H1'), ('EURUSD', 'M5'), ('GBPUSD', 'M15')]
+    assert scheduler.next_batch(START + 10 * HOUR) == (START + 10 * HOUR + 300, [('EURUSD', 'M5')])
+    assert scheduler.next_batch(START + 10 * HOUR + 600)[1] == [('EURUSD', 'M5'), ('GBPUSD', 'M15')]
+
+
+def test_weekly_bars_close_on_sunday():
+    close = next_bar_close(START, 'W1')
+    assert pd.Timestamp(close, unit='s') == pd.Timestamp('2024-01-07')  # Sunday 00:00
+    assert last_bar_close(START, 'W1') == close - 7 * 86400
+    assert next_bar_close(close, 'W1') == close + 7 * 86400
+
+    scheduler = BarCloseScheduler([('EURUSD', 'D1'), ('EURUSD', 'W1')])
+    assert scheduler.next_batch(close - 60) == (close, [('EURUSD', 'D1'), ('EURUSD', 'W1')])
+    assert scheduler.next_batch(START)[1] == [('EURUSD', 'D1')]
+
+
+def test_late_wake_ups_do_not_drift():
+    clock = Clock(START + 10, late=1.5)
+    runs = []
+    BarCloseScheduler([('EURUSD', 'M5')], delay=2.0).run(
+        clock, lambda close, batch: runs.append((close, clock.now())), max_batches=20)
+
+    assert [close for close, _ in runs] == [START + 300 * i for i in range(1, 21)]
+    # Every job runs delay plus the wake-up lateness after its close, never later
+    assert all(ran == pytest.approx(close + 3.5) for close, ran in runs)
+    assert clock.waits[1] == pytest.approx(300 - 1.5)
+
+
+def test_closes_during_a_slow_job_are_skipped(capsys):
+    clock = Clock(START + 10)
+    closes = []
+
+    def job(close, batch):
+        closes.append(close)
+        if len(closes) == 2:
+            clock.time += 700  # Overruns the next two M5 closes
+
+    BarCloseScheduler([('EURUSD', 'M5'), ('EURUSD', 'H1')], delay=0).run(clock, job, max_batches=4)
+    assert closes == [START + 300, START + 600, START + 1500, START + 1800]
+    assert 'Skipped 2 bar close(s) of M5' in capsys.readouterr().out
+
+
+def test_run_stops_when_the_data_ends():
+    clock = Clock(START + 10, end=START + 1000)
+    closes = []
+    BarCloseScheduler([('EURUSD', 'M5')]).run(clock, lambda close, batch: closes.append(close))
+    assert closes == [START + 300, START + 600, START + 900]
+
+
+def test_unknown_timeframes_and_empty_subscriptions_are_rejected():
+    with pytest.raises(ValueError):
+        BarCloseScheduler([('EURUSD', 'H2')])
+    with pytest.raises(ValueError):
+        BarCloseScheduler([])
@@ -0,0 +1,60 @@
+"""BarStore appends and range reads on a temporary directory."""
+import numpy as np
+
+from data.bar_store import BarStore
+from data.bars import compact_rates
+from fake_mt5 import make_rates
+
+# 2024-01-31 00:00 UTC: 48 hourly bars span the January/February partitions
+START = 1706659200
+
+
+def test_append_skips_stored_bars_and_reads_ranges(tmp_path):
+    store = BarStore(str(tmp_path))
+    rates = make_rates(48, start=START)
+
+    assert store.append('EURUSD', 'H1', rates[:30]) == 30
+    assert store.append('EURUSD', 'H1', rates[20:]) == 18  # Overlap is skipped
+    assert store.append('EURUSD', 'H1', rates) == 0
+    assert sorted(p.name for p in (tmp_path / 'EURUSD' / 'H1').iterdir() if p.is_dir()) == ['2024-01', '2024-02']
+
+    np.testing.assert_array_equal(store.read_rates('EURUSD', 'H1'), rates)
+    assert store.time_range('EURUSD', 'H1') == (int(rates['time'][0]), int(rates['time'][-1]))
+
+    # Inclusive bounds, across the month boundary
+    bars = store.read('EURUSD', 'H1', start=int(rates['time'][10]), end=int(rates['time'][40]))
+    np.testing.assert_array_equal(bars.time, rates['time'][10:41])
+    np.testing.assert_array_equal(bars.close, rates['close'][10:41])
+    np.testing.assert_array_equal(bars.volume, rates['tick_volume'][10:41])
+
+    assert store.read('EURUSD', 'H1', start=int(rates['time'][-1]) + 1) is None
+    assert len(store.read_rates('GBPUSD', 'H1')) == 0
+
+
+def test_reader_sees_rows_appended_by_another_instance(tmp_path):
+    rates = make_rates(48, start=START)
+    writer, reader = BarStore(str(tmp_path)), BarStore(str(tmp_path))
+    assert reader.read('EURUSD', 'H1') is None
+
+    writer.append('EURUSD', 'H1', rates[:10])
+    assert len(reader.read('EURUSD', 'H1')) == 10
+
+    writer.append('EURUSD', 'H1', rates[10:])
+    np.testing.assert_array_equal(reader.read_rates('EURUSD', 'H1'), rates)
+    # And the reader appends after the writer's rows rather than over them
+    assert reader.append('EURUSD', 'H1', make_rates(50, start=START)) == 2
+
+
+def test_compact_prices_are_stored_as_short_decimals(tmp_path):
+    store = BarStore(str(tmp_path))
+    rates = make_rates(5, start=START)
+    rates['close'] = [1.09687, 1.0969, 1.09701, 1.2, 1.09655]
+
+    store.append('EURUSD', 'H1', compact_rates(rates))
+    assert store.read('EURUSD', 'H1').close.tolist() == [1.09687, 1.0969, 1.09701, 1.2, 1.09655]
+
+    noisy = rates.copy()
+    noisy['time'] += 5 * 3600
+    noisy['close'] += 1e-9
+    store.append('EURUSD', 'H1', noisy, digits=5)
+    assert store.read('EURUSD', 'H1').close.tolist()[5:] == [1.09687, 1.0969, 1.09701, 1.2, 1.09655]
@@ -0,0 +1,38 @@
+"""Chart pattern trendlines must not depend on where the analysis window starts."""
+import pytest
+
+from data.synthetic import SyntheticMarket
+from indicators.chart_patterns import ChartPatternRecognizer, PatternType
+
+
+def wedge_pivots(offset: int, high_step: float):
+    """High, low, high, low pivots with rising lows and highs rising by high_step."""
+    return [(offset + 3, 1.09687, 'high'), (offset + 9, 1.0920, 'low'),
+            (offset + 17, 1.09687 + high_step, 'high'), (offset + 26, 1.0950, 'low')]
+
+
+def wedges(offset: int, high_step: float) -> list:
+    recognizer = ChartPatternRecognizer()
+    bars = SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(10)['EURUSD']
+    patterns = []
+
+    class Collect:
+        def append(self, **row):
+            patterns.append(row['pattern_type'])
+
+    recognizer._find_wedges(bars, wedge_pivots(offset, high_step), Collect())
+    return patterns
+
+
+@pytest.mark.parametrize('offset', [0, 37, 1000, 4321, 98765])
+def test_equal_highs_give_the_same_slope_wherever_the_window_starts(offset):
+    recognizer = ChartPatternRecognizer()
+    highs = [p for p in wedge_pivots(offset, 0.0) if p[2] == 'high']
+    assert recognizer._calculate_trendline_slope(highs) == recognizer._calculate_trendline_slope(
+        [(i - offset, price, kind) for i, price, kind in highs])
+    # Flat highs over rising lows are not a rising wedge, at any offset
+    assert wedges(offset, 0.0) == []
+
+
+def test_converging_rising_trendlines_are_a_rising_wedge():
+    assert wedges(1000, 0.0005) == [PatternType.WEDGE_RISING]
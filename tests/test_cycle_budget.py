@@ -0,0 +1,71 @@
+"""Cycle budget: stages deferred in priority order and partial results completed later."""
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from data.replay_connector import ReplayConnector
+from data.synthetic import SyntheticMarket
+from indicators.chart_patterns import ChartPatternRecognizer
+from indicators.trend_analysis import TrendAnalyzer
+from indicators.wave_counter import WaveCounter
+from live_mt5_analysis import ANALYSIS_STAGES, LiveForexAnalyzer, analyze_bars_timed, deferred_stages
+
+# Wednesday 2024-01-03 00:00 UTC
+START = 1704240000
+
+
+@pytest.fixture(scope='module')
+def rates():
+    return SyntheticMarket(['EURUSD'], 'H1', seed=6).generate(600, start=START)['EURUSD']
+
+
+def timed(rates, **options):
+    return analyze_bars_timed(WaveCounter(sensitivity=5), TrendAnalyzer(), ChartPatternRecognizer(),
+                              'EURUSD', 'H1', rates, **options)
+
+
+def test_without_a_deadline_every_stage_runs(rates):
+    results, durations = timed(rates)
+    assert list(results) == list(ANALYSIS_STAGES) == list(durations)
+    assert deferred_stages(results) == () and all(items is not None for items in results.values())
+
+
+def test_stages_are_deferred_from_the_lowest_priority_up(rates):
+    # A passed deadline still runs the first (critical) stage
+    results, durations = timed(rates, deadline=time.time() - 1)
+    assert deferred_stages(results) == ('trends', 'patterns', 'movements') and list(durations) == ['waves']
+
+    # Once one stage is expected to overrun, the cheaper ones after it wait too
+    results, durations = timed(rates, deadline=time.time() + 60,
+                               estimates={'trends': 0.0, 'patterns': 3600.0, 'movements': 0.0})
+    assert deferred_stages(results) == ('patterns', 'movements') and list(durations) == ['waves', 'trends']
+
+    results, _ = timed(rates, stages=('patterns', 'waves'), deadline=time.time() - 1)
+    assert results['patterns'] is not None and deferred_stages(results) == ('waves',)
+
+
+def test_partial_results_are_marked_and_completed_by_run_deferred(tmp_path, rates, capsys):
+    np.save(tmp_path / 'EURUSD_H1.npy', rates)
+    config = json.loads((Path(__file__).resolve().parents[1] / 'config' / 'pairs.json').read_text())
+    config['analysis_settings']['cycle_budget_seconds'] = 0.5
+    config_path = tmp_path / 'pairs.json'
+    config_path.write_text(json.dumps(config))
+
+    connector = ReplayConnector(str(tmp_path), start=START + 500 * 3600)
+    analyzer = LiveForexAnalyzer(str(config_path), connector=connector)
+    assert connector.connect()
+
+    results = analyzer.analyze_pair('EURUSD', 'H1', 300, deadline=time.time() - 1)
+    assert deferred_stages(results) == ('trends', 'patterns', 'movements')
+    assert 'Partial result: trends, patterns, movements deferred' in capsys.readouterr().out
+    assert analyzer.metrics._events[('partial', 'EURUSD', 'H1')] == 1
+
+    analyzer.run_deferred()
+    assert deferred_stages(results) == () and analyzer._deferred == []
+    assert analyzer._last_cycle[('EURUSD', 'H1')][1] is results  # Completed in place
+    complete, _ = timed(analyzer.fetch_pair('EURUSD', 'H1', 300)['data'])
+    assert results == complete
+    assert 'deferred stages done' in capsys.readouterr().out
@@ -0,0 +1,53 @@
+"""FetchPlanner request sizes from analyzer warm-up and lookback periods."""
+import json
+from pathlib import Path
+
+from data.fetch_planner import FetchPlanner
+from indicators.chart_patterns import ChartPatternRecognizer
+from indicators.trend_analysis import TrendAnalyzer
+from indicators.wave_counter import WaveCounter
+
+
+class Warmup:
+    def __init__(self, bars: int):
+        self.bars = bars
+
+    def warmup_bars(self) -> int:
+        return self.bars
+
+
+def test_bars_are_lookback_plus_the_longest_warmup():
+    planner = FetchPlanner([Warmup(10), Warmup(35), Warmup(20)], {'H1': 24, 'M15': 96})
+    assert planner.warmup() == 35
+    assert planner.bars_for('H1') == 24 + 35
+    assert planner.bars_for('m15') == 96 + 35
+
+
+def test_unconfigured_timeframes_cover_the_longest_configured_span():
+    planner = FetchPlanner([Warmup(30)], {'H1': 24, 'H4': 12})  # 24 h and 48 h
+    assert planner.lookback('M30') == 96
+    assert planner.lookback('D1') == 2
+    assert planner.lookback('W1') == 1  # Never less than one bar
+    assert planner.bars_for('M30') == 96 + 30
+
+
+def test_defaults_and_hard_limit():
+    assert FetchPlanner([Warmup(30)]).bars_for('H1') == 200
+    assert FetchPlanner([Warmup(500)]).bars_for('H1') == 500
+    assert FetchPlanner([], {'H1': 24}).bars_for('H1') == 24
+
+    capped = FetchPlanner([Warmup(30)], {'M1': 1440}, max_bars=1000)
+    assert capped.bars_for('M1') == 1000 and capped.bars_for('H1') == 24 + 30
+    assert capped.plan(['EURUSD', 'GBPUSD'], ['M1', 'H1']) == {
+        ('EURUSD', 'M1'): 1000, ('EURUSD', 'H1'): 54, ('GBPUSD', 'M1'): 1000, ('GBPUSD', 'H1'): 54}
+
+
+def test_planner_from_the_shipped_config_and_analyzers():
+    config = json.loads((Path(__file__).resolve().parents[1] / 'config' / 'pairs.json').read_text())
+    analyzers = [WaveCounter(sensitivity=5), TrendAnalyzer(), ChartPatternRecognizer()]
+    planner = FetchPlanner.from_config(config, analyzers)
+
+    warmup = max(a.warmup_bars() for a in analyzers)
+    lookback = config['analysis_settings']['lookback_periods']
+    for timeframe in ('M1', 'M15', 'H1', 'H4', 'D1'):
+        assert planner.bars_for(timeframe) == lookback[timeframe] + warmup
@@ -0,0 +1,81 @@
+"""Histogram quantiles and the Prometheus text rendering of StageMetrics."""
+import re
+from urllib.request import urlopen
+
+import pytest
+
+from utils.metrics import STAGE_BUCKETS, Histogram, StageMetrics
+
+
+def test_quantiles_interpolate_within_buckets():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    assert histogram.quantile(0.5) == 0.0  # Nothing observed yet
+
+    for seconds in (0.5, 0.5, 1.5, 1.5):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == pytest.approx(1.0)
+    assert histogram.quantile(0.75) == pytest.approx(1.5)
+    assert histogram.quantile(0.25) == pytest.approx(0.5)
+    assert histogram.quantile(1.0) == pytest.approx(1.5)  # Never above the largest observation
+
+    histogram.observe(1.0)  # Bounds are inclusive, like Prometheus "le"
+    assert histogram.counts == [3, 2, 0, 0]
+    histogram.observe(10.0)
+    assert histogram.counts[-1] == 1 and histogram.quantile(1.0) == 10.0
+    assert (histogram.count, histogram.sum, histogram.max) == (6, pytest.approx(15.0), 10.0)
+
+
+def samples(text: str) -> dict:
+    """Sample lines of an exposition as {name{labels}: value}."""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            key, value = line.rsplit(' ', 1)
+            out[key] = float(value)
+    return out
+
+
+def test_render_follows_the_text_exposition_format():
+    metrics = StageMetrics(prefix='fx')
+    for seconds in (0.003, 0.004, 0.2):
+        metrics.observe('waves', 'EURUSD', 'H1', seconds)
+    metrics.observe_latency('EURUSD', 'H1', 2.5)
+    metrics.increment('error', 'EURUSD', 'H1')
+    metrics.increment('error', 'EURUSD', 'H1')
+    metrics.observe('report', 'odd"name\\', 'H1', 0.001)
+
+    text = metrics.render()
+    assert text.endswith('\n')
+    for name, kind in [('fx_stage_duration_seconds', 'histogram'),
+                       ('fx_bar_close_to_report_seconds', 'histogram'), ('fx_events_total', 'counter')]:
+        assert f'# TYPE {name} {kind}\n' in text and f'# HELP {name} ' in text
+    assert all(re.fullmatch(r'(# (HELP|TYPE) .*|[a-z_]+\{[^}]*\} [0-9.e+-]+)', line)
+               for line in text.splitlines())
+
+    values = samples(text)
+    labels = 'stage="waves",symbol="EURUSD",timeframe="H1"'
+    buckets = [values[f'fx_stage_duration_seconds_bucket{{{labels},le="{bound!r}"}}'] for bound in STAGE_BUCKETS]
+    assert buckets == sorted(buckets) and buckets[STAGE_BUCKETS.index(0.005)] == 2
+    assert values[f'fx_stage_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 3
+    assert values[f'fx_stage_duration_seconds_count{{{labels}}}'] == 3
+    assert values[f'fx_stage_duration_seconds_sum{{{labels}}}'] == pytest.approx(0.207)
+    assert values['fx_bar_close_to_report_seconds_bucket{symbol="EURUSD",timeframe="H1",le="3.0"}'] == 1
+    assert values['fx_events_total{event="error",symbol="EURUSD",timeframe="H1"}'] == 2
+    assert 'symbol="odd\\"name\\\\"' in text
+
+
+def test_textfile_and_scrape_endpoint(tmp_path):
+    metrics = StageMetrics()
+    metrics.observe('fetch', 'EURUSD', 'H1', 0.01)
+    path = tmp_path / 'forex.prom'
+    metrics.write_textfile(str(path))
+    assert path.read_text() == metrics.render() and [p.name for p in tmp_path.iterdir()] == ['forex.prom']
+
+    metrics.serve(0)
+    try:
+        host, port = metrics._server.server_address
+        assert host == '127.0.0.1'
+        with urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+            assert response.read().decode() == metrics.render()
+    finally:
+        metrics.close()
@@ -0,0 +1,97 @@
+"""Incremental fetches of MT5Connector against the fake terminal."""
+import numpy as np
+import pytest
+
+from data.bars import COMPACT_RATES_DTYPE
+from data.mt5_connector import MT5Connector
+from data.ring_buffer import BarRingBuffer
+from fake_mt5 import FakeMT5, make_rates
+
+
+def connect(terminal: FakeMT5, **kwargs) -> MT5Connector:
+    connector = MT5Connector(mt5_module=terminal, **kwargs)
+    assert connector.connect()
+    return connector
+
+
+def test_incremental_fetch_requests_only_new_bars():
+    terminal = FakeMT5(make_rates(1000), visible=600)
+    connector = connect(terminal, buffer_capacity=300)
+
+    first = connector.get_live_data('EURUSD', 'H1', 200, as_array=True, incremental=True)
+    assert terminal.calls == [('from_pos', 200)]
+    np.testing.assert_array_equal(first, terminal.rates[400:600])
+
+    terminal.advance(3)
+    latest = connector.get_live_data('EURUSD', 'H1', 200, as_array=True, incremental=True)
+    # The still-forming bar 599 again plus the three bars opened since
+    assert terminal.calls[-1] == ('range', 4)
+    np.testing.assert_array_equal(latest, terminal.rates[403:603])
+
+
+def test_forming_bar_is_replaced():
+    terminal = FakeMT5(make_rates(500), visible=300)
+    connector = connect(terminal)
+    connector.get_live_data('EURUSD', 'H1', 100, as_array=True, incremental=True)
+
+    terminal.set_forming_close(1.5)
+    bars = connector.get_live_data('EURUSD', 'H1', 100, as_array=True, incremental=True)
+    assert len(bars) == 100
+    assert bars['time'][-1] == terminal.rates['time'][299]
+    assert bars['close'][-1] == 1.5
+    assert bars['time'][-2] == terminal.rates['time'][298]
+
+
+def test_short_history_is_not_reloaded():
+    terminal = FakeMT5(make_rates(500), visible=50)
+    connector = connect(terminal)
+
+    assert len(connector.get_live_data('EURUSD', 'H1', 200, as_array=True, incremental=True)) == 50
+    terminal.advance(2)
+    bars = connector.get_live_data('EURUSD', 'H1', 200, as_array=True, incremental=True)
+    assert [kind for kind, _ in terminal.calls] == ['from_pos', 'range']
+    np.testing.assert_array_equal(bars, terminal.rates[:52])
+
+
+def test_buffer_wraps_around_over_many_fetches():
+    terminal = FakeMT5(make_rates(2000), visible=100)
+    connector = connect(terminal, buffer_capacity=120)
+    connector.get_live_data('EURUSD', 'H1', 100, as_array=True, incremental=True)
+    for _ in range(50):
+        terminal.advance(7)
+        bars = connector.get_live_data('EURUSD', 'H1', 100, as_array=True, incremental=True)
+        np.testing.assert_array_equal(bars, terminal.rates[terminal.visible - 100:terminal.visible])
+    assert sum(kind == 'from_pos' for kind, _ in terminal.calls) == 1
+
+
+def test_ring_buffer_wraparound():
+    rates = make_rates(25)
+    buffer = BarRingBuffer(8)
+    for start in range(0, 25, 3):
+        buffer.append(rates[start:start + 3])
+        end = min(start + 3, 25)
+        np.testing.assert_array_equal(buffer.view(), rates[max(0, end - 8):end])
+        assert buffer.view().flags.c_contiguous
+    assert buffer.first_time == rates['time'][17] and buffer.last_time == rates['time'][24]
+    np.testing.assert_array_equal(buffer.view(3), rates[22:25])
+
+
+def test_ring_buffer_ignores_older_bars():
+    rates = make_rates(10)
+    buffer = BarRingBuffer(20)
+    buffer.append(rates[5:])
+    assert buffer.append(rates[:6]) == 0
+    np.testing.assert_array_equal(buffer.view(), rates[5:])
+
+
+def test_ring_buffer_saturates_volumes():
+    rates = make_rates(3)
+    rates['tick_volume'] = [1, 2**32 + 5, 2**40]
+    buffer = BarRingBuffer(4, COMPACT_RATES_DTYPE)
+    buffer.append(rates)
+    assert buffer.view()['tick_volume'].tolist() == [1, 2**32 - 1, 2**32 - 1]
+
+
+def test_ring_buffer_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        BarRingBuffer(0)
@@ -0,0 +1,77 @@
+"""Convergence signals of the sweep-line join against the pairwise scan it replaced."""
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analyzers.multi_timeframe_analyzer import MultiTimeframeAnalyzer, PipMovement
+
+START = datetime(2024, 1, 1)
+
+
+def random_movements(seed: int, per_timeframe: int = 60) -> dict:
+    """Movements on whole hours, so intervals often share their start or end."""
+    rng = np.random.default_rng(seed)
+    movements = {}
+    for timeframe in ('M15', 'H1', 'H4', 'D1'):
+        items = []
+        for _ in range(per_timeframe):
+            start = START + timedelta(hours=int(rng.integers(0, 200)))
+            end = start + timedelta(hours=int(rng.integers(0, 12)))
+            pips = float(rng.choice([20.0, 25.0, 30.0]))
+            direction = 'up' if rng.random() < 0.5 else 'down'
+            items.append(PipMovement('EURUSD', timeframe, start, end, 1.1, 1.1, pips, direction))
+        movements[timeframe] = items
+    return movements
+
+
+def pairwise_signals(analyzer: MultiTimeframeAnalyzer, movements_dict: dict) -> list:
+    """The original O(n²) scan, which reported every pair once per timeframe order."""
+    signals = []
+    for tf1 in movements_dict:
+        for tf2 in movements_dict:
+            if tf1 == tf2:
+                continue
+            for mov1 in movements_dict[tf1]:
+                for mov2 in movements_dict[tf2]:
+                    if (mov1.direction == mov2.direction
+                            and mov1.start_time <= mov2.end_time and mov2.start_time <= mov1.end_time):
+                        signals.append({
+                            'pair': analyzer.pair,
+                            'timeframes': [tf1, tf2],
+                            'direction': mov1.direction,
+                            'strength': analyzer._calculate_signal_strength(mov1, mov2),
+                            'timestamp': max(mov1.start_time, mov2.start_time),
+                        })
+    return signals
+
+
+def canonical(signals: list, order: list) -> Counter:
+    return Counter((s['pair'], tuple(sorted(s['timeframes'], key=order.index)), s['direction'],
+                    s['strength'], s['timestamp']) for s in signals)
+
+
+def test_sweep_reports_each_overlapping_pair_once():
+    analyzer = MultiTimeframeAnalyzer('EURUSD')
+    for seed in range(5):
+        movements = random_movements(seed)
+        sweep = analyzer.find_convergence_signals(movements)
+        old = canonical(pairwise_signals(analyzer, movements), analyzer.timeframes)
+
+        assert all(count % 2 == 0 for count in old.values())  # Both orders of every pair
+        assert canonical(sweep, analyzer.timeframes) == Counter({k: v // 2 for k, v in old.items()})
+        # Timeframes come lowest first
+        assert all(analyzer.timeframes.index(a) < analyzer.timeframes.index(b)
+                   for a, b in (s['timeframes'] for s in sweep))
+
+
+def test_touching_movements_converge_and_same_timeframe_does_not():
+    analyzer = MultiTimeframeAnalyzer('EURUSD')
+    hour = timedelta(hours=1)
+    first = PipMovement('EURUSD', 'H1', START, START + hour, 1.1, 1.1, 20.0, 'up')
+    touching = PipMovement('EURUSD', 'H4', START + hour, START + 2 * hour, 1.1, 1.1, 30.0, 'up')
+    same_tf = PipMovement('EURUSD', 'H1', START, START + hour, 1.1, 1.1, 20.0, 'up')
+    opposite = PipMovement('EURUSD', 'D1', START, START + 2 * hour, 1.1, 1.1, 20.0, 'down')
+
+    signals = analyzer.find_convergence_signals({'H4': [touching], 'H1': [first, same_tf], 'D1': [opposite]})
+    assert [(s['timeframes'], s['timestamp']) for s in signals] == [(['H1', 'H4'], START + hour)] * 2
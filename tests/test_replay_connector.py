@@ -0,0 +1,80 @@
+"""ReplayConnector clock, closed-bar cutoff, ticks, and streaming against recorded files."""
+import numpy as np
+import pytest
+
+from data.bar_aggregator import BarAggregator
+from data.replay_connector import ReplayConnector
+from fake_mt5 import START, make_rates
+
+TICK_DTYPE = [('time', '<i8'), ('bid', '<f8'), ('ask', '<f8')]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    np.save(tmp_path / 'EURUSD_H1.npy', make_rates(48, start=START, step=3600, seed=1))
+    np.save(tmp_path / 'EURUSD_M1.npy', make_rates(200, start=START, step=60, seed=2))
+    ticks = np.zeros(1200, dtype=TICK_DTYPE)
+    ticks['time'] = START + 10 * np.arange(1200)
+    ticks['bid'] = 1.1 + 0.0001 * np.sin(np.arange(1200))
+    ticks['ask'] = ticks['bid'] + 0.0001
+    np.save(tmp_path / 'EURUSD_ticks.npy', ticks)
+    return tmp_path
+
+
+def replay(data_dir, start: int) -> ReplayConnector:
+    connector = ReplayConnector(str(data_dir), start=start)
+    assert connector.connect()
+    return connector
+
+
+def test_clock_moves_only_on_wait_and_ends_with_the_recording(data_dir):
+    connector = replay(data_dir, START + 40 * 3600)
+    assert connector.now() == START + 40 * 3600
+    assert connector.now() == START + 40 * 3600
+
+    waits = 0
+    while connector.wait(3600):
+        waits += 1
+    # The last H1 bar (47) closes at 48 h
+    assert waits == 7 and connector.now() == START + 48 * 3600
+
+
+def test_only_bars_closed_by_the_clock_are_served(data_dir):
+    recorded = np.load(data_dir / 'EURUSD_H1.npy')
+    connector = replay(data_dir, START + 10 * 3600 + 1800)
+    assert not connector.serves_forming_bar
+
+    bars = connector.get_live_data('EURUSD', 'H1', 5, as_array=True)
+    np.testing.assert_array_equal(bars, recorded[5:10])  # Bar 10 is still forming
+    connector.wait(1800)
+    assert connector.get_live_data('EURUSD', 'H1', 5, as_array=True)['time'][-1] == recorded['time'][10]
+
+    frame = connector.get_live_data('EURUSD', 'H1', 100)
+    assert len(frame) == 11 and list(frame['close']) == list(recorded['close'][:11])
+    assert replay(data_dir, START + 1800).get_live_data('EURUSD', 'H1', 5) is None
+
+
+def test_ticks_up_to_the_clock(data_dir):
+    connector = replay(data_dir, START + 100)
+    ticks = connector.get_ticks('EURUSD', (START + 50) * 1000)
+    assert list(ticks['time']) == [START + 60, START + 70, START + 80, START + 90, START + 100]
+    assert len(connector.get_ticks('EURUSD', (START + 50) * 1000, count=2)) == 2
+
+    price = connector.get_current_price('EURUSD')
+    assert price['bid'] == ticks['bid'][-1] and price['ask'] == ticks['ask'][-1]
+    connector.wait(5)
+    assert connector.get_current_price('EURUSD')['bid'] == ticks['bid'][-1]
+    assert connector.get_ticks('GBPUSD', 0) is None
+
+
+def test_stream_bars_seeds_with_the_newest_closed_bars(data_dir):
+    recorded = np.load(data_dir / 'EURUSD_M1.npy')
+    connector = replay(data_dir, START + 100 * 60)
+    aggregator = BarAggregator('EURUSD', ('M1',))
+    connector.stream_bars('EURUSD', aggregator, interval=60, history_bars=5)
+
+    bars = aggregator.bars('M1')
+    # Bars 95..99 closed before the replay started; ticks built the rest
+    np.testing.assert_array_equal(bars[:5], recorded[95:100])
+    assert list(bars['time'][5:]) == list(START + 60 * np.arange(100, 100 + len(bars) - 5))
+    assert bars['tick_volume'][5] == 5  # The tick at the start time counts as already seen
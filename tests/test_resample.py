@@ -0,0 +1,72 @@
+"""Bucketing of resample, TimeframeSet and BarAggregator against pandas."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.bar_aggregator import BarAggregator
+from data.bars import bar_open_time
+from data.resample import TimeframeSet, resample
+from fake_mt5 import make_rates
+
+# Wednesday 2024-01-03 00:00 UTC
+START = 1704240000
+TIMEFRAMES = ('M5', 'H1', 'H4', 'D1', 'W1')
+
+
+@pytest.fixture(scope='module')
+def m1():
+    """Five weeks of M1 bars with the weekends and one session break removed."""
+    rates = make_rates(35 * 1440, start=START, step=60, seed=3)
+    when = pd.to_datetime(rates['time'], unit='s')
+    keep = (when.dayofweek < 5) & ~((when.hour == 21) & (when.minute < 37))
+    return rates[np.asarray(keep)]
+
+
+def pandas_resample(rates: np.ndarray, timeframe: str) -> pd.DataFrame:
+    frame = pd.DataFrame({name: rates[name] for name in ('open', 'high', 'low', 'close', 'tick_volume')},
+                         index=pd.to_datetime(rates['time'], unit='s'))
+    if timeframe == 'W1':
+        rule = pd.Timedelta(days=7)
+        origin = pd.Timestamp('1970-01-04')  # Weeks open on Sunday
+    else:
+        rule = pd.Timedelta(seconds={'M5': 300, 'H1': 3600, 'H4': 14400, 'D1': 86400}[timeframe])
+        origin = 'epoch'
+    bars = frame.resample(rule, origin=origin).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'tick_volume': 'sum'})
+    return bars.dropna()
+
+
+def assert_matches_pandas(bars: np.ndarray, expected: pd.DataFrame):
+    np.testing.assert_array_equal(bars['time'], (expected.index - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+    for name in ('open', 'high', 'low', 'close', 'tick_volume'):
+        np.testing.assert_array_equal(bars[name], expected[name].to_numpy())
+
+
+@pytest.mark.parametrize('timeframe', TIMEFRAMES)
+def test_resample_matches_pandas(m1, timeframe):
+    assert_matches_pandas(resample(m1, timeframe), pandas_resample(m1, timeframe))
+
+
+def test_weekly_bars_open_on_sunday(m1):
+    weeks = pd.to_datetime(resample(m1, 'W1')['time'], unit='s')
+    assert (weeks.dayofweek == 6).all() and (weeks.hour == 0).all()
+    assert bar_open_time(START, 'W1') == START - 3 * 86400  # The Sunday before
+
+
+def test_timeframe_set_matches_resample(m1):
+    bars = TimeframeSet(m1, TIMEFRAMES)
+    for tf in TIMEFRAMES:
+        np.testing.assert_array_equal(bars[tf], resample(m1, tf))
+
+
+def test_aggregator_matches_resample(m1):
+    aggregator = BarAggregator('EURUSD', TIMEFRAMES, capacity=10_000)
+    for chunk in np.array_split(m1, 7):
+        aggregator.update_bars(chunk)
+    for tf in TIMEFRAMES:
+        expected = resample(m1, tf)
+        closed = aggregator.bars(tf)
+        np.testing.assert_array_equal(closed['time'], expected['time'][:-1])
+        np.testing.assert_array_equal(closed['close'], expected['close'][:-1])
+        np.testing.assert_array_equal(closed['tick_volume'], expected['tick_volume'][:-1])
+        assert aggregator.forming(tf)['time'] == expected['time'][-1]
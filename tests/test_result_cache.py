@@ -0,0 +1,114 @@
+"""ResultCache keys, hits, damaged entries and eviction."""
+import os
+import pickle
+import time
+from dataclasses import fields
+
+import pytest
+
+from data.synthetic import SyntheticMarket
+from indicators.chart_patterns import ChartPatternRecognizer
+from indicators.divergence_convergence import DivergenceConvergenceAnalyzer
+from indicators.elliott_wave import ElliottWaveAnalyzer
+from indicators.trend_analysis import TrendAnalyzer
+from indicators.wave_counter import WaveCounter
+from utils.result_cache import ResultCache, _pack, _unpack, cached
+from utils.result_table import ResultTable
+
+
+@pytest.fixture(scope='module')
+def rates():
+    return SyntheticMarket(['EURUSD'], 'H1', seed=4).generate(2000)['EURUSD']
+
+
+def entries(cache: ResultCache) -> list:
+    return sorted(cache.root.glob('*/*.bin'))
+
+
+def test_hits_return_the_stored_results(tmp_path, rates):
+    cache = ResultCache(str(tmp_path))
+    method = WaveCounter(sensitivity=5).identify_wave_counts
+
+    first = cache.run(method, rates)
+    assert cache.run(method, rates) == first == method(rates)
+    table = cache.run(method, rates, columnar=True)
+    assert isinstance(table, ResultTable) and table.to_list() == first
+    assert (cache.hits, cache.misses) == (1, 2) and len(entries(cache)) == 2
+    assert cached(None, method, rates) == first
+
+
+@pytest.mark.parametrize('method', [
+    WaveCounter(sensitivity=5).identify_wave_counts,
+    TrendAnalyzer().identify_trends,
+    ChartPatternRecognizer().find_all_patterns,
+    DivergenceConvergenceAnalyzer().find_divergences,
+    DivergenceConvergenceAnalyzer().find_convergences,
+    lambda bars: ElliottWaveAnalyzer().analyze_wave_structure(bars)['impulse'],
+])
+def test_result_classes_are_stored_column_wise_and_rebuilt_whole(rates, method):
+    result = method(rates)
+    packed = pickle.loads(pickle.dumps(_pack(result)))
+    assert packed[0] == 'columns' and len(packed[2]) == sum(f.init for f in fields(result[0]))
+
+    rebuilt = _unpack(packed)
+    assert rebuilt == result
+    # Derived fields too, which the constructor recomputes
+    assert [[getattr(item, f.name) for f in fields(item)] for item in rebuilt] == \
+        [[getattr(item, f.name) for f in fields(item)] for item in result]
+
+
+def test_key_follows_data_settings_and_arguments(tmp_path, rates):
+    cache = ResultCache(str(tmp_path))
+    method = WaveCounter(sensitivity=5).identify_wave_counts
+    key = cache.key(method, rates)
+
+    assert cache.key(WaveCounter(sensitivity=5).identify_wave_counts, rates.copy()) == key
+    assert cache.key(WaveCounter(sensitivity=6).identify_wave_counts, rates) != key
+    assert cache.key(method, rates, columnar=True) != key
+    assert cache.key(method, rates[:-1]) != key
+    changed = rates.copy()
+    changed['close'][100] += 1e-5
+    assert cache.key(method, changed) != key
+    assert cache.key(TrendAnalyzer().identify_trends, rates) != key
+
+
+@pytest.mark.parametrize('damage', [
+    lambda blob: blob[:len(blob) // 2],
+    lambda blob: blob[:3],
+    lambda blob: b'',
+    lambda blob: b'XXXX' + blob[4:],
+    lambda blob: blob[:-1] + bytes([blob[-1] ^ 0xFF]),
+])
+def test_damaged_entries_are_misses_and_removed(tmp_path, rates, damage):
+    cache = ResultCache(str(tmp_path))
+    method = TrendAnalyzer().identify_trends
+    expected = cache.run(method, rates)
+    [path] = entries(cache)
+    path.write_bytes(damage(path.read_bytes()))
+
+    assert cache.run(method, rates) == expected
+    assert (cache.hits, cache.misses) == (0, 2)
+    # Replaced by the recomputed entry, which hits again
+    assert cache.run(method, rates) == expected and cache.hits == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, rates):
+    cache = ResultCache(str(tmp_path))
+    methods = [WaveCounter(sensitivity=s).identify_wave_counts for s in (3, 4, 5)]
+    for i, method in enumerate(methods):
+        cache.run(method, rates)
+        [path] = [p for p in entries(cache) if p.stem == cache.key(method, rates)]
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    cache.run(methods[0], rates)  # Now the most recently used
+
+    sizes = {p.stem: p.stat().st_size for p in entries(cache)}
+    cache.max_bytes = sum(sizes.values()) - 1
+    cache._nbytes = None
+    cache.run(TrendAnalyzer().identify_trends, rates)
+
+    left = {p.stem for p in entries(cache)}
+    assert cache.key(methods[0], rates) in left
+    assert cache.key(methods[1], rates) not in left
+    assert cache.nbytes() <= cache.max_bytes
+    cache.clear()
+    assert entries(cache) == [] and cache.nbytes() == 0
@@ -0,0 +1,113 @@
+"""ResultBuilder and ResultTable round trips."""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzers.multi_timeframe_analyzer import MultiTimeframeAnalyzer
+from data.synthetic import SyntheticMarket
+from indicators.chart_patterns import ChartPatternRecognizer
+from indicators.wave_counter import WaveCounter
+from utils.result_table import ResultBuilder, ResultTable
+
+
+class Side(Enum):
+    BUY = 'buy'
+    SELL = 'sell'
+
+
+@dataclass(frozen=True, slots=True)
+class Fill:
+    side: Side
+    symbol: str
+    bar: int
+    time: pd.Timestamp
+    price: float
+    stop: Optional[float] = None
+    note: Optional[str] = None
+
+
+def fills():
+    times = pd.date_range('2024-01-01', periods=4, freq='h')
+    return [
+        Fill(Side.BUY, 'EURUSD', 0, times[0], 1.1, 1.09, 'open'),
+        Fill(Side.SELL, 'GBPUSD', 1, times[1], 1.25),
+        Fill(Side.BUY, 'EURUSD', 2, times[2], 1.105, None, None),
+        Fill(Side.SELL, 'EURUSD', 3, times[3], 1.2, 1.21, 'close'),
+    ]
+
+
+def test_objects_round_trip_through_a_table():
+    table = ResultTable.from_objects(Fill, fills())
+
+    assert len(table) == 4 and table.columns == ['side', 'symbol', 'bar', 'time', 'price', 'stop', 'note']
+    assert table.to_list() == fills()
+    assert table[-1] == fills()[-1]
+    assert table[1:3].to_list() == fills()[1:3]
+    assert table[table.column('bar') % 2 == 0].to_list() == fills()[::2]
+    assert table.categories('symbol') == ['EURUSD', 'GBPUSD']
+    assert table.column('time').dtype.kind == 'M'
+    assert table.to_frame()['side'].tolist() == ['buy', 'sell', 'buy', 'sell']
+    with pytest.raises(IndexError):
+        table[4]
+
+
+def test_appended_and_extended_rows_keep_their_order():
+    expected = fills()
+    builder = ResultBuilder(Fill)
+    builder.append(**{name: getattr(expected[0], name) for name in Fill.__slots__})
+    builder.extend(side=[Side.SELL, Side.BUY], symbol=np.array(['GBPUSD', 'EURUSD']),
+                   bar=np.arange(1, 3), time=[f.time for f in expected[1:3]],
+                   price=np.array([1.25, 1.105]))
+    builder.append(side=Side.SELL, symbol='EURUSD', bar=3, time=expected[3].time,
+                   price=1.2, stop=1.21, note='close')
+
+    assert len(builder) == 4
+    assert builder.build() == expected
+    table = builder.build(columnar=True)
+    assert table.to_list() == expected
+    assert table.column('bar').dtype == np.int64 and table.column('price').dtype == np.float64
+    # Columns of arrays stay arrays, with Python values only once objects are built
+    assert type(builder.build()[1].price) is float and type(builder.build()[1].bar) is int
+
+
+def test_extended_datetime64_times_stay_timestamps():
+    expected = fills()
+    builder = ResultBuilder(Fill)
+    builder.append(**{name: getattr(expected[0], name) for name in Fill.__slots__})
+    builder.extend(side=[f.side for f in expected[1:]], symbol=[f.symbol for f in expected[1:]],
+                   bar=np.arange(1, 4), price=np.array([f.price for f in expected[1:]]),
+                   time=pd.DatetimeIndex([f.time for f in expected[1:]]).values,
+                   stop=[f.stop for f in expected[1:]], note=[f.note for f in expected[1:]])
+
+    objects = builder.build()
+    assert objects == expected and all(type(f.time) is pd.Timestamp for f in objects)
+    table = builder.build(columnar=True)
+    assert table.column('time').dtype.kind == 'M' and table.to_list() == expected
+
+
+def test_extend_checks_lengths_and_required_fields():
+    builder = ResultBuilder(Fill)
+    with pytest.raises(ValueError):
+        builder.extend(side=Side.BUY, symbol='EURUSD', bar=np.arange(2), time=[0, 1], price=np.ones(3))
+    with pytest.raises(TypeError):
+        builder.extend(side=Side.BUY, symbol='EURUSD', bar=np.arange(2), time=[0, 1])
+    assert len(builder) == 0 and builder.build() == []
+
+
+@pytest.mark.parametrize('analyze', [
+    lambda rates: (MultiTimeframeAnalyzer('EURUSD').analyze_timeframe, {'timeframe': 'H1'}),
+    lambda rates: (WaveCounter(sensitivity=5).identify_wave_counts, {}),
+    lambda rates: (ChartPatternRecognizer().find_all_patterns, {}),
+])
+def test_analyzers_return_the_same_rows_either_way(analyze):
+    rates = SyntheticMarket(['EURUSD'], 'H1', seed=2).generate(3000)['EURUSD']
+    method, kwargs = analyze(rates)
+    objects = method(rates, **kwargs)
+    table = method(rates, columnar=True, **kwargs)
+
+    assert len(objects) > 0
+    assert isinstance(table, ResultTable) and table.to_list() == objects
@@ -0,0 +1,113 @@
+"""ShardCoordinator assignment and reassignment, with workers speaking the protocol directly."""
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from shard_cluster import ShardCoordinator
+
+KEY = b'test-key'
+SHARDS = [('EURUSD', 'H1'), ('GBPUSD', 'H1'), ('USDJPY', 'H1'), ('AUDUSD', 'H1')]
+
+
+class Coordinator:
+    """A coordinator serving on a free loopback port in a background thread."""
+
+    def __init__(self, min_workers: int = 2, **kwargs):
+        self.coordinator = ShardCoordinator(SHARDS, ('127.0.0.1', 0), authkey=KEY, **kwargs)
+        self.coordinator.listen()
+        self.address = self.coordinator._listener.address
+        self.results = []
+        self.latest = None
+        self.thread = threading.Thread(target=self._serve, args=(min_workers,), daemon=True)
+        self.thread.start()
+
+    def _serve(self, min_workers: int):
+        self.latest = self.coordinator.serve(min_workers, lambda *args: self.results.append(args))
+
+    def worker(self, name: str):
+        conn = Client(self.address, authkey=KEY)
+        conn.send({'type': 'hello', 'worker': name})
+        return conn
+
+    def join(self):
+        self.thread.join(timeout=10)
+        assert not self.thread.is_alive()
+
+
+def assigned(conn) -> list:
+    assert conn.poll(10), "no assignment"
+    message = conn.recv()
+    assert message['type'] == 'assign'
+    return [tuple(shard) for shard in message['shards']]
+
+
+def finish(cluster: Coordinator, conn):
+    conn.send({'type': 'done', 'shards': SHARDS})
+    assert conn.poll(10) and conn.recv() == {'type': 'stop'}
+    cluster.join()
+
+
+def test_shards_of_a_disconnected_worker_move_to_the_others():
+    cluster = Coordinator()
+    w1, w2 = cluster.worker('w1'), cluster.worker('w2')
+    first, second = assigned(w1), assigned(w2)
+    assert first == SHARDS[0::2] and second == SHARDS[1::2]
+
+    w1.close()
+    assert sorted(assigned(w2)) == sorted(first)
+    assert all(owner == 'w2' for owner in cluster.coordinator.owner.values())
+
+    w2.send({'type': 'result', 'shard': SHARDS[0], 'summary': {'waves': 3}})
+    finish(cluster, w2)
+    assert cluster.latest == {SHARDS[0]: {'waves': 3}}
+    assert [(worker, shard) for worker, shard, _ in cluster.results] == [('w2', SHARDS[0])]
+
+
+def test_silent_worker_is_dropped_after_the_heartbeat_timeout():
+    cluster = Coordinator(heartbeat_timeout=0.5)
+    silent, alive = cluster.worker('silent'), cluster.worker('alive')
+    orphaned = assigned(silent)
+    assigned(alive)
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(0.1):
+            alive.send({'type': 'heartbeat'})
+
+    beating = threading.Thread(target=beat, daemon=True)
+    beating.start()
+    try:
+        assert sorted(assigned(alive)) == sorted(orphaned)
+    finally:
+        stop.set()
+        beating.join()
+    finish(cluster, alive)
+    silent.close()
+
+
+def test_finished_shards_are_not_reassigned():
+    cluster = Coordinator()
+    w1, w2 = cluster.worker('w1'), cluster.worker('w2')
+    first = assigned(w1)
+    assigned(w2)
+
+    w1.send({'type': 'done', 'shards': first})
+    w1.close()
+    assert not w2.poll(1.5)  # Nothing left to take over
+    finish(cluster, w2)
+
+
+def test_workers_need_the_cluster_key(monkeypatch):
+    cluster = Coordinator(min_workers=1)
+    with pytest.raises(AuthenticationError):
+        Client(cluster.address, authkey=b'wrong')
+    worker = cluster.worker('w1')
+    assert assigned(worker) == SHARDS
+    finish(cluster, worker)
+
+    monkeypatch.delenv('FOREX_SHARD_KEY', raising=False)
+    with pytest.raises(ValueError):
+        ShardCoordinator(SHARDS, ('0.0.0.0', 0))
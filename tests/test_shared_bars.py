@@ -0,0 +1,74 @@
+"""SharedBarStore reference counting and segment lifetimes."""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pytest
+
+from data.bars import BarArrays
+from data.shared_bars import SharedBarStore, call_with_bars
+from data.synthetic import SyntheticMarket
+
+
+def make_rates(count: int):
+    return SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(count)['EURUSD']
+
+
+def exists(name: str) -> bool:
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    return True
+
+
+def last_close(bars: BarArrays) -> float:
+    return float(bars.close[-1])
+
+
+@pytest.fixture
+def store():
+    store = SharedBarStore()
+    yield store
+    store.close()
+
+
+def test_segment_lives_until_store_and_handles_release_it(store):
+    rates = make_rates(100)
+    first = store.publish(('EURUSD', 'H1'), rates)
+    assert call_with_bars(first, last_close) == rates['close'][-1]
+
+    extra = store.acquire(('EURUSD', 'H1'))
+    assert extra == first
+    store.release(first)
+    assert exists(first.name)  # The store's reference and the acquired one remain
+
+    # A newer window drops the store's reference to the old one
+    second = store.publish(('EURUSD', 'H1'), rates[:50])
+    assert exists(first.name) and store.acquire(('EURUSD', 'H1')) == second
+    store.release(extra)
+    assert not exists(first.name)
+
+    store.release(extra)  # Releasing twice is harmless
+    store.release(second)
+    store.release(second)
+    assert exists(second.name)  # Still the latest window
+    assert store.nbytes() == second.length * second.dtype.itemsize
+
+
+def test_close_unlinks_everything(store):
+    handles = [store.publish(('EURUSD', tf), make_rates(10)) for tf in ('M15', 'H1')]
+    assert all(exists(h.name) for h in handles)
+    store.close()
+    assert not any(exists(h.name) for h in handles)
+    assert store.acquire(('EURUSD', 'H1')) is None and store.nbytes() == 0
+
+
+def test_workers_read_bars_and_keep_digits(store):
+    points = BarArrays.from_rates(make_rates(200)).to_points(5)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        handle = store.publish(('EURUSD', 'H1'), points)
+        assert pool.submit(call_with_bars, handle, last_close).result() == points.close[-1]
+        assert handle.digits == 5
+        store.release(handle)
+    assert exists(handle.name)
@@ -0,0 +1,55 @@
+"""State snapshots: round trip, and damaged files ignored instead of half-restored."""
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from data.state_snapshot import MAGIC, SNAPSHOT_VERSION, StateSnapshot, load_snapshot, save_snapshot
+from data.synthetic import SyntheticMarket
+
+
+def snapshot() -> StateSnapshot:
+    rates = SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(50)['EURUSD']
+    return StateSnapshot(bars={('EURUSD', 'H1'): rates},
+                         cycles={('EURUSD', 'H1'): (('fp', 50), {'waves': []}, rates['time'].copy())},
+                         digits={'EURUSD': 5})
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'state.fxs')
+    original = snapshot()
+    assert save_snapshot(path, original) == (tmp_path / 'state.fxs').stat().st_size
+
+    loaded = load_snapshot(path)
+    np.testing.assert_array_equal(loaded.bars[('EURUSD', 'H1')], original.bars[('EURUSD', 'H1')])
+    assert loaded.cycles[('EURUSD', 'H1')][:2] == original.cycles[('EURUSD', 'H1')][:2]
+    assert loaded.digits == {'EURUSD': 5} and loaded.saved_at == original.saved_at
+    assert [p.name for p in tmp_path.iterdir()] == ['state.fxs']  # No temporary file left
+
+
+@pytest.mark.parametrize('damage', [
+    lambda blob: blob[:10],                                  # Truncated header
+    lambda blob: blob[:len(blob) // 2],                      # Truncated payload
+    lambda blob: b'NOTSTATE' + blob[8:],                     # Another file
+    lambda blob: blob[:8] + struct.pack('<H', SNAPSHOT_VERSION + 1) + blob[10:],
+    lambda blob: blob[:-1] + bytes([blob[-1] ^ 0xFF]),       # Flipped bits
+    lambda blob: b'',
+])
+def test_damaged_snapshots_are_ignored(tmp_path, capsys, damage):
+    path = tmp_path / 'state.fxs'
+    save_snapshot(str(path), snapshot())
+    path.write_bytes(damage(path.read_bytes()))
+
+    assert load_snapshot(str(path)) is None
+    assert '⚠️' in capsys.readouterr().out
+
+
+def test_valid_frame_with_unreadable_payload_is_ignored(tmp_path, capsys):
+    payload = zlib.compress(b'not a pickle')
+    path = tmp_path / 'state.fxs'
+    path.write_bytes(struct.pack('<8sHI', MAGIC, SNAPSHOT_VERSION, zlib.crc32(payload)) + payload)
+
+    assert load_snapshot(str(path)) is None
+    assert 'Could not read' in capsys.readouterr().out
+    assert load_snapshot(str(tmp_path / 'missing.fxs')) is None
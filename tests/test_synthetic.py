@@ -0,0 +1,74 @@
+"""SyntheticMarket reproducibility, independence of spawned streams and bar consistency."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.synthetic import SyntheticMarket, default_correlation
+
+# Wednesday 2024-01-03 00:00 UTC
+START = 1704240000
+PAIRS = ['EURUSD', 'GBPUSD', 'USDJPY']
+
+
+def returns(rates: np.ndarray) -> np.ndarray:
+    return np.diff(np.log(rates['close']))
+
+
+def test_same_seed_reproduces_and_another_does_not():
+    first = SyntheticMarket(PAIRS, 'H1', seed=42).generate(500, start=START)
+    again = SyntheticMarket(PAIRS, 'H1', seed=np.random.SeedSequence(42)).generate(500, start=START)
+    other = SyntheticMarket(PAIRS, 'H1', seed=43).generate(500, start=START)
+    for pair in PAIRS:
+        np.testing.assert_array_equal(first[pair], again[pair])
+        assert not np.array_equal(first[pair]['close'], other[pair]['close'])
+
+
+def test_spawned_markets_are_reproducible_and_independent():
+    children = SyntheticMarket(['EURUSD'], 'M15', seed=7).spawn(3)
+    again = SyntheticMarket(['EURUSD'], 'M15', seed=7).spawn(3)
+    series = [child.generate(5000, start=START)['EURUSD'] for child in children]
+
+    for market, rates in zip(again, series):
+        np.testing.assert_array_equal(market.generate(5000, start=START)['EURUSD'], rates)
+        assert market.timeframe == 'M15' and market.pairs == ['EURUSD']
+    for i in range(3):
+        for j in range(i + 1, 3):
+            assert abs(np.corrcoef(returns(series[i]), returns(series[j]))[0, 1]) < 0.05
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_bars_are_consistent(compact):
+    bars = SyntheticMarket(PAIRS, 'M5', seed=3).generate(3000, start=START, compact=compact)
+    for pair, rates in bars.items():
+        assert len(rates) == 3000 and np.all(np.diff(rates['time']) > 0)
+        assert np.all(rates['high'] >= np.maximum(rates['open'], rates['close']))
+        assert np.all(rates['low'] <= np.minimum(rates['open'], rates['close']))
+        assert np.all(rates['low'] > 0) and np.all(rates['spread'] >= 1)
+        digits = 3 if 'JPY' in pair else 5
+        np.testing.assert_allclose(rates['close'], np.round(rates['close'].astype(np.float64), digits),
+                                   rtol=1e-6 if compact else 0, atol=0)
+
+
+def test_no_weekend_bars_unless_asked():
+    weekdays = SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(1000, start=START)['EURUSD']
+    days = pd.to_datetime(weekdays['time'], unit='s').dayofweek
+    assert days.max() < 5 and weekdays['time'][0] == START
+
+    every_day = SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(1000, start=START, weekends=True)['EURUSD']
+    assert np.all(np.diff(every_day['time']) == 3600)
+    assert set(pd.to_datetime(every_day['time'], unit='s').dayofweek) == set(range(7))
+
+    weeks = SyntheticMarket(['EURUSD'], 'W1', seed=1).generate(10, start=START)['EURUSD']
+    assert set(pd.to_datetime(weeks['time'], unit='s').dayofweek) == {6}  # Weekly bars open on Sunday
+
+
+def test_pairs_sharing_a_currency_move_as_expected():
+    pairs = ['EURUSD', 'GBPUSD', 'USDJPY', 'EURGBP']
+    corr = default_correlation(pairs)
+    assert corr[0, 1] > 0 and corr[0, 2] < 0 and corr[1, 2] < 0
+
+    bars = SyntheticMarket(pairs, 'H1', seed=11).generate(8000, start=START)
+    observed = np.corrcoef([returns(bars[pair]) for pair in pairs])
+    assert observed[0, 1] > 0.25  # Same quote currency
+    assert observed[0, 2] < -0.25 and observed[1, 2] < -0.25  # USD as quote versus base
+    assert observed[0, 3] > 0.25  # Same base currency
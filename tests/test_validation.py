@@ -0,0 +1,95 @@
+"""validate_bars checks and ValidationReport.clean()."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.bars import RATES_DTYPE, BarArrays
+from data.mt5_connector import MT5Connector
+from data.synthetic import SyntheticMarket
+from data.validation import validate_bars
+
+# Wednesday 2024-01-03 00:00 UTC
+START = 1704240000
+
+
+@pytest.fixture
+def rates():
+    """Three weeks of H1 bars without weekend bars."""
+    return SyntheticMarket(['EURUSD'], 'H1', seed=1).generate(360, start=START)['EURUSD']
+
+
+def walk(returns: np.ndarray) -> np.ndarray:
+    """Rates around a close path with the given log returns, one bar per hour."""
+    close = 1.1 * np.exp(np.cumsum(returns))
+    out = np.zeros(len(close), dtype=RATES_DTYPE)
+    out['time'] = START + 3600 * np.arange(len(close))
+    out['open'] = np.r_[1.1, close[:-1]]
+    out['close'] = close
+    out['high'] = np.maximum(out['open'], close) * (1 + np.abs(returns) / 2)
+    out['low'] = np.minimum(out['open'], close) * (1 - np.abs(returns) / 2)
+    out['tick_volume'] = 100
+    return out
+
+
+def test_weekend_gaps_are_expected_and_other_gaps_reported(rates):
+    report = validate_bars(rates, 'H1')
+    assert report.ok and report.summary()['weekend_gaps'] == 3
+    weekends = np.flatnonzero(report.weekend_gap)
+    assert all(pd.Timestamp(t, unit='s').dayofweek == 0 for t in rates['time'][weekends])
+
+    missing = np.delete(rates, [10, 11, 12])  # A Wednesday afternoon
+    report = validate_bars(missing, 'H1')
+    assert not report.ok and list(np.flatnonzero(report.gap_before)) == [10]
+    assert report.summary()['weekend_gaps'] == 3
+    assert report.valid.all()  # Gaps do not invalidate the bars around them
+    assert validate_bars(missing).period == 3600  # Spacing from the median
+
+
+def test_out_of_order_and_duplicate_bars(rates):
+    shuffled = rates.copy()
+    shuffled[[20, 21]] = shuffled[[21, 20]]
+    shuffled[30] = shuffled[29]
+    report = validate_bars(shuffled, 'H1')
+    assert list(np.flatnonzero(report.out_of_order)) == [21, 30]
+    assert report.summary()['out_of_order'] == 2 and not report.valid[[21, 30]].any()
+
+
+def test_invalid_prices(rates):
+    bad = rates.copy()
+    bad['high'][5] = bad['low'][5] - 0.001
+    bad['close'][6] = np.nan
+    bad['low'][7] = 0
+    assert list(np.flatnonzero(validate_bars(bad, 'H1').invalid_ohlc)) == [5, 6, 7]
+
+
+def test_spike_is_flagged_but_a_volatility_regime_is_not():
+    rng = np.random.default_rng(5)
+    # Volatility rising tenfold within a day and staying there
+    sigma = 0.0002 * np.r_[np.ones(300), np.linspace(1, 10, 30), np.full(270, 10)]
+    assert validate_bars(walk(rng.normal(0, 1, 600) * sigma), 'H1').summary()['spikes'] == 0
+
+    spiked = walk(rng.normal(0, 0.0005, 600))
+    spiked['close'][400] *= 1.02
+    spiked['high'][400] = spiked['close'][400]
+    spiked['open'][401] = spiked['close'][400]
+    spiked['high'][401] = spiked['close'][400]
+    report = validate_bars(spiked, 'H1')
+    assert 400 in np.flatnonzero(report.spikes) and not report.invalid_ohlc.any()
+
+
+@pytest.mark.parametrize('convert', [
+    lambda rates: rates,
+    MT5Connector._rates_to_frame,
+    BarArrays.from_rates,
+])
+def test_clean_keeps_the_representation(rates, convert):
+    data = convert(rates)
+    assert validate_bars(data, 'H1').clean(data) is data  # Nothing to drop, no copy
+
+    bad = rates.copy()
+    bad['high'][[3, 50]] = 0.5
+    data = convert(bad)
+    cleaned = validate_bars(data, 'H1').clean(data)
+    assert type(cleaned) is type(data) and len(cleaned) == len(rates) - 2
+    np.testing.assert_array_equal(np.asarray(cleaned['close'] if not isinstance(cleaned, BarArrays)
+                                             else cleaned.close), np.delete(rates['close'], [3, 50]))